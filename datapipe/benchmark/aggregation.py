@@ -0,0 +1,628 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+Streaming aggregation of scores and execution times.
+
+Scores are aggregated as images are processed (nothing needs to be kept in
+memory or reloaded from result files) and aggregators of several workers or
+shards can be merged:
+
+- :class:`RunningStatistics` computes the count, mean, variance, min and max
+  (Welford's algorithm);
+- :class:`Histogram` counts values in fixed bins;
+- :class:`QuantileSketch` estimates quantiles (median, quartiles, ...) with a
+  bounded memory (merging t-digest);
+- :class:`ScoreAggregator` gathers the above for each score name of a
+  benchmark.
+
+All of them have ``update``, ``update_array``, ``merge`` and
+``to_dict``/``from_dict`` (JSON serializable) methods.
+
+When all the values are already in memory (e.g. the scores of a preloaded
+dataset), `aggregate_array` computes exact aggregates: the median of a
+:class:`QuantileSketch` is only an estimate on large datasets.
+"""
+
+__all__ = ['AGGREGATION_METHODS',
+           'aggregate_array',
+           'RunningStatistics',
+           'Histogram',
+           'QuantileSketch',
+           'ScoreAggregator',
+           'merge_aggregators']
+
+import math
+
+import numpy as np
+
+
+# RUNNING STATISTICS ##########################################################
+
+class RunningStatistics(object):
+    """Running count, mean, variance, min and max of a stream of values.
+
+    NaN values are counted (`num_nan`) but ignored by statistics.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.num_nan = 0
+        self.mean = float('nan')
+        self.min = float('nan')
+        self.max = float('nan')
+        self._m2 = 0.            # Sum of squares of differences from the mean
+
+    def update(self, value):
+        """Add one value."""
+
+        value = float(value)
+
+        if math.isnan(value):
+            self.num_nan += 1
+            return
+
+        self.count += 1
+
+        if self.count == 1:
+            self.mean = self.min = self.max = value
+        else:
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self._m2 += delta * (value - self.mean)
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+
+    def update_array(self, values):
+        """Add all the values of an array."""
+
+        values = np.asarray(values, dtype=np.float64).ravel()
+        is_nan = np.isnan(values)
+
+        other = RunningStatistics()
+        other.num_nan = int(is_nan.sum())
+        values = values[~is_nan]
+
+        if len(values) > 0:
+            other.count = len(values)
+            other.mean = float(values.mean())
+            other.min = float(values.min())
+            other.max = float(values.max())
+            other._m2 = float(np.square(values - other.mean).sum())
+
+        self.merge(other)
+
+    def merge(self, other):
+        """Add the values aggregated by `other` (Chan et al. parallel algorithm)."""
+
+        self.num_nan += other.num_nan
+
+        if other.count == 0:
+            return
+
+        if self.count == 0:
+            self.count, self.mean, self.min, self.max, self._m2 = other.count, other.mean, other.min, other.max, other._m2
+            return
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+
+        self.mean += delta * other.count / count
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self):
+        """The (population) variance (like ``numpy.var``)."""
+        return self._m2 / self.count if self.count > 0 else float('nan')
+
+    @property
+    def std(self):
+        """The (population) standard deviation (like ``numpy.std``)."""
+        return math.sqrt(self.variance)
+
+    def to_dict(self):
+        return {"count": self.count,
+                "num_nan": self.num_nan,
+                "mean": self.mean,
+                "m2": self._m2,
+                "min": self.min,
+                "max": self.max}
+
+    @classmethod
+    def from_dict(cls, state_dict):
+        statistics = cls()
+        statistics.count = state_dict["count"]
+        statistics.num_nan = state_dict["num_nan"]
+        statistics.mean = state_dict["mean"]
+        statistics._m2 = state_dict["m2"]
+        statistics.min = state_dict["min"]
+        statistics.max = state_dict["max"]
+        return statistics
+
+
+# HISTOGRAM ###################################################################
+
+class Histogram(object):
+    """A histogram with fixed bins.
+
+    Bins are half open (``[edge_i, edge_i+1[``) except the last one which
+    includes its right edge (like ``numpy.histogram``). Values out of bins are
+    counted in `underflow` and `overflow`; NaN values are counted in
+    `num_nan`.
+
+    Parameters
+    ----------
+    bin_edges : array_like
+        The monotonically increasing bin edges.
+    """
+
+    def __init__(self, bin_edges):
+        self.bin_edges = np.asarray(bin_edges, dtype=np.float64)
+
+        if (self.bin_edges.ndim != 1) or (len(self.bin_edges) < 2) or np.any(np.diff(self.bin_edges) <= 0):
+            raise ValueError("bin_edges must be a monotonically increasing 1D array of at least 2 values")
+
+        self.counts = np.zeros(len(self.bin_edges) - 1, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+        self.num_nan = 0
+
+    def update(self, value):
+        """Add one value."""
+        self.update_array([value])
+
+    def update_array(self, values):
+        """Add all the values of an array."""
+
+        values = np.asarray(values, dtype=np.float64).ravel()
+        is_nan = np.isnan(values)
+        values = values[~is_nan]
+
+        self.num_nan += int(is_nan.sum())
+        self.underflow += int((values < self.bin_edges[0]).sum())
+        self.overflow += int((values > self.bin_edges[-1]).sum())
+
+        self.counts += np.histogram(values, bins=self.bin_edges)[0]
+
+    def merge(self, other):
+        """Add the counts of `other` (bins must be the same)."""
+
+        if not np.array_equal(self.bin_edges, other.bin_edges):
+            raise ValueError("Cannot merge histograms having different bins")
+
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        self.num_nan += other.num_nan
+
+    def to_dict(self):
+        return {"bin_edges": self.bin_edges.tolist(),
+                "counts": self.counts.tolist(),
+                "underflow": self.underflow,
+                "overflow": self.overflow,
+                "num_nan": self.num_nan}
+
+    @classmethod
+    def from_dict(cls, state_dict):
+        histogram = cls(state_dict["bin_edges"])
+        histogram.counts[:] = state_dict["counts"]
+        histogram.underflow = state_dict["underflow"]
+        histogram.overflow = state_dict["overflow"]
+        histogram.num_nan = state_dict["num_nan"]
+        return histogram
+
+
+# QUANTILE SKETCH #############################################################
+
+class QuantileSketch(object):
+    """A mergeable quantile estimator with a bounded memory.
+
+    This is a merging t-digest [1]_: values are summarized by a sorted list of
+    weighted centroids, small near the extreme quantiles and larger in the
+    middle. Quantiles are exact as long as less than ``5 * compression``
+    values have been added (values are only summarized once this buffer is
+    full). NaN values are ignored.
+
+    Parameters
+    ----------
+    compression : float
+        The compression factor (the sketch keeps about ``compression / 2``
+        centroids; the larger, the more accurate).
+
+    References
+    ----------
+    .. [1] Dunning, T. & Ertl, O. (2019). Computing extremely accurate
+       quantiles using t-digests. https://arxiv.org/abs/1902.04023
+    """
+
+    def __init__(self, compression=200):
+        self.compression = compression
+        self.min = float('inf')
+        self.max = float('-inf')
+
+        self._means = np.empty(0)
+        self._weights = np.empty(0)
+        self._buffer_means = []
+        self._buffer_weights = []
+
+    @property
+    def count(self):
+        return float(self._weights.sum() + sum(self._buffer_weights))
+
+    def update(self, value):
+        """Add one value."""
+
+        value = float(value)
+
+        if math.isnan(value):
+            return
+
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+        self._buffer_means.append(value)
+        self._buffer_weights.append(1.)
+
+        if len(self._buffer_means) >= 5 * self.compression:
+            self._compress()
+
+    def update_array(self, values):
+        """Add all the values of an array."""
+
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+
+        if len(values) > 0:
+            self._add_centroids(values, np.ones(len(values)), values.min(), values.max())
+
+    def merge(self, other):
+        """Add the values summarized by `other`."""
+
+        means, weights = other._centroids()
+
+        if len(means) > 0:
+            self._add_centroids(means, weights, other.min, other.max)
+
+    def _add_centroids(self, means, weights, min_value, max_value):
+        self.min = min(self.min, float(min_value))
+        self.max = max(self.max, float(max_value))
+
+        self._buffer_means.extend(means.tolist())
+        self._buffer_weights.extend(weights.tolist())
+
+        if len(self._buffer_means) >= 5 * self.compression:
+            self._compress()
+
+    def _centroids(self):
+        """Return the (sorted) centroids and the buffered values."""
+
+        means = np.concatenate((self._means, self._buffer_means))
+        weights = np.concatenate((self._weights, self._buffer_weights))
+        sort_index = np.argsort(means, kind='stable')
+
+        return means[sort_index], weights[sort_index]
+
+    def _compress(self):
+        means, weights = self._centroids()
+
+        self._buffer_means = []
+        self._buffer_weights = []
+
+        total_weight = weights.sum()
+        scale = self.compression / (2. * math.pi)
+
+        # k1 scale function: k(q) = delta / (2 pi) * asin(2q - 1)
+        def weight_limit(cumulated_weight):
+            k = scale * math.asin(2. * cumulated_weight / total_weight - 1.) + 1.
+            return total_weight * (math.sin(min(k / scale, math.pi / 2.)) + 1.) / 2.
+
+        new_means = []
+        new_weights = []
+
+        current_mean, current_weight = means[0], weights[0]
+        cumulated_weight = 0.
+        limit = weight_limit(cumulated_weight)
+
+        for mean, weight in zip(means[1:], weights[1:]):
+            if cumulated_weight + current_weight + weight <= limit:
+                current_weight += weight
+                current_mean += (mean - current_mean) * weight / current_weight
+            else:
+                new_means.append(current_mean)
+                new_weights.append(current_weight)
+                cumulated_weight += current_weight
+                limit = weight_limit(cumulated_weight)
+                current_mean, current_weight = mean, weight
+
+        new_means.append(current_mean)
+        new_weights.append(current_weight)
+
+        self._means = np.array(new_means)
+        self._weights = np.array(new_weights)
+
+    def quantile(self, q):
+        """Return the estimated `q` quantile(s) (``0 <= q <= 1``).
+
+        The result is NaN if the sketch is empty.
+        """
+
+        means, weights = self._centroids()
+        q = np.asarray(q, dtype=np.float64)
+
+        if len(means) == 0:
+            return np.full(q.shape, np.nan)[()]
+
+        # Interpolate between centroid centers (the extreme values are exact)
+        centers = np.cumsum(weights) - weights / 2.
+        xp = np.concatenate(([0.], centers, [centers[-1] + weights[-1] / 2.]))
+        fp = np.concatenate(([self.min], means, [self.max]))
+
+        return np.interp(q * weights.sum(), xp, fp)[()]
+
+    @property
+    def median(self):
+        return float(self.quantile(0.5))
+
+    def to_dict(self):
+        means, weights = self._centroids()
+        return {"compression": self.compression,
+                "min": self.min,
+                "max": self.max,
+                "means": means.tolist(),
+                "weights": weights.tolist()}
+
+    @classmethod
+    def from_dict(cls, state_dict):
+        sketch = cls(compression=state_dict["compression"])
+        if len(state_dict["means"]) > 0:
+            sketch._add_centroids(np.array(state_dict["means"], dtype=np.float64),
+                                  np.array(state_dict["weights"], dtype=np.float64),
+                                  state_dict["min"],
+                                  state_dict["max"])
+        return sketch
+
+
+# SCORE AGGREGATOR ############################################################
+
+AGGREGATION_METHODS = ("mean", "median", "std", "min", "max")
+
+_AGGREGATION_FUNCTIONS = {"mean": np.mean,
+                          "median": np.median,
+                          "std": np.std,
+                          "min": np.min,
+                          "max": np.max}
+
+def aggregate_array(values, method="mean"):
+    """Return the exact `method` aggregate of an array of values.
+
+    NaN values are ignored, as in :meth:`ScoreAggregator.aggregate`.
+
+    Parameters
+    ----------
+    values : array_like
+        The values to aggregate.
+    method : str
+        The aggregation method: "mean", "median", "std", "min" or "max".
+
+    Returns
+    -------
+    float
+        The aggregated value (NaN if there is no value other than NaN).
+    """
+
+    if method not in AGGREGATION_METHODS:
+        raise ValueError("Unknown value for aggregation_method: {}".format(method))
+
+    values = np.asarray(values, dtype=np.float64).ravel()
+    values = values[~np.isnan(values)]
+
+    if len(values) == 0:
+        return float('nan')
+
+    return float(_AGGREGATION_FUNCTIONS[method](values))
+
+
+class ScoreAggregator(object):
+    """Aggregate the scores and execution times of a benchmark.
+
+    Each value name (a score name like "e_shape" or
+    "full_clean_execution_time_sec") has its own :class:`RunningStatistics`,
+    :class:`QuantileSketch` and optionally its own :class:`Histogram`.
+
+    Parameters
+    ----------
+    histogram_bins : dict
+        The histogram bin edges of value names (e.g.
+        ``{"e_shape": np.linspace(0, 1, 101)}``). Values having no bins are
+        not histogrammed.
+    compression : float
+        The compression factor of quantile sketches.
+    """
+
+    def __init__(self, histogram_bins=None, compression=200):
+        self.histogram_bins = {} if histogram_bins is None else dict(histogram_bins)
+        self.compression = compression
+
+        self.num_images = 0
+        self.num_errors = 0
+
+        self.statistics = {}
+        self.sketches = {}
+        self.histograms = {}
+
+    def _get(self, name):
+        if name not in self.statistics:
+            self.statistics[name] = RunningStatistics()
+            self.sketches[name] = QuantileSketch(self.compression)
+            if name in self.histogram_bins:
+                self.histograms[name] = Histogram(self.histogram_bins[name])
+
+        return self.statistics[name], self.sketches[name], self.histograms.get(name)
+
+    def names(self):
+        """Return the aggregated value names."""
+        return list(self.statistics.keys())
+
+    def update(self, name, value):
+        """Add one value to the `name` aggregate."""
+
+        statistics, sketch, histogram = self._get(name)
+
+        statistics.update(value)
+        sketch.update(value)
+        if histogram is not None:
+            histogram.update(value)
+
+    def update_array(self, name, values):
+        """Add all the values of an array to the `name` aggregate."""
+
+        statistics, sketch, histogram = self._get(name)
+
+        statistics.update_array(values)
+        sketch.update_array(values)
+        if histogram is not None:
+            histogram.update_array(values)
+
+    def update_image_dict(self, image_dict):
+        """Add the scores and the cleaning time of an image.
+
+        `image_dict` is an item of the "io" list made by
+        :meth:`datapipe.denoising.abstract_cleaning_algorithm.AbstractCleaningAlgorithm.run`.
+        Aborted images (i.e. having an "error" entry) are only counted.
+        """
+
+        self.num_images += 1
+
+        if "error" in image_dict:
+            self.num_errors += 1
+            return
+
+        for name, value in zip(image_dict.get("score_name", ()), image_dict.get("score", ())):
+            if value is not None:
+                self.update(name, value)
+
+        if "full_clean_execution_time_sec" in image_dict:
+            self.update("full_clean_execution_time_sec", image_dict["full_clean_execution_time_sec"])
+
+    def merge(self, other):
+        """Add the values aggregated by `other` (e.g. another worker or shard)."""
+
+        self.num_images += other.num_images
+        self.num_errors += other.num_errors
+
+        for name in other.names():
+            statistics, sketch, histogram = self._get(name)
+
+            statistics.merge(other.statistics[name])
+            sketch.merge(other.sketches[name])
+
+            if name in other.histograms:
+                if histogram is None:
+                    self.histograms[name] = histogram = Histogram(other.histograms[name].bin_edges)
+                histogram.merge(other.histograms[name])
+
+    def aggregate(self, name, method="mean"):
+        """Return the `method` aggregate of `name` values.
+
+        Parameters
+        ----------
+        name : str
+            The value name.
+        method : str
+            The aggregation method: "mean", "median", "std", "min" or "max".
+
+        Returns
+        -------
+        float
+            The aggregated value (NaN if no value has been added).
+        """
+
+        if method not in AGGREGATION_METHODS:
+            raise ValueError("Unknown value for aggregation_method: {}".format(method))
+
+        if name not in self.statistics:
+            return float('nan')
+
+        if method == "median":
+            return self.sketches[name].median
+
+        return float(getattr(self.statistics[name], method))
+
+    def summary(self):
+        """Return a dictionary of the main statistics of each value name."""
+
+        summary_dict = {"num_images": self.num_images,
+                        "num_errors": self.num_errors}
+
+        for name in self.names():
+            statistics = self.statistics[name]
+            first_quartile, median, third_quartile = self.sketches[name].quantile([0.25, 0.5, 0.75])
+            summary_dict[name] = {"count": statistics.count,
+                                  "num_nan": statistics.num_nan,
+                                  "mean": statistics.mean,
+                                  "std": statistics.std,
+                                  "min": statistics.min,
+                                  "first_quartile": float(first_quartile),
+                                  "median": float(median),
+                                  "third_quartile": float(third_quartile),
+                                  "max": statistics.max}
+
+        return summary_dict
+
+    def to_dict(self):
+        return {"compression": self.compression,
+                "num_images": self.num_images,
+                "num_errors": self.num_errors,
+                "statistics": {name: statistics.to_dict() for name, statistics in self.statistics.items()},
+                "sketches": {name: sketch.to_dict() for name, sketch in self.sketches.items()},
+                "histograms": {name: histogram.to_dict() for name, histogram in self.histograms.items()}}
+
+    @classmethod
+    def from_dict(cls, state_dict):
+        histograms = {name: Histogram.from_dict(histogram_dict) for name, histogram_dict in state_dict["histograms"].items()}
+
+        aggregator = cls(histogram_bins={name: histogram.bin_edges for name, histogram in histograms.items()},
+                         compression=state_dict["compression"])
+
+        aggregator.num_images = state_dict["num_images"]
+        aggregator.num_errors = state_dict["num_errors"]
+        aggregator.statistics = {name: RunningStatistics.from_dict(statistics_dict) for name, statistics_dict in state_dict["statistics"].items()}
+        aggregator.sketches = {name: QuantileSketch.from_dict(sketch_dict) for name, sketch_dict in state_dict["sketches"].items()}
+        aggregator.histograms = histograms
+
+        return aggregator
+
+
+def merge_aggregators(aggregator_list):
+    """Merge several aggregators (e.g. of several workers) into a new one."""
+
+    merged_aggregator = ScoreAggregator()
+
+    for aggregator in aggregator_list:
+        for name, histogram in aggregator.histograms.items():
+            merged_aggregator.histogram_bins.setdefault(name, histogram.bin_edges)
+        merged_aggregator.merge(aggregator)
+
+    return merged_aggregator
@@ -20,7 +20,8 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-__all__ = ['normalize_array',
+__all__ = ['AssessmentContext',
+           'normalize_array',
            'metric_mse',
            'metric_nrmse',
            'metric1',
@@ -33,7 +34,16 @@ __all__ = ['normalize_array',
            'metric_hillas_delta',
            'metric_hillas_delta2',
            'metric_kill_isolated_pixels',
-           'assess_image_cleaning']
+           'normalize_array_batch',
+           'metric_mse_batch',
+           'metric_nrmse_batch',
+           'metric1_batch',
+           'metric2_batch',
+           'metric3_batch',
+           'metric4_batch',
+           'metric_ssim_batch',
+           'assess_image_cleaning',
+           'assess_image_cleaning_batch']
 
 import astropy.units as u
 
@@ -41,14 +51,16 @@ import collections
 
 import numpy as np
 import math
+import warnings
 
+from datapipe.benchmark.ssim import structural_similarity
+from datapipe.benchmark.ssim import structural_similarity_batch
+from datapipe.image.hillas_parameters import HILLAS_FIELDS
 from datapipe.image.hillas_parameters import get_hillas_parameters
+from datapipe.image.hillas_parameters import get_hillas_parameters_batch
+from datapipe.image.kill_isolated_pixels import IslandAnalysis
 from datapipe.io.geometry_converter import image_2d_to_1d
 
-from pywi.image.pixel_clusters import kill_isolated_pixels
-from pywi.image.pixel_clusters import kill_isolated_pixels_stats
-
-from skimage.measure import compare_ssim as ssim
 from skimage.measure import compare_psnr as psnr
 from skimage.measure import compare_nrmse as nrmse
 
@@ -126,6 +138,220 @@ def norm_angle_diff(angle_in_degrees):
     return abs(((angle_in_degrees + 90) % 180) - 90.)
 
 
+###############################################################################
+# ASSESSMENT CONTEXT                                                          #
+###############################################################################
+
+# Hillas parameters used by metrics (angles are in radians)
+HILLAS_METRIC_FIELDS = ('size', 'cen_x', 'cen_y', 'length', 'width', 'r', 'phi', 'psi')
+
+def _hillas_to_dict(hillas_parameters):
+    """Return a dictionary of plain floats from ctapipe Hillas parameters or
+    from a record of :func:`datapipe.image.hillas_parameters.get_hillas_parameters_batch`."""
+
+    if isinstance(hillas_parameters, dict):
+        return hillas_parameters
+    elif isinstance(hillas_parameters, np.void) or isinstance(hillas_parameters, np.ndarray):
+        return {field: float(hillas_parameters[field]) for field in HILLAS_FIELDS}
+    else:
+        return {'size':   float(hillas_parameters.size),
+                'cen_x':  hillas_parameters.cen_x.value,
+                'cen_y':  hillas_parameters.cen_y.value,
+                'length': hillas_parameters.length.value,
+                'width':  hillas_parameters.width.value,
+                'r':      hillas_parameters.r.value,
+                'phi':    hillas_parameters.phi.to(u.rad).value,
+                'psi':    hillas_parameters.psi.to(u.rad).value}
+
+
+class AssessmentContext(object):
+    """Intermediate values shared by the metric functions.
+
+    Metric functions called by :func:`assess_image_cleaning` get the same
+    context (``context`` keyword argument) thus each intermediate value (float
+    copies, normalized images, 1D images, Hillas parameters, ...) is computed
+    at most once per assessed image, whatever the number of metrics.
+
+    Values are computed on first access. Returned arrays are shared: they
+    must not be modified by callers.
+
+    Parameters
+    ----------
+    input_img: 2D ndarray
+        The RAW original image.
+    output_image: 2D ndarray
+        The cleaned image returned by the image cleanning algorithm to assess.
+    reference_image: 2D ndarray
+        The actual clean image.
+    geom: CameraGeometry, optional
+        The camera geometry (required for 1D images and Hillas parameters).
+    hillas_implementation: int, optional
+        The ctapipe implementation used to compute Hillas parameters
+        (implementation 2 is computed with
+        :func:`datapipe.image.hillas_parameters.get_hillas_parameters_batch`).
+    output_image_1d: 1D ndarray, optional
+        The ctapipe 1D version of `output_image` if it is already known.
+    reference_image_1d: 1D ndarray, optional
+        The ctapipe 1D version of `reference_image` if it is already known.
+    reference_hillas: optional
+        The Hillas parameters of `reference_image` if they are already known
+        (e.g. computed by ``run()``).
+    """
+
+    def __init__(self,
+                 input_img,
+                 output_image,
+                 reference_image,
+                 geom=None,
+                 hillas_implementation=2,
+                 output_image_1d=None,
+                 reference_image_1d=None,
+                 reference_hillas=None):
+
+        self.input_img = input_img
+        self.geom = geom
+        self.hillas_implementation = hillas_implementation
+
+        # Copy and cast images to prevent tricky bugs
+        # See https://docs.scipy.org/doc/numpy/reference/generated/numpy.ndarray.astype.html#numpy-ndarray-astype
+        self.output_image = np.array(output_image, dtype=np.float64)
+        self.reference_image = np.array(reference_image, dtype=np.float64)
+
+        self._cache = {}
+
+        if output_image_1d is not None:
+            self._cache["output_image_1d"] = np.asarray(output_image_1d, dtype=np.float64)
+
+        if reference_image_1d is not None:
+            self._cache["reference_image_1d"] = np.asarray(reference_image_1d, dtype=np.float64)
+
+        if reference_hillas is not None:
+            self._cache[("hillas", "reference")] = _hillas_to_dict(reference_hillas)
+
+    def _get(self, key, compute_function):
+        if key not in self._cache:
+            self._cache[key] = compute_function()
+        return self._cache[key]
+
+    def _to_1d(self, image):
+        if image.ndim == 2:
+            return image_2d_to_1d(image, self.geom.cam_id)
+        return image
+
+    def _hillas(self, image_1d):
+        if self.hillas_implementation == 2:
+            return _hillas_to_dict(get_hillas_parameters_batch(self.geom, image_1d, raise_on_empty=True))
+        return _hillas_to_dict(get_hillas_parameters(self.geom, image_1d, self.hillas_implementation))
+
+    # Pixels values ###########################################################
+
+    @property
+    def output_sum(self):
+        """The sum of the (finite) pixels of the output image."""
+        return self._get("output_sum", lambda: float(np.nansum(self.output_image)))
+
+    @property
+    def reference_sum(self):
+        """The sum of the (finite) pixels of the reference image."""
+        return self._get("reference_sum", lambda: float(np.nansum(self.reference_image)))
+
+    @property
+    def output_image_nan_zero(self):
+        """The output image where NaN pixels are set to 0."""
+        return self._get("output_image_nan_zero", lambda: np.nan_to_num(self.output_image, nan=0.))
+
+    @property
+    def reference_image_nan_zero(self):
+        """The reference image where NaN pixels are set to 0."""
+        return self._get("reference_image_nan_zero", lambda: np.nan_to_num(self.reference_image, nan=0.))
+
+    @property
+    def normalized_output_image(self):
+        """The output image normalized with :func:`normalize_array`."""
+        return self._get("normalized_output_image", lambda: normalize_array(self.output_image))
+
+    @property
+    def normalized_reference_image(self):
+        """The reference image normalized with :func:`normalize_array`."""
+        return self._get("normalized_reference_image", lambda: normalize_array(self.reference_image))
+
+    # 1D images ###############################################################
+
+    @property
+    def output_image_1d(self):
+        """The ctapipe 1D version of the output image."""
+        return self._get("output_image_1d", lambda: self._to_1d(self.output_image))
+
+    @property
+    def reference_image_1d(self):
+        """The ctapipe 1D version of the reference image."""
+        return self._get("reference_image_1d", lambda: self._to_1d(self.reference_image))
+
+    # Islands #################################################################
+
+    @property
+    def output_islands(self):
+        """The :class:`datapipe.image.kill_isolated_pixels.IslandAnalysis` of the output image."""
+        return self._get("output_islands", lambda: IslandAnalysis(self.output_image))
+
+    def killed_reference_image(self, threshold):
+        """The reference image without isolated pixels."""
+        return self._get(("killed_reference_image", threshold),
+                         lambda: IslandAnalysis(self.reference_image, threshold=threshold).killed_image)
+
+    def killed_reference_image_1d(self, threshold):
+        """The ctapipe 1D version of `killed_reference_image`."""
+        return self._get(("killed_reference_image_1d", threshold),
+                         lambda: self._to_1d(self.killed_reference_image(threshold)))
+
+    # Hillas parameters #######################################################
+
+    def _compute_output_and_reference_hillas(self):
+        if (self.hillas_implementation == 2) and (("hillas", "reference") not in self._cache):
+            # Both images are parametrized with a single call
+            images_1d = np.array([self.output_image_1d, self.reference_image_1d])
+            params = get_hillas_parameters_batch(self.geom, images_1d, raise_on_empty=True)
+            self._cache[("hillas", "reference")] = _hillas_to_dict(params[1])
+            return _hillas_to_dict(params[0])
+        return self._hillas(self.output_image_1d)
+
+    @property
+    def output_hillas(self):
+        """The Hillas parameters of the output image (a dictionary of floats)."""
+        return self._get(("hillas", "output"), self._compute_output_and_reference_hillas)
+
+    @property
+    def reference_hillas(self):
+        """The Hillas parameters of the reference image (a dictionary of floats)."""
+        return self._get(("hillas", "reference"), lambda: self._hillas(self.reference_image_1d))
+
+    def killed_reference_hillas(self, threshold):
+        """The Hillas parameters of `killed_reference_image` (a dictionary of floats)."""
+        return self._get(("hillas", "killed_reference", threshold),
+                         lambda: self._hillas(self.killed_reference_image_1d(threshold)))
+
+
+def _get_context(input_img, output_image, reference_image, kwargs, geom=None):
+    """Return the assessment context given to a metric function (or make it)."""
+
+    context = kwargs.get("context", None)
+
+    if context is None:
+        context = AssessmentContext(input_img,
+                                    output_image,
+                                    reference_image,
+                                    geom=geom,
+                                    hillas_implementation=_hillas_implementation(kwargs))
+
+    return context
+
+
+def _hillas_implementation(kwargs):
+    if ("hillas_implementation" in kwargs) and (kwargs["hillas_implementation"] in (1, 2, 3, 4)):
+        return kwargs["hillas_implementation"]
+    return 2
+
+
 ###############################################################################
 # METRIC FUNCTIONS                                                            #
 ###############################################################################
@@ -181,12 +407,9 @@ def metric_mse(input_img, output_image, reference_image, **kwargs):
     
     """
 
-    # Copy and cast images to prevent tricky bugs
-    # See https://docs.scipy.org/doc/numpy/reference/generated/numpy.ndarray.astype.html#numpy-ndarray-astype
-    output_image = output_image.astype('float64', copy=True)
-    reference_image = reference_image.astype('float64', copy=True)
-    
-    score = np.nanmean(np.square(output_image - reference_image))
+    context = _get_context(input_img, output_image, reference_image, kwargs)
+
+    score = np.nanmean(np.square(context.output_image - context.reference_image))
 
     return float(score)
 
@@ -237,17 +460,15 @@ def metric_nrmse(input_img, output_image, reference_image, **kwargs):
     
     """
 
-    # Copy and cast images to prevent tricky bugs
-    # See https://docs.scipy.org/doc/numpy/reference/generated/numpy.ndarray.astype.html#numpy-ndarray-astype
-    output_image = output_image.astype('float64', copy=True)
-    reference_image = reference_image.astype('float64', copy=True)
+    context = _get_context(input_img, output_image, reference_image, kwargs)
+    kwargs["context"] = context
     
     #if ('nrmse_normalize_type' in kwargs) and (kwargs['nrmse_normalize_type'].lower() == 'euclidian'):
     #    denom = 
     # TODO: see https://github.com/scikit-image/scikit-image/blob/master/skimage/measure/simple_metrics.py#L82
 
     mse = metric_mse(input_img, output_image, reference_image, **kwargs)
-    denom = np.sqrt(np.nanmean((reference_image * output_image), dtype=np.float64))
+    denom = np.sqrt(np.nanmean((context.reference_image * context.output_image), dtype=np.float64))
     score = np.sqrt(mse) / denom
 
     return float(score)
@@ -304,15 +525,9 @@ def metric1(input_img, output_image, reference_image, **kwargs):
     
     """
 
-    # Copy and cast images to prevent tricky bugs
-    # See https://docs.scipy.org/doc/numpy/reference/generated/numpy.ndarray.astype.html#numpy-ndarray-astype
-    output_image = output_image.astype('float64', copy=True)
-    reference_image = reference_image.astype('float64', copy=True)
-    
-    output_image = normalize_array(output_image)
-    reference_image = normalize_array(reference_image)
+    context = _get_context(input_img, output_image, reference_image, kwargs)
 
-    score = np.nanmean(np.square(output_image - reference_image))
+    score = np.nanmean(np.square(context.normalized_output_image - context.normalized_reference_image))
 
     return float(score)
 
@@ -355,13 +570,10 @@ def metric2(input_img, output_image, reference_image, **kwargs):
         The score of the image cleaning algorithm for the given image.
     """
 
-    # Copy and cast images to prevent tricky bugs
-    # See https://docs.scipy.org/doc/numpy/reference/generated/numpy.ndarray.astype.html#numpy-ndarray-astype
-    output_image = output_image.astype('float64', copy=True)
-    reference_image = reference_image.astype('float64', copy=True)
-    
-    sum_output_image = float(np.nansum(output_image))
-    sum_reference_image = float(np.nansum(reference_image))
+    context = _get_context(input_img, output_image, reference_image, kwargs)
+
+    sum_output_image = context.output_sum
+    sum_reference_image = context.reference_sum
 
     if sum_output_image <= 0:                 # TODO
         raise EmptyOutputImageError()
@@ -369,7 +581,7 @@ def metric2(input_img, output_image, reference_image, **kwargs):
     if sum_reference_image <= 0:              # TODO
         raise EmptyReferenceImageError()
 
-    mark = np.nanmean(np.abs((output_image / sum_output_image) - (reference_image / sum_reference_image)))
+    mark = np.nanmean(np.abs((context.output_image / sum_output_image) - (context.reference_image / sum_reference_image)))
 
     return float(mark)
 
@@ -410,13 +622,10 @@ def metric3(input_img, output_image, reference_image, **kwargs):
         The score of the image cleaning algorithm for the given image.
     """
 
-    # Copy and cast images to prevent tricky bugs
-    # See https://docs.scipy.org/doc/numpy/reference/generated/numpy.ndarray.astype.html#numpy-ndarray-astype
-    output_image = output_image.astype('float64', copy=True)
-    reference_image = reference_image.astype('float64', copy=True)
-    
-    sum_output_image = float(np.nansum(output_image))
-    sum_reference_image = float(np.nansum(reference_image))
+    context = _get_context(input_img, output_image, reference_image, kwargs)
+
+    sum_output_image = context.output_sum
+    sum_reference_image = context.reference_sum
 
     if sum_reference_image <= 0:              # TODO
         raise EmptyReferenceImageError()
@@ -462,13 +671,10 @@ def metric4(input_img, output_image, reference_image, **kwargs):
         The score of the image cleaning algorithm for the given image.
     """
 
-    # Copy and cast images to prevent tricky bugs
-    # See https://docs.scipy.org/doc/numpy/reference/generated/numpy.ndarray.astype.html#numpy-ndarray-astype
-    output_image = output_image.astype('float64', copy=True)
-    reference_image = reference_image.astype('float64', copy=True)
-    
-    sum_output_image = float(np.nansum(output_image))
-    sum_reference_image = float(np.nansum(reference_image))
+    context = _get_context(input_img, output_image, reference_image, kwargs)
+
+    sum_output_image = context.output_sum
+    sum_reference_image = context.reference_sum
 
     if sum_reference_image <= 0:              # TODO
         raise EmptyReferenceImageError()
@@ -541,18 +747,16 @@ def metric_ssim(input_img, output_image, reference_image, **kwargs):
        DOI:10.1007/s10043-009-0119-z
     .. [3] http://scikit-image.org/docs/dev/api/skimage.measure.html#compare-ssim
     .. [4] https://en.wikipedia.org/wiki/Structural_similarity
-    """
 
-    # Copy and cast images to prevent tricky bugs
-    # See https://docs.scipy.org/doc/numpy/reference/generated/numpy.ndarray.astype.html#numpy-ndarray-astype
-    output_image = output_image.astype('float64', copy=True)
-    reference_image = reference_image.astype('float64', copy=True)
+    The score is computed by :func:`datapipe.benchmark.ssim.structural_similarity`
+    (the same value as scikit-image's ``compare_ssim(output_image,
+    reference_image, gaussian_weights=True, sigma=0.5)``).
+    """
 
-    # TODO: the following two lines may be wrong...
-    output_image[np.isnan(output_image)] = 0
-    reference_image[np.isnan(reference_image)] = 0
+    context = _get_context(input_img, output_image, reference_image, kwargs)
 
-    ssim_val, ssim_image = ssim(output_image, reference_image, full=True, gaussian_weights=True, sigma=0.5)
+    # TODO: NaN pixels are set to 0, this may be wrong...
+    ssim_val = structural_similarity(context.output_image_nan_zero, context.reference_image_nan_zero)
 
     return float(ssim_val)
 
@@ -588,17 +792,11 @@ def metric_psnr(input_img, output_image, reference_image, **kwargs):
     .. [6] https://en.wikipedia.org/wiki/Peak_signal-to-noise_ratio
     """
 
-    # Copy and cast images to prevent tricky bugs
-    # See https://docs.scipy.org/doc/numpy/reference/generated/numpy.ndarray.astype.html#numpy-ndarray-astype
-    output_image = output_image.astype('float64', copy=True)
-    reference_image = reference_image.astype('float64', copy=True)
-
-    # TODO: the following two lines may be wrong...
-    output_image[np.isnan(output_image)] = 0
-    reference_image[np.isnan(reference_image)] = 0
+    context = _get_context(input_img, output_image, reference_image, kwargs)
 
+    # TODO: NaN pixels are set to 0, this may be wrong...
     #psnr_val = psnr(output_image, reference_image, dynamic_range=1e3)
-    psnr_val = psnr(output_image, reference_image, data_range=1e3)
+    psnr_val = psnr(context.output_image_nan_zero, context.reference_image_nan_zero, data_range=1e3)
 
     return float(psnr_val)
 
@@ -627,31 +825,19 @@ def metric_delta_psi(input_img, output_image, reference_image, geom, **kwargs):
         The score of the image cleaning algorithm for the given image.
     """
 
-    # Copy and cast images to prevent tricky bugs
-    # See https://docs.scipy.org/doc/numpy/reference/generated/numpy.ndarray.astype.html#numpy-ndarray-astype
-    output_image = output_image.astype('float64', copy=True)
-    reference_image = reference_image.astype('float64', copy=True)
+    context = _get_context(input_img, output_image, reference_image, kwargs, geom=geom)
 
-    if "kill" in kwargs and kwargs["kill"]:
-        # Remove isolated pixels on the reference image before assessment.
-        reference_image = kill_isolated_pixels(reference_image, threshold=kwargs["kill_threshold"])
+    output_image_parameters = context.output_hillas
 
-    if "hillas_implementation" in kwargs and kwargs["hillas_implementation"] in (1, 2, 3, 4):
+    if "kill" in kwargs and kwargs["kill"]:
         # Remove isolated pixels on the reference image before assessment.
-        hillas_implementation = kwargs["hillas_implementation"]
+        reference_image_parameters = context.killed_reference_hillas(kwargs["kill_threshold"])
     else:
-        hillas_implementation = 2
-
-    if output_image.ndim == 2:
-        output_image = image_2d_to_1d(output_image, geom.cam_id)        # TODO!!!
-    if reference_image.ndim == 2:
-        reference_image = image_2d_to_1d(reference_image, geom.cam_id)  # TODO!!!
-    output_image_parameters = get_hillas_parameters(geom, output_image, hillas_implementation)
-    reference_image_parameters = get_hillas_parameters(geom, reference_image, hillas_implementation)
+        reference_image_parameters = context.reference_hillas
 
     # Psi (shower direction angle)
-    output_image_parameter_psi_rad = output_image_parameters.psi.to(u.rad).value
-    reference_image_parameter_psi_rad = reference_image_parameters.psi.to(u.rad).value
+    output_image_parameter_psi_rad = output_image_parameters["psi"]
+    reference_image_parameter_psi_rad = reference_image_parameters["psi"]
     delta_psi_rad = reference_image_parameter_psi_rad - output_image_parameter_psi_rad
 
     normalized_delta_psi_deg = norm_angle_diff(math.degrees(delta_psi_rad))
@@ -696,68 +882,57 @@ def metric_hillas_delta(input_img, output_image, reference_image, geom, **kwargs
         The score of the image cleaning algorithm for the given image.
     """
 
-    # Copy and cast images to prevent tricky bugs
-    # See https://docs.scipy.org/doc/numpy/reference/generated/numpy.ndarray.astype.html#numpy-ndarray-astype
-    output_image = output_image.astype('float64', copy=True)
-    reference_image = reference_image.astype('float64', copy=True)
+    context = _get_context(input_img, output_image, reference_image, kwargs, geom=geom)
+    hillas_implementation = context.hillas_implementation
 
-    if ("kill" in kwargs) and kwargs["kill"] and ("kill_threshold" in kwargs):
-        # Remove isolated pixels on the reference image before assessment.
-        reference_image = kill_isolated_pixels(reference_image, threshold=kwargs["kill_threshold"])
+    output_image_parameters = context.output_hillas
 
-    if ("hillas_implementation" in kwargs) and (kwargs["hillas_implementation"] in (1, 2, 3, 4)):
+    if ("kill" in kwargs) and kwargs["kill"] and ("kill_threshold" in kwargs):
         # Remove isolated pixels on the reference image before assessment.
-        hillas_implementation = kwargs["hillas_implementation"]
+        reference_image_parameters = context.killed_reference_hillas(kwargs["kill_threshold"])
     else:
-        hillas_implementation = 2
-
-    if output_image.ndim == 2:
-        output_image = image_2d_to_1d(output_image, geom.cam_id)        # TODO!!!
-    if reference_image.ndim == 2:
-        reference_image = image_2d_to_1d(reference_image, geom.cam_id)  # TODO!!!
-    output_image_parameters = get_hillas_parameters(geom, output_image, hillas_implementation)
-    reference_image_parameters = get_hillas_parameters(geom, reference_image, hillas_implementation)
+        reference_image_parameters = context.reference_hillas
 
     #print(reference_image_parameters)
 
     # Size
-    output_image_parameter_size = float(output_image_parameters.size)
-    reference_image_parameter_size = float(reference_image_parameters.size)
+    output_image_parameter_size = output_image_parameters["size"]
+    reference_image_parameter_size = reference_image_parameters["size"]
     delta_size = reference_image_parameter_size - output_image_parameter_size
 
     # Centroid x
-    output_image_parameter_cen_x = output_image_parameters.cen_x.value
-    reference_image_parameter_cen_x = reference_image_parameters.cen_x.value
+    output_image_parameter_cen_x = output_image_parameters["cen_x"]
+    reference_image_parameter_cen_x = reference_image_parameters["cen_x"]
     delta_cen_x = reference_image_parameter_cen_x - output_image_parameter_cen_x
 
     # Centroid y
-    output_image_parameter_cen_y = output_image_parameters.cen_y.value
-    reference_image_parameter_cen_y = reference_image_parameters.cen_y.value
+    output_image_parameter_cen_y = output_image_parameters["cen_y"]
+    reference_image_parameter_cen_y = reference_image_parameters["cen_y"]
     delta_cen_y = reference_image_parameter_cen_y - output_image_parameter_cen_y
 
     # Length
-    output_image_parameter_length = output_image_parameters.length.value
-    reference_image_parameter_length = reference_image_parameters.length.value
+    output_image_parameter_length = output_image_parameters["length"]
+    reference_image_parameter_length = reference_image_parameters["length"]
     delta_length = reference_image_parameter_length - output_image_parameter_length
 
     # Width
-    output_image_parameter_width = output_image_parameters.width.value
-    reference_image_parameter_width = reference_image_parameters.width.value
+    output_image_parameter_width = output_image_parameters["width"]
+    reference_image_parameter_width = reference_image_parameters["width"]
     delta_width = reference_image_parameter_width - output_image_parameter_width
 
     # R
-    output_image_parameter_r = output_image_parameters.r.value
-    reference_image_parameter_r = reference_image_parameters.r.value
+    output_image_parameter_r = output_image_parameters["r"]
+    reference_image_parameter_r = reference_image_parameters["r"]
     delta_r = reference_image_parameter_r - output_image_parameter_r
 
     # Phi
-    output_image_parameter_phi = output_image_parameters.phi.to(u.rad).value
-    reference_image_parameter_phi = reference_image_parameters.phi.to(u.rad).value
+    output_image_parameter_phi = output_image_parameters["phi"]
+    reference_image_parameter_phi = reference_image_parameters["phi"]
     delta_phi = reference_image_parameter_phi - output_image_parameter_phi
 
     # Psi (shower direction angle)
-    output_image_parameter_psi_rad = output_image_parameters.psi.to(u.rad).value
-    reference_image_parameter_psi_rad = reference_image_parameters.psi.to(u.rad).value
+    output_image_parameter_psi_rad = output_image_parameters["psi"]
+    reference_image_parameter_psi_rad = reference_image_parameters["psi"]
     delta_psi_rad = reference_image_parameter_psi_rad - output_image_parameter_psi_rad
 
     # Normalized psi
@@ -830,7 +1005,8 @@ def metric_hillas_delta2(input_img, output_image, reference_image, geom, **kwarg
 # Kill isolated pixels ########################################################
 
 def metric_kill_isolated_pixels(input_img, output_image, reference_image, **kwargs):
-    delta_pe, delta_abs_pe, delta_num_pixels = kill_isolated_pixels_stats(output_image)
+    context = _get_context(input_img, output_image, reference_image, kwargs)
+    delta_pe, delta_abs_pe, delta_num_pixels = context.output_islands.stats
 
     score_dict = collections.OrderedDict((
                     ('kill_isolated_pixels_delta_pe',         delta_pe),
@@ -842,6 +1018,206 @@ def metric_kill_isolated_pixels(input_img, output_image, reference_image, **kwar
 
     return Score(**score_dict)
 
+###############################################################################
+# BATCH METRIC FUNCTIONS                                                      #
+###############################################################################
+
+# These functions score a stack of output images (shape (N, ...), e.g.
+# (N, H, W)) against the stack of their reference images at once: reductions
+# are made along the trailing (pixels) axes and the result is a 1D array of N
+# scores. NaN pixels are ignored. Contrary to single image metrics, images
+# that cannot be assessed (e.g. an empty reference image) get a NaN score
+# instead of raising an exception so that one bad image doesn't abort the
+# whole stack.
+
+def _pixel_axes(images):
+    return tuple(range(1, images.ndim))
+
+
+def _as_image_stack(images):
+    images = np.asarray(images, dtype=np.float64)
+    if images.ndim < 2:
+        raise ValueError("A stack of images is expected (shape (N, ...))")
+    return images
+
+
+def normalize_array_batch(input_arrays):
+    r"""Normalize each image of the given stack such that its pixels value
+    fit between 0.0 and 1.0.
+
+    This is the batch version of :func:`normalize_array`.
+
+    Parameters
+    ----------
+    input_arrays : Numpy array
+        The images to normalize (shape (N, ...)).
+
+    Returns
+    -------
+    Numpy array
+        The normalized images (a new array with the same shape).
+    """
+
+    input_arrays = _as_image_stack(input_arrays)
+    axes = _pixel_axes(input_arrays)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)   # All-NaN slice (invalid images)
+        min_values = np.nanmin(input_arrays, axis=axes, keepdims=True)
+        max_values = np.nanmax(input_arrays, axis=axes, keepdims=True)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        output_arrays = (input_arrays - min_values) / (max_values - min_values)
+
+    return output_arrays
+
+
+def metric_mse_batch(input_imgs, output_images, reference_images, **kwargs):
+    r"""Batch version of :func:`metric_mse`.
+
+    Returns
+    -------
+    Numpy array
+        The score of each image.
+    """
+
+    output_images = _as_image_stack(output_images)
+    reference_images = _as_image_stack(reference_images)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)   # Mean of empty slice (invalid images)
+        mse = np.nanmean(np.square(output_images - reference_images), axis=_pixel_axes(output_images))
+
+    return mse
+
+
+def metric_nrmse_batch(input_imgs, output_images, reference_images, **kwargs):
+    r"""Batch version of :func:`metric_nrmse`.
+
+    Returns
+    -------
+    Numpy array
+        The score of each image.
+    """
+
+    output_images = _as_image_stack(output_images)
+    reference_images = _as_image_stack(reference_images)
+
+    mse = metric_mse_batch(input_imgs, output_images, reference_images)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)   # Mean of empty slice (invalid images)
+        denom = np.sqrt(np.nanmean(reference_images * output_images, axis=_pixel_axes(output_images)))
+        score = np.sqrt(mse) / denom
+
+    return score
+
+
+def metric1_batch(input_imgs, output_images, reference_images, **kwargs):
+    r"""Batch version of :func:`metric1`.
+
+    Returns
+    -------
+    Numpy array
+        The score of each image.
+    """
+
+    output_images = normalize_array_batch(output_images)
+    reference_images = normalize_array_batch(reference_images)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)   # Mean of empty slice (invalid images)
+        mark = np.nanmean(np.square(output_images - reference_images), axis=_pixel_axes(output_images))
+
+    return mark
+
+
+def _sums(output_images, reference_images):
+    axes = _pixel_axes(output_images)
+    return np.nansum(output_images, axis=axes), np.nansum(reference_images, axis=axes)
+
+
+def metric2_batch(input_imgs, output_images, reference_images, **kwargs):
+    r"""Batch version of :func:`metric2`.
+
+    Images having an empty output or reference image (i.e. a sum lower or
+    equal to 0) get a NaN score.
+
+    Returns
+    -------
+    Numpy array
+        The score of each image.
+    """
+
+    output_images = _as_image_stack(output_images)
+    reference_images = _as_image_stack(reference_images)
+
+    sum_output_images, sum_reference_images = _sums(output_images, reference_images)
+    valid = (sum_output_images > 0) & (sum_reference_images > 0)
+
+    # Reshape sums to broadcast them on pixels
+    sum_shape = (-1,) + (1,) * (output_images.ndim - 1)
+    sum_output_images = np.where(valid, sum_output_images, np.nan).reshape(sum_shape)
+    sum_reference_images = np.where(valid, sum_reference_images, np.nan).reshape(sum_shape)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)   # Mean of empty slice (invalid images)
+        mark = np.nanmean(np.abs((output_images / sum_output_images) - (reference_images / sum_reference_images)),
+                          axis=_pixel_axes(output_images))
+
+    return mark
+
+
+def metric3_batch(input_imgs, output_images, reference_images, **kwargs):
+    r"""Batch version of :func:`metric3`.
+
+    Images having an empty reference image (i.e. a sum lower or equal to 0)
+    get a NaN score.
+
+    Returns
+    -------
+    Numpy array
+        The score of each image.
+    """
+
+    return np.abs(metric4_batch(input_imgs, output_images, reference_images, **kwargs))
+
+
+def metric4_batch(input_imgs, output_images, reference_images, **kwargs):
+    r"""Batch version of :func:`metric4`.
+
+    Images having an empty reference image (i.e. a sum lower or equal to 0)
+    get a NaN score.
+
+    Returns
+    -------
+    Numpy array
+        The score of each image.
+    """
+
+    output_images = _as_image_stack(output_images)
+    reference_images = _as_image_stack(reference_images)
+
+    sum_output_images, sum_reference_images = _sums(output_images, reference_images)
+    sum_reference_images = np.where(sum_reference_images > 0, sum_reference_images, np.nan)
+
+    return (sum_output_images - sum_reference_images) / sum_reference_images
+
+
+def metric_ssim_batch(input_imgs, output_images, reference_images, **kwargs):
+    r"""Batch version of :func:`metric_ssim`.
+
+    Images must be 2D (i.e. stacks have the shape (N, H, W)). NaN pixels are
+    set to 0.
+
+    Returns
+    -------
+    Numpy array
+        The score of each image.
+    """
+
+    return structural_similarity_batch(output_images, reference_images)
+
+
 ###############################################################################
 # ASSESS FUNCTIONS DRIVER                                                     #
 ###############################################################################
@@ -907,7 +1283,10 @@ def assess_image_cleaning(input_img, output_img, reference_img, benchmark_method
         The actual clean image (the best result that can be expected for the
         image cleaning algorithm).
     kwargs: dict
-        Additional options.
+        Additional options. An :class:`AssessmentContext` can be given with
+        the ``context`` keyword (e.g. to reuse intermediate values already
+        computed by the caller), otherwise it is made here and shared by all
+        metrics.
 
     Returns
     -------
@@ -915,6 +1294,13 @@ def assess_image_cleaning(input_img, output_img, reference_img, benchmark_method
         The score(s) of the image cleaning algorithm for the given image.
     """
 
+    if kwargs.get("context", None) is None:
+        kwargs["context"] = AssessmentContext(input_img,
+                                              output_img,
+                                              reference_img,
+                                              geom=kwargs.get("geom", None),
+                                              hillas_implementation=_hillas_implementation(kwargs))
+
     try:
         score_list = []
         metric_name_list = []
@@ -938,3 +1324,61 @@ def assess_image_cleaning(input_img, output_img, reference_img, benchmark_method
 
     return tuple(score_list), tuple(metric_name_list)
 
+
+BATCH_BENCHMARK_DICT = collections.OrderedDict((
+    ("mse",      metric_mse_batch),
+    ("nrmse",    metric_nrmse_batch),
+    ("unrmse",   metric1_batch),
+    ("e_shape",  metric2_batch),
+    ("e_energy", metric3_batch),
+    ("sspd",     metric4_batch),
+    ("ssim",     metric_ssim_batch)
+))
+
+def assess_image_cleaning_batch(input_imgs, output_imgs, reference_imgs, benchmark_method, **kwargs):
+    r"""Compute the score of each image of the `output_imgs` stack regarding
+    the `reference_imgs` stack with the `benchmark_method` pixel metrics.
+
+    This is the batch version of :func:`assess_image_cleaning` for metrics
+    that only depend on pixels value (see `BATCH_BENCHMARK_DICT`): "mse",
+    "nrmse", "unrmse", "e_shape", "e_energy", "sspd" and "ssim" (or "all"
+    for all of them).
+
+    Parameters
+    ----------
+    input_imgs: ndarray
+        The RAW original images (shape (N, ...)); unused by pixel metrics, it
+        can be ``None``.
+    output_imgs: ndarray
+        The cleaned images (shape (N, ...)).
+    reference_imgs: ndarray
+        The actual clean images (shape (N, ...)).
+    benchmark_method: str or sequence of str
+        The name of the metric(s) to compute.
+    kwargs: dict
+        Additional options.
+
+    Returns
+    -------
+    tuple
+        ``(score_array, metric_name_tuple)`` where ``score_array`` has the
+        shape (N, number of metrics).
+    """
+
+    if benchmark_method == "all":
+        metric_name_list = list(BATCH_BENCHMARK_DICT.keys())
+    elif isinstance(benchmark_method, str):
+        metric_name_list = [benchmark_method]
+    else:
+        metric_name_list = list(benchmark_method)
+
+    score_list = []
+
+    for metric_name in metric_name_list:
+        if metric_name not in BATCH_BENCHMARK_DICT:
+            raise ValueError("Unknown batch benchmark method {}".format(metric_name))
+
+        metric_function = BATCH_BENCHMARK_DICT[metric_name]
+        score_list.append(metric_function(input_imgs, output_imgs, reference_imgs, **kwargs))
+
+    return np.stack(score_list, axis=1), tuple(metric_name_list)
@@ -33,11 +33,14 @@ import traceback
 import astropy.units as u
 
 from datapipe.benchmark import assess
-from datapipe.image.hillas_parameters import get_hillas_parameters
+from datapipe.benchmark.aggregation import ScoreAggregator
+from datapipe.image.hillas_parameters import HILLAS_FIELDS
+from datapipe.image.hillas_parameters import get_hillas_parameters_batch
 
-from pywi.image.pixel_clusters import kill_isolated_pixels_stats
-from pywi.image.pixel_clusters import number_of_islands
+from datapipe.image.kill_isolated_pixels import IslandAnalysis
 
+from datapipe.image import pixel_graph as pixel_graph_analysis
+from datapipe.image.pixel_graph import get_pixel_graph
 from datapipe.image.signal_to_border_distance import signal_to_border
 from datapipe.image.signal_to_border_distance import signal_to_border_distance
 from datapipe.image.signal_to_border_distance import pemax_on_border
@@ -47,6 +50,74 @@ import datapipe.io.images
 
 HILLAS_IMPLEMENTATION = 2      # TODO
 
+# The (width, shift) of the integration window of each camera
+INTEGRATOR_WINDOW_DICT = {
+    "ASTRICam":  (1, 1),
+    "CHEC":      (10, 5),
+    "DigiCam":   (5, 2),
+    "FlashCam":  (6, 3),
+    "NectarCam": (5, 2),
+    "LSTCam":    (5, 2)
+}
+
+def image_generator_kwargs(cam_id):
+    """Return the `image_generator` options used to read `cam_id` images
+    (the camera filter and the signal integration options)."""
+
+    if cam_id not in INTEGRATOR_WINDOW_DICT:
+        raise ValueError('Unknown cam_id "{}"'.format(cam_id))
+
+    integrator_window_width, integrator_window_shift = INTEGRATOR_WINDOW_DICT[cam_id]
+
+    return {"cam_filter_list": [cam_id],
+            "ctapipe_format": False,
+            "integrator": 'LocalPeakIntegrator',
+            "integrator_window_width": integrator_window_width,
+            "integrator_window_shift": integrator_window_shift,
+            "integration_correction": False,
+            "mix_channels": True}
+
+
+def _border_stats(image_2d, image_1d, pixel_graph=None):
+    """Return the signal to border list, the signal to border distance and the
+    max pe on border of an image.
+
+    The 1D image is analysed on the camera pixel graph if `pixel_graph` is
+    given, otherwise the 2D image is analysed."""
+
+    if pixel_graph is None:
+        return (signal_to_border(image_2d),
+                signal_to_border_distance(image_2d),
+                pemax_on_border(image_2d))
+    else:
+        return (pixel_graph_analysis.signal_to_border(image_1d, pixel_graph),
+                pixel_graph_analysis.signal_to_border_distance(image_1d, pixel_graph),
+                pixel_graph_analysis.pemax_on_border(image_1d, pixel_graph))
+
+
+def island_stats(image_2d, islands=None, cam_id=None, pixel_graph=None):
+    """Return the island statistics of an image.
+
+    The 1D image is analysed on the camera pixel graph if `pixel_graph` is
+    given (`cam_id` is then required for the 2D to 1D conversion), otherwise
+    `islands`, the `IslandAnalysis` of the 2D image (made if ``None``), is
+    used.
+
+    The returned keys ("islands_delta_pe", "islands_delta_abs_pe",
+    "islands_delta_num_pixels" and "num_islands") are meant to be prefixed
+    with "img_ref_" or "img_cleaned_" in results."""
+
+    if pixel_graph is not None:
+        image_1d = geometry_converter.image_2d_to_1d(image_2d, cam_id)
+        islands = IslandAnalysis(image_1d, pixel_graph=pixel_graph)
+    elif islands is None:
+        islands = IslandAnalysis(image_2d)
+
+    return {"islands_delta_pe": islands.delta_pe,
+            "islands_delta_abs_pe": islands.delta_abs_pe,
+            "islands_delta_num_pixels": islands.delta_num_pixels,
+            "num_islands": islands.num_islands}
+
 ###############################################################################
 
 class AbstractCleaningAlgorithm(object):
@@ -90,7 +161,8 @@ class AbstractCleaningAlgorithm(object):
             tel_id=None,
             event_id=None,
             cam_id=None,
-            debug=False):
+            debug=False,
+            aggregator=None):
         """A convenient optional wrapper to simplify the image cleaning analysis.
 
         Apply the image cleaning analysis on `input_file_or_dir_path_list`,
@@ -125,6 +197,13 @@ class AbstractCleaningAlgorithm(object):
             Stop the execution and print the full traceback when an exception
             is encountered if this parameter is `True`. Report exceptions and
             continue with the next input image if this parameter is `False`.
+        aggregator
+            A :class:`datapipe.benchmark.aggregation.ScoreAggregator` updated
+            with the scores and the cleaning time of each image as soon as it
+            is processed (e.g. to share an aggregator between several runs).
+            A new one is made if `None`. Its summary and its state are saved
+            in the "score_summary" and "score_aggregator" entries of the
+            result.
         
         Returns
         -------
@@ -137,6 +216,9 @@ class AbstractCleaningAlgorithm(object):
         if benchmark_method is not None:
             io_list = []           # The list of returned dictionaries
 
+            if aggregator is None:
+                aggregator = ScoreAggregator()
+
         if tel_id is not None:
             tel_id = [tel_id]
 
@@ -146,38 +228,11 @@ class AbstractCleaningAlgorithm(object):
         if cam_id is None:
             raise ValueError('cam_id is now mandatory.')
 
-        if cam_id == "ASTRICam":
-            integrator_window_width = 1
-            integrator_window_shift = 1
-        elif cam_id == "CHEC":
-            integrator_window_width = 10
-            integrator_window_shift = 5
-        elif cam_id == "DigiCam":
-            integrator_window_width = 5
-            integrator_window_shift = 2
-        elif cam_id == "FlashCam":
-            integrator_window_width = 6
-            integrator_window_shift = 3
-        elif cam_id == "NectarCam":
-            integrator_window_width = 5
-            integrator_window_shift = 2
-        elif cam_id == "LSTCam":
-            integrator_window_width = 5
-            integrator_window_shift = 2
-        else:
-            raise ValueError('Unknown cam_id "{}"'.format(cam_id))
-
         for image in image_generator(input_file_or_dir_path_list,
                                      max_num_images=max_num_img,
                                      tel_filter_list=tel_id,
                                      ev_filter_list=event_id,
-                                     cam_filter_list=[cam_id],
-                                     ctapipe_format=False,
-                                     integrator='LocalPeakIntegrator',
-                                     integrator_window_width=integrator_window_width,
-                                     integrator_window_shift=integrator_window_shift,
-                                     integration_correction=False,
-                                     mix_channels=True):
+                                     **image_generator_kwargs(cam_id)):
 
             input_file_path = image.meta['file_path']
 
@@ -211,22 +266,28 @@ class AbstractCleaningAlgorithm(object):
                 cam_id = image.meta['cam_id']
                 cleaning_function_params["cam_id"] = cam_id
                 geom1d = geometry_converter.get_geom1d(cam_id)
+                pixels_position_1d = (geom1d.pix_x.value, geom1d.pix_y.value)
+
+                # Hexagonal cameras are analysed on their native pixel graph
+                # (borders and islands of the rebinned 2D grid are artificial)
+                if str(geom1d.pix_type).startswith("hex"):
+                    pixel_graph = get_pixel_graph(cam_id)
+                else:
+                    pixel_graph = None
 
                 if benchmark_method is not None:
 
                     # FETCH ADDITIONAL IMAGE METADATA #####################
 
-                    image_dict["img_ref_signal_to_border"] = signal_to_border(reference_img)                   # TODO: NaN
-                    image_dict["img_ref_signal_to_border_distance"] = signal_to_border_distance(reference_img) # TODO: NaN
-                    image_dict["img_ref_pemax_on_border"] = pemax_on_border(reference_img)                     # TODO: NaN
+                    reference_img1d = geometry_converter.image_2d_to_1d(reference_img, cam_id)
 
-                    delta_pe, delta_abs_pe, delta_num_pixels = kill_isolated_pixels_stats(reference_img)       # TODO: NaN
-                    num_islands = number_of_islands(reference_img)                                             # TODO: NaN
+                    border_stats = _border_stats(reference_img, reference_img1d, pixel_graph)
+                    image_dict["img_ref_signal_to_border"] = border_stats[0]
+                    image_dict["img_ref_signal_to_border_distance"] = border_stats[1]
+                    image_dict["img_ref_pemax_on_border"] = border_stats[2]
 
-                    image_dict["img_ref_islands_delta_pe"] = delta_pe
-                    image_dict["img_ref_islands_delta_abs_pe"] = delta_abs_pe
-                    image_dict["img_ref_islands_delta_num_pixels"] = delta_num_pixels
-                    image_dict["img_ref_num_islands"] = num_islands
+                    for key, value in island_stats(reference_img, cam_id=cam_id, pixel_graph=pixel_graph).items():
+                        image_dict["img_ref_" + key] = value
 
                     image_dict["img_ref_sum_pe"] = float(np.nansum(reference_img))
                     image_dict["img_ref_min_pe"] = float(np.nanmin(reference_img))
@@ -238,23 +299,10 @@ class AbstractCleaningAlgorithm(object):
                     image_dict["img_in_max_pe"] = float(np.nanmax(input_img))
                     image_dict["img_in_num_pix"] = int( (input_img[np.isfinite(input_img)] > 0).sum() )
 
-                    reference_img1d = geometry_converter.image_2d_to_1d(reference_img, cam_id)
-                    hillas_params_2_ref_img = get_hillas_parameters(geom1d, reference_img1d, HILLAS_IMPLEMENTATION)   # TODO GEOM
-
-                    image_dict["img_ref_hillas_2_size"] =     float(hillas_params_2_ref_img.size)
-                    image_dict["img_ref_hillas_2_cen_x"] =    hillas_params_2_ref_img.cen_x.value
-                    image_dict["img_ref_hillas_2_cen_y"] =    hillas_params_2_ref_img.cen_y.value
-                    image_dict["img_ref_hillas_2_length"] =   hillas_params_2_ref_img.length.value
-                    image_dict["img_ref_hillas_2_width"] =    hillas_params_2_ref_img.width.value
-                    image_dict["img_ref_hillas_2_r"] =        hillas_params_2_ref_img.r.value
-                    image_dict["img_ref_hillas_2_phi"] =      hillas_params_2_ref_img.phi.to(u.rad).value
-                    image_dict["img_ref_hillas_2_psi"] =      hillas_params_2_ref_img.psi.to(u.rad).value
-                    try:
-                        image_dict["img_ref_hillas_2_miss"] = float(hillas_params_2_ref_img.miss.value)
-                    except:
-                        image_dict["img_ref_hillas_2_miss"] = None
-                    image_dict["img_ref_hillas_2_kurtosis"] = hillas_params_2_ref_img.kurtosis
-                    image_dict["img_ref_hillas_2_skewness"] = hillas_params_2_ref_img.skewness
+                    hillas_params_2_ref_img = get_hillas_parameters_batch(pixels_position_1d, reference_img1d, raise_on_empty=True)   # Same as implementation 2 (HILLAS_IMPLEMENTATION)
+
+                    for field in HILLAS_FIELDS:
+                        image_dict["img_ref_hillas_2_" + field] = float(hillas_params_2_ref_img[field])
 
                 # CLEAN THE INPUT IMAGE ###################################
 
@@ -265,7 +313,10 @@ class AbstractCleaningAlgorithm(object):
                 cleaning_function_params["output_data_dict"] = {}
 
                 initial_time = time.perf_counter()
-                cleaned_img = self.clean_image(input_img_copy, **cleaning_function_params)   # TODO: NaN
+                # The pixel graph is not a cleaning parameter (it is not saved
+                # in results): cleaning algorithms only use it for the
+                # statistics of the cleaned image islands
+                cleaned_img = self.clean_image(input_img_copy, pixel_graph=pixel_graph, **cleaning_function_params)   # TODO: NaN
                 full_clean_execution_time_sec = time.perf_counter() - initial_time
 
                 if benchmark_method is not None:
@@ -278,17 +329,31 @@ class AbstractCleaningAlgorithm(object):
 
                     # ASSESS THE CLEANING #################################
 
+                    # Intermediate values already computed here (reference
+                    # 1D image and Hillas parameters) are shared with metrics
+                    assessment_context = assess.AssessmentContext(input_img,
+                                                                  cleaned_img,
+                                                                  reference_img,
+                                                                  geom=geom1d,
+                                                                  hillas_implementation=HILLAS_IMPLEMENTATION,
+                                                                  reference_image_1d=reference_img1d,
+                                                                  reference_hillas=hillas_params_2_ref_img)
+
                     kwargs = {'geom': geom1d,
-                              'hillas_implementation': HILLAS_IMPLEMENTATION}  # TODO GEOM
+                              'hillas_implementation': HILLAS_IMPLEMENTATION,
+                              'context': assessment_context}  # TODO GEOM
                     score_tuple, score_name_tuple = assess.assess_image_cleaning(input_img,
                                                                                  cleaned_img,
                                                                                  reference_img,
                                                                                  benchmark_method,
                                                                                  **kwargs)
 
-                    image_dict["img_cleaned_signal_to_border"] = signal_to_border(cleaned_img)
-                    image_dict["img_cleaned_signal_to_border_distance"] = signal_to_border_distance(cleaned_img)
-                    image_dict["img_cleaned_pemax_on_border"] = pemax_on_border(cleaned_img)
+                    cleaned_img1d = assessment_context.output_image_1d
+
+                    border_stats = _border_stats(cleaned_img, cleaned_img1d, pixel_graph)
+                    image_dict["img_cleaned_signal_to_border"] = border_stats[0]
+                    image_dict["img_cleaned_signal_to_border_distance"] = border_stats[1]
+                    image_dict["img_cleaned_pemax_on_border"] = border_stats[2]
 
                     image_dict["score"] = score_tuple
                     image_dict["score_name"] = score_name_tuple
@@ -299,30 +364,15 @@ class AbstractCleaningAlgorithm(object):
                     image_dict["img_cleaned_max_pe"] = float(np.nanmax(cleaned_img))
                     image_dict["img_cleaned_num_pix"] = int( (cleaned_img[np.isfinite(cleaned_img)] > 0).sum() )
 
-                    cleaned_img1d = geometry_converter.image_2d_to_1d(cleaned_img, cam_id)
-                    hillas_params_2_cleaned_img = get_hillas_parameters(geom1d, cleaned_img1d, HILLAS_IMPLEMENTATION)    # GEOM
-
-                    image_dict["img_cleaned_hillas_2_size"] =     float(hillas_params_2_cleaned_img.size)
-                    image_dict["img_cleaned_hillas_2_cen_x"] =    hillas_params_2_cleaned_img.cen_x.value
-                    image_dict["img_cleaned_hillas_2_cen_y"] =    hillas_params_2_cleaned_img.cen_y.value
-                    image_dict["img_cleaned_hillas_2_length"] =   hillas_params_2_cleaned_img.length.value
-                    image_dict["img_cleaned_hillas_2_width"] =    hillas_params_2_cleaned_img.width.value
-                    image_dict["img_cleaned_hillas_2_r"] =        hillas_params_2_cleaned_img.r.value
-                    image_dict["img_cleaned_hillas_2_phi"] =      hillas_params_2_cleaned_img.phi.to(u.rad).value
-                    image_dict["img_cleaned_hillas_2_psi"] =      hillas_params_2_cleaned_img.psi.to(u.rad).value
-                    try:
-                        image_dict["img_cleaned_hillas_2_miss"] = float(hillas_params_2_cleaned_img.miss.value)
-                    except:
-                        image_dict["img_cleaned_hillas_2_miss"] = None
-                    image_dict["img_cleaned_hillas_2_kurtosis"] = hillas_params_2_cleaned_img.kurtosis
-                    image_dict["img_cleaned_hillas_2_skewness"] = hillas_params_2_cleaned_img.skewness
+                    hillas_params_2_cleaned_img = assessment_context.output_hillas   # Same as implementation 2 (HILLAS_IMPLEMENTATION)
+
+                    for field in HILLAS_FIELDS:
+                        image_dict["img_cleaned_hillas_2_" + field] = float(hillas_params_2_cleaned_img[field])
 
                 # PLOT IMAGES #########################################################
 
                 if plot or (saveplot is not None):
-                    image_list = [geometry_converter.image_2d_to_1d(input_img, cam_id),
-                                  geometry_converter.image_2d_to_1d(reference_img, cam_id),
-                                  geometry_converter.image_2d_to_1d(cleaned_img, cam_id)] 
+                    image_list = list(geometry_converter.images_2d_to_1d(np.array([input_img, reference_img, cleaned_img]), cam_id))
                     title_list = ["Input image", "Reference image", "Cleaned image"] 
                     geom_list = [geom1d, geom1d, geom1d] 
                     hillas_list = [False, True, True]
@@ -387,6 +437,7 @@ class AbstractCleaningAlgorithm(object):
             finally:
                 if benchmark_method is not None:
                     io_list.append(image_dict)
+                    aggregator.update_image_dict(image_dict)
 
         if benchmark_method is not None:
             error_list = [image_dict["error"] for image_dict in io_list if "error" in image_dict]
@@ -408,6 +459,8 @@ class AbstractCleaningAlgorithm(object):
             output_dict["benchmark_method"] = benchmark_method
             output_dict["system"] = " ".join(os.uname())
             output_dict["io"] = io_list
+            output_dict["score_summary"] = aggregator.summary()
+            output_dict["score_aggregator"] = aggregator.to_dict()
 
             with open(output_file_path, "w") as fd:
                 json.dump(output_dict, fd, sort_keys=True, indent=4)  # pretty print format
@@ -35,12 +35,11 @@ This snippet requires Numpy, Matplotlib and PIL/Pillow Python libraries.
 import argparse
 
 from datapipe.denoising.abstract_cleaning_algorithm import AbstractCleaningAlgorithm
+from datapipe.denoising.abstract_cleaning_algorithm import island_stats
 
 from datapipe.io import geometry_converter
 
-from pywi.image.pixel_clusters import kill_isolated_pixels as scipy_kill_isolated_pixels
-from pywi.image.pixel_clusters import kill_isolated_pixels_stats
-from pywi.image.pixel_clusters import number_of_islands
+from datapipe.image.kill_isolated_pixels import IslandAnalysis
 
 from ctapipe.image.cleaning import tailcuts_clean
 
@@ -58,6 +57,7 @@ class Tailcut(AbstractCleaningAlgorithm):
                     verbose=False,
                     cam_id=None,
                     output_data_dict=None,
+                    pixel_graph=None,
                     **kwargs):
         """Apply ctapipe's tail-cut image cleaning on ``.
 
@@ -85,19 +85,18 @@ class Tailcut(AbstractCleaningAlgorithm):
 
         # KILL ISOLATED PIXELS #################################
 
-        img_cleaned_islands_delta_pe, img_cleaned_islands_delta_abs_pe, img_cleaned_islands_delta_num_pixels = kill_isolated_pixels_stats(cleaned_img_2d)
-        img_cleaned_num_islands = number_of_islands(cleaned_img_2d)
+        islands = IslandAnalysis(cleaned_img_2d)
 
         if output_data_dict is not None:
-            output_data_dict["img_cleaned_islands_delta_pe"] = img_cleaned_islands_delta_pe
-            output_data_dict["img_cleaned_islands_delta_abs_pe"] = img_cleaned_islands_delta_abs_pe
-            output_data_dict["img_cleaned_islands_delta_num_pixels"] = img_cleaned_islands_delta_num_pixels
-            output_data_dict["img_cleaned_num_islands"] = img_cleaned_num_islands
+            # Hexagonal cameras: statistics on the 1D pixel graph (isolated
+            # pixels are still killed on the 2D image)
+            for key, value in island_stats(cleaned_img_2d, islands, cam_id, pixel_graph).items():
+                output_data_dict["img_cleaned_" + key] = value
 
         if kill_isolated_pixels:
             if verbose:
                 print("Kill isolated pixels")
-            cleaned_img_2d = scipy_kill_isolated_pixels(cleaned_img_2d)
+            cleaned_img_2d = islands.killed_image
 
         return cleaned_img_2d
 
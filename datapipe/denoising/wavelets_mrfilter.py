@@ -223,12 +223,11 @@ import os
 import time
 
 from datapipe.denoising.abstract_cleaning_algorithm import AbstractCleaningAlgorithm
+from datapipe.denoising.abstract_cleaning_algorithm import island_stats
 from datapipe.denoising.inverse_transform_sampling import EmpiricalDistribution
 from datapipe.io import images
 
-from pywi.image.pixel_clusters import kill_isolated_pixels as scipy_kill_isolated_pixels
-from pywi.image.pixel_clusters import kill_isolated_pixels_stats
-from pywi.image.pixel_clusters import number_of_islands
+from datapipe.image.kill_isolated_pixels import IslandAnalysis
 
 from pywi.ui.argparse_commons import add_common_arguments
 from pywi.ui.filter_with_mrfilter import add_arguments
@@ -292,6 +291,8 @@ class WaveletTransform(AbstractCleaningAlgorithm):
                     tmp_files_directory=".",       # "/Volumes/ramdisk"
                     mrfilter_directory=None,       # "/Volumes/ramdisk"
                     output_data_dict=None,
+                    cam_id=None,
+                    pixel_graph=None,
                     **kwargs):
         """Clean the `input_img` image.
 
@@ -487,21 +488,24 @@ class WaveletTransform(AbstractCleaningAlgorithm):
 
         # KILL ISOLATED PIXELS #################################
 
-        img_cleaned_islands_delta_pe, img_cleaned_islands_delta_abs_pe, img_cleaned_islands_delta_num_pixels = kill_isolated_pixels_stats(cleaned_img)
-        img_cleaned_num_islands = number_of_islands(cleaned_img)
+        # Islands are labelled once for the statistics and the kill: the
+        # labelling is timed with the kill
+        initial_time = time.perf_counter()
+        islands = IslandAnalysis(cleaned_img)
+        islands_time_sec = time.perf_counter() - initial_time
 
         if output_data_dict is not None:
-            output_data_dict["img_cleaned_islands_delta_pe"] = img_cleaned_islands_delta_pe
-            output_data_dict["img_cleaned_islands_delta_abs_pe"] = img_cleaned_islands_delta_abs_pe
-            output_data_dict["img_cleaned_islands_delta_num_pixels"] = img_cleaned_islands_delta_num_pixels
-            output_data_dict["img_cleaned_num_islands"] = img_cleaned_num_islands
+            # Hexagonal cameras: statistics on the 1D pixel graph (isolated
+            # pixels are still killed on the 2D image)
+            for key, value in island_stats(cleaned_img, islands, cam_id, pixel_graph).items():
+                output_data_dict["img_cleaned_" + key] = value
 
         if kill_isolated_pixels:
             if verbose:
                 print("Kill isolated pixels")
             initial_time = time.perf_counter()
-            cleaned_img = scipy_kill_isolated_pixels(cleaned_img)
-            exec_time_sec = time.perf_counter() - initial_time
+            cleaned_img = islands.killed_image
+            exec_time_sec = islands_time_sec + time.perf_counter() - initial_time
             if output_data_dict is not None:
                 output_data_dict["scipy_kill_isolated_pixels_time_sec"] = exec_time_sec
 
@@ -103,15 +103,14 @@ It also requires Numpy and Matplotlib Python libraries.
 import argparse
 
 from datapipe.denoising.abstract_cleaning_algorithm import AbstractCleaningAlgorithm
+from datapipe.denoising.abstract_cleaning_algorithm import island_stats
 from datapipe.denoising.inverse_transform_sampling import EmpiricalDistribution
 from datapipe.io import images
 
 from pywi.filtering import hard_filter
 from pywi.filtering.hard_filter import filter_planes
 
-from pywi.image.pixel_clusters import kill_isolated_pixels as scipy_kill_isolated_pixels
-from pywi.image.pixel_clusters import kill_isolated_pixels_stats
-from pywi.image.pixel_clusters import number_of_islands
+from datapipe.image.kill_isolated_pixels import IslandAnalysis
 
 from pywi.transform import mrtransform_wrapper
 from pywi.transform.mrtransform_wrapper import inverse_wavelet_transform
@@ -143,6 +142,8 @@ class WaveletTransform(AbstractCleaningAlgorithm):
                     noise_distribution=None,
                     tmp_files_directory=".",
                     output_data_dict=None,
+                    cam_id=None,
+                    pixel_graph=None,
                     **kwargs):
         """Clean the `input_image` image.
 
@@ -216,18 +217,16 @@ class WaveletTransform(AbstractCleaningAlgorithm):
 
         # KILL ISOLATED PIXELS ################################################
 
-        kill_islands = kill_isolated_pixels_stats(cleaned_image)
-        img_cleaned_islands_delta_pe, img_cleaned_islands_delta_abs_pe, img_cleaned_islands_delta_num_pixels = kill_islands
-        img_cleaned_num_islands = number_of_islands(cleaned_image)
+        islands = IslandAnalysis(cleaned_image)
 
         if output_data_dict is not None:
-            output_data_dict["img_cleaned_islands_delta_pe"] = img_cleaned_islands_delta_pe
-            output_data_dict["img_cleaned_islands_delta_abs_pe"] = img_cleaned_islands_delta_abs_pe
-            output_data_dict["img_cleaned_islands_delta_num_pixels"] = img_cleaned_islands_delta_num_pixels
-            output_data_dict["img_cleaned_num_islands"] = img_cleaned_num_islands
+            # Hexagonal cameras: statistics on the 1D pixel graph (isolated
+            # pixels are still killed on the 2D image)
+            for key, value in island_stats(cleaned_image, islands, cam_id, pixel_graph).items():
+                output_data_dict["img_cleaned_" + key] = value
 
         if kill_isolated_pixels:
-            cleaned_image = scipy_kill_isolated_pixels(cleaned_image)
+            cleaned_image = islands.killed_image
             if DEBUG:
                 images.plot(cleaned_image, "Cleaned image after island kill")
 
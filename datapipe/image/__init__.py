@@ -21,5 +21,7 @@
 # THE SOFTWARE.
 
 __all__ = ['hillas_parameters',
+           'kill_isolated_pixels',
+           'pixel_graph',
            'signal_to_border_distance']
 
@@ -20,8 +20,12 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-__all__ = ['get_hillas_parameters']
+__all__ = ['HILLAS_FIELDS',
+           'HILLAS_DTYPE',
+           'get_hillas_parameters',
+           'get_hillas_parameters_batch']
 
+from ctapipe.image.hillas import HillasParameterizationError
 from ctapipe.image.hillas import hillas_parameters_1
 from ctapipe.image.hillas import hillas_parameters_2
 from ctapipe.image.hillas import hillas_parameters_3
@@ -31,6 +35,8 @@ from ctapipe.instrument import CameraGeometry
 
 import copy
 
+import numpy as np
+
 """
 Warning: so far, this module only works with "rectangular 2D images", but it
 handle "missing pixels" (i.e. NaN values).
@@ -79,3 +85,146 @@ def get_hillas_parameters(geom: CameraGeometry, image, implementation=4):
         raise ValueError("Wrong Hillas implementation ID.")
 
     return params
+
+
+# BATCH IMPLEMENTATION ########################################################
+
+HILLAS_FIELDS = ('size',
+                 'cen_x',
+                 'cen_y',
+                 'length',
+                 'width',
+                 'r',
+                 'phi',
+                 'psi',
+                 'miss',
+                 'skewness',
+                 'kurtosis')
+
+HILLAS_DTYPE = np.dtype([(field, np.float64) for field in HILLAS_FIELDS])
+
+def _pixels_position(geom):
+    """Return plain float arrays (without astropy units) of pixels position."""
+
+    if isinstance(geom, CameraGeometry):
+        pix_x, pix_y = geom.pix_x, geom.pix_y
+    else:
+        pix_x, pix_y = geom
+
+    pix_x = np.asarray(getattr(pix_x, "value", pix_x), dtype=np.float64)
+    pix_y = np.asarray(getattr(pix_y, "value", pix_y), dtype=np.float64)
+
+    return pix_x, pix_y
+
+def get_hillas_parameters_batch(geom, images, raise_on_empty=False):
+    r"""Return Hillas parameters of a stack of 1D images.
+
+    This is a vectorized version of ctapipe's ``hillas_parameters_2`` (same
+    formulas) working on plain Numpy arrays: all the moments of all images
+    are computed at once with matrix products and values are returned without
+    astropy Quantity (lengths are in the unit of pixels position, i.e. meters
+    for ctapipe geometries, and angles are in radians).
+
+    Non finite pixels (NaN) are ignored like in ``hillas_parameters_2``.
+
+    Parameters
+    ----------
+    geom : CameraGeometry or tuple of 1D arrays
+        The geometry of the images or directly the ``(pix_x, pix_y)``
+        pixels position (e.g. cached once per camera).
+    images : Numpy array
+        The 1D images to parametrize (shape (npix,) or (N, npix)).
+    raise_on_empty : bool
+        If ``True``, raise a ``HillasParameterizationError`` when an image has
+        a null size (like ctapipe does); otherwise all parameters of this
+        image are set to NaN (and its size to 0).
+
+    Returns
+    -------
+    Numpy structured array
+        Hillas parameters (fields: `HILLAS_FIELDS`, dtype: `HILLAS_DTYPE`)
+        of each image. The array shape is the shape of `images` without the
+        last (pixels) dimension.
+    """
+
+    pix_x, pix_y = _pixels_position(geom)
+
+    images = np.asarray(images, dtype=np.float64)
+    leading_shape = images.shape[:-1]
+    images = images.reshape((-1, images.shape[-1]))
+
+    # Masked pixels (NaN) don't contribute to moments
+    images = np.where(np.isfinite(images), images, 0.)
+
+    size = images.sum(axis=1)
+
+    if raise_on_empty and np.any(size == 0.):
+        raise HillasParameterizationError(("Empty pixels!"
+                                           "Cannot calculate image parameters."
+                                           "Exiting..."))
+
+    params = np.empty(images.shape[0], dtype=HILLAS_DTYPE)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+
+        # First and second order moments of all images (one matrix product)
+
+        momdata = np.stack([pix_x, pix_y, pix_x * pix_x, pix_y * pix_y, pix_x * pix_y], axis=1)
+        moms = np.dot(images, momdata) / size[:, np.newaxis]
+
+        mean_x, mean_y = moms[:, 0], moms[:, 1]
+
+        vx2 = moms[:, 2] - mean_x ** 2
+        vy2 = moms[:, 3] - mean_y ** 2
+        vxy = moms[:, 4] - mean_x * mean_y
+
+        # common factors
+
+        dd = vy2 - vx2
+        zz = np.sqrt(dd ** 2 + 4.0 * vxy ** 2)
+
+        # miss
+
+        uu = 1.0 + dd / zz
+        vv = 2.0 - uu
+        miss = np.sqrt((uu * mean_x ** 2 + vv * mean_y ** 2) / 2.0
+                       - mean_x * mean_y * 2.0 * vxy / zz)
+
+        # shower shape parameters
+
+        width = np.sqrt(vx2 + vy2 - zz)
+        length = np.sqrt(vx2 + vy2 + zz)
+
+        # rotation angle of ellipse relative to centroid
+
+        tanpsi_numer = (dd + zz) * mean_y + 2.0 * vxy * mean_x
+        tanpsi_denom = (2. * vxy * mean_y) - (dd - zz) * mean_x
+        psi = (np.pi / 2.0) + np.arctan2(tanpsi_numer, tanpsi_denom)
+
+        # polar coordinates of centroid
+
+        r = np.hypot(mean_x, mean_y)
+        phi = np.arctan2(mean_y, mean_x)
+
+        # higher order moments (along the major axis of the ellipse)
+
+        delta = np.arctan2(dd + zz, 2.0 * vxy)
+        longi = (np.cos(delta)[:, np.newaxis] * (pix_x - mean_x[:, np.newaxis])
+                 + np.sin(delta)[:, np.newaxis] * (pix_y - mean_y[:, np.newaxis]))
+
+        skewness = np.einsum('ij,ij->i', images, longi ** 3) / size / length ** 3
+        kurtosis = np.einsum('ij,ij->i', images, longi ** 4) / size / length ** 4
+
+    params['size'] = size
+    params['cen_x'] = mean_x
+    params['cen_y'] = mean_y
+    params['length'] = length
+    params['width'] = width
+    params['r'] = r
+    params['phi'] = phi
+    params['psi'] = psi
+    params['miss'] = miss
+    params['skewness'] = skewness
+    params['kurtosis'] = kurtosis
+
+    return params.reshape(leading_shape)
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+Remove the isolated pixels ("islands" that don't contain the main signal) of
+an image.
+
+Functions of this module work either on 2D images (islands are 4-connected
+pixels) or, when a `datapipe.image.pixel_graph.PixelGraph` is given, directly
+on ctapipe 1D images (islands are connected pixels of the camera pixel graph).
+"""
+
+__all__ = ['IslandAnalysis',
+           'kill_isolated_pixels',
+           'kill_isolated_pixels_batch',
+           'kill_isolated_pixels_stats',
+           'number_of_islands']
+
+import numpy as np
+import scipy.ndimage as ndimage
+
+class IslandAnalysis(object):
+    """The island analysis of an image.
+
+    Islands are labeled once at construction; the statistics and the cleaned
+    image (i.e. the image without isolated pixels) are then derived from this
+    single labeling.
+
+    Parameters
+    ----------
+    array : array_like
+        The image to analyse (a 2D image or, if `pixel_graph` is given, a 1D
+        image). It is not modified.
+    threshold : float or None
+        Pixels below this value are not part of any island. If ``None``, all
+        non-zero pixels are used to build islands.
+    pixel_graph : PixelGraph, optional
+        The camera pixel graph to use for 1D images (see
+        `datapipe.image.pixel_graph`).
+
+    Attributes
+    ----------
+    num_islands : int
+        The number of islands.
+    label_array : Numpy array
+        The island number (from 1 to `num_islands`) of each pixel (0 for
+        pixels that are not part of any island).
+    island_sums : Numpy array
+        The signal sum of each island (the first item is the background).
+    """
+
+    def __init__(self, array, threshold=0.2, pixel_graph=None):
+        self.image = np.array(array, dtype=np.float64)
+
+        filtered_array = np.nan_to_num(self.image, nan=0.)
+
+        if threshold is not None:
+            filtered_array[filtered_array < threshold] = 0
+
+        mask = filtered_array != 0
+
+        if pixel_graph is None:
+            self.label_array, num_labels = ndimage.label(mask)
+        else:
+            self.label_array, num_labels = pixel_graph.label(mask)
+
+        self.num_islands = int(num_labels)
+        self.island_sums = np.bincount(self.label_array.ravel(),
+                                       weights=filtered_array.ravel(),
+                                       minlength=self.num_islands + 1)
+
+        self._killed_image = None
+        self._stats = None
+
+    def _get_killed_image(self):
+        if self._killed_image is None:
+            killed_islands_mask = self.island_sums != self.island_sums.max()
+            killed_pixels_mask = killed_islands_mask[self.label_array] & np.isfinite(self.image)
+
+            self._killed_image = self.image.copy()
+            self._killed_image[killed_pixels_mask] = 0
+
+        return self._killed_image
+
+    @property
+    def killed_image(self):
+        """The image where all pixels but the brightest island(s) are set to 0
+        (NaN pixels are kept). A new array is returned at each access."""
+
+        return self._get_killed_image().copy()
+
+    @property
+    def stats(self):
+        """The ``(delta_pe, delta_abs_pe, delta_num_pixels)`` tuple."""
+
+        if self._stats is None:
+            killed_image = self._get_killed_image()
+            delta_array = self.image - killed_image
+
+            delta_pe = float(np.nansum(delta_array))
+            delta_abs_pe = float(np.nansum(np.abs(delta_array)))
+            delta_num_pixels = int(np.count_nonzero(np.nan_to_num(self.image, nan=0.)) - np.count_nonzero(np.nan_to_num(killed_image, nan=0.)))
+
+            self._stats = (delta_pe, delta_abs_pe, delta_num_pixels)
+
+        return self._stats
+
+    @property
+    def delta_pe(self):
+        """The signal sum of the removed pixels."""
+        return self.stats[0]
+
+    @property
+    def delta_abs_pe(self):
+        """The absolute signal sum of the removed pixels."""
+        return self.stats[1]
+
+    @property
+    def delta_num_pixels(self):
+        """The number of (non-zero) removed pixels."""
+        return self.stats[2]
+
+
+def kill_isolated_pixels(array, threshold=0.2, pixel_graph=None):
+    """Keep only the brightest island of `array`.
+
+    The brightest island is the island (group of connected pixels) having the
+    greatest signal sum. Other pixels are set to 0 (NaN pixels are kept).
+
+    Parameters
+    ----------
+    array : array_like
+        The image to clean (a 2D image or, if `pixel_graph` is given, a 1D
+        image).
+    threshold : float or None
+        Pixels below this value are not part of any island. If ``None``, all
+        non-zero pixels are used to build islands.
+    pixel_graph : PixelGraph, optional
+        The camera pixel graph to use for 1D images.
+
+    Returns
+    -------
+    Numpy array
+        The cleaned image (the input image is not modified).
+    """
+
+    return IslandAnalysis(array, threshold=threshold, pixel_graph=pixel_graph).killed_image
+
+
+def kill_isolated_pixels_batch(images, threshold=0.2):
+    """Apply `kill_isolated_pixels` to a stack of 2D images.
+
+    All images are labeled at once (islands never span two images) thus this
+    is much faster than calling `kill_isolated_pixels` on each image of a
+    large stack of small images. Results are the same.
+
+    Parameters
+    ----------
+    images : array_like
+        The 2D images to clean. The array shape is (..., H, W) where the
+        leading dimensions can be anything.
+    threshold : float or None
+        See `kill_isolated_pixels`.
+
+    Returns
+    -------
+    Numpy array
+        The cleaned images (the input images are not modified).
+    """
+
+    images = np.array(images, dtype=np.float64)
+    shape = images.shape
+    images = images.reshape((-1,) + shape[-2:])
+
+    filtered_images = np.nan_to_num(images, nan=0.)
+
+    if threshold is not None:
+        filtered_images[filtered_images < threshold] = 0
+
+    # 4-connected pixels of the same image (images are not connected)
+    structure = np.zeros((3, 3, 3), dtype=bool)
+    structure[1] = ndimage.generate_binary_structure(2, 1)
+
+    label_array, num_labels = ndimage.label(filtered_images != 0, structure=structure)
+
+    island_sums = np.bincount(label_array.ravel(),
+                              weights=filtered_images.ravel(),
+                              minlength=num_labels + 1)
+
+    # The image of each island and the greatest sum of each image (the
+    # background sum, i.e. 0, included like in `IslandAnalysis`)
+    island_images = np.zeros(num_labels + 1, dtype=np.intp)
+    image_index_array = np.broadcast_to(np.arange(len(images))[:, np.newaxis, np.newaxis], images.shape)
+    island_images[label_array.ravel()] = image_index_array.ravel()
+
+    max_island_sums = np.zeros(len(images))
+    np.maximum.at(max_island_sums, island_images[1:], island_sums[1:])
+
+    # The background (label 0) is killed when its sum (0) is not the greatest
+    killed_islands_mask = island_sums != max_island_sums[island_images]
+    killed_islands_mask[0] = False
+
+    killed_pixels_mask = killed_islands_mask[label_array]
+    killed_pixels_mask |= (label_array == 0) & (max_island_sums > 0)[:, np.newaxis, np.newaxis]
+    killed_pixels_mask &= np.isfinite(images)
+
+    images[killed_pixels_mask] = 0
+
+    return images.reshape(shape)
+
+
+def kill_isolated_pixels_stats(array, threshold=0.2, pixel_graph=None):
+    """Return statistics on the pixels removed by `kill_isolated_pixels`.
+
+    Parameters
+    ----------
+    array : array_like
+        The image to analyse.
+    threshold : float or None
+        See `kill_isolated_pixels`.
+    pixel_graph : PixelGraph, optional
+        The camera pixel graph to use for 1D images.
+
+    Returns
+    -------
+    tuple
+        ``(delta_pe, delta_abs_pe, delta_num_pixels)``: the signal sum, the
+        absolute signal sum and the number of the (non-zero) removed pixels.
+    """
+
+    return IslandAnalysis(array, threshold=threshold, pixel_graph=pixel_graph).stats
+
+
+def number_of_islands(array, threshold=0.2, pixel_graph=None):
+    """Return the number of islands of `array`.
+
+    Parameters
+    ----------
+    array : array_like
+        The image to analyse.
+    threshold : float or None
+        See `kill_isolated_pixels`.
+    pixel_graph : PixelGraph, optional
+        The camera pixel graph to use for 1D images.
+
+    Returns
+    -------
+    int
+        The number of islands.
+    """
+
+    return IslandAnalysis(array, threshold=threshold, pixel_graph=pixel_graph).num_islands
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+Border and island analysis of ctapipe 1D images on the camera pixel graph.
+
+Contrary to `datapipe.image.signal_to_border_distance` and to the 2D island
+analysis, this module works directly on ctapipe "1D" images (i.e. one value per
+camera pixel) thus hexagonal cameras (DigiCam, FlashCam, NectarCam, LSTCam)
+don't have to be converted to a rebinned 2D grid first.
+
+Each camera is described by its pixel neighbor graph and by the hop distance of
+each pixel to the camera edge (i.e. the minimum number of neighbor to neighbor
+moves required to reach a pixel that has less neighbors than the other pixels
+of the camera). Both are computed once per camera and cached in memory and on
+disk (see `datapipe.io.cache`).
+"""
+
+__all__ = ['PixelGraph',
+           'get_pixel_graph',
+           'signal_to_border',
+           'signal_to_border_distance',
+           'pemax_on_border']
+
+import sys
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+
+from datapipe.io import cache
+from datapipe.io import geometry_converter
+
+
+class PixelGraph(object):
+    """The pixel neighbor graph of a camera.
+
+    Parameters
+    ----------
+    indptr : array_like
+        The CSR index pointer array of the neighbor table: neighbors of the
+        pixel ``i`` are ``indices[indptr[i]:indptr[i+1]]`` (see
+        `datapipe.io.geometry_converter.get_neighbor_table`).
+    indices : array_like
+        The CSR indices array of the neighbor table.
+    cam_id : str, optional
+        The camera name.
+    edge_distance : array_like, optional
+        The hop distance of each pixel to the camera edge. It is computed from
+        the neighbor table if it is not given.
+
+    Attributes
+    ----------
+    cam_id : str
+        The camera name.
+    num_pixels : int
+        The number of pixels of the camera.
+    adjacency : scipy.sparse.csr_matrix
+        The (symmetric) adjacency matrix of the pixels.
+    edge_distance : 1D ndarray of int
+        The hop distance of each pixel to the camera edge (0 for pixels on the
+        edge).
+    """
+
+    def __init__(self, indptr, indices, cam_id=None, edge_distance=None):
+        indptr = np.asarray(indptr, dtype=np.intp)
+        indices = np.asarray(indices, dtype=np.intp)
+
+        self.cam_id = cam_id
+        self.num_pixels = len(indptr) - 1
+
+        adjacency = sparse.csr_matrix((np.ones(len(indices), dtype=np.int8), indices, indptr),
+                                      shape=(self.num_pixels, self.num_pixels))
+        self.adjacency = ((adjacency + adjacency.T) > 0).tocsr()
+
+        if edge_distance is None:
+            edge_distance = self._compute_edge_distance()
+
+        self.edge_distance = np.asarray(edge_distance, dtype=np.intp)
+        self.edge_distance.flags.writeable = False
+
+    def _compute_edge_distance(self):
+        """Compute the hop distance of each pixel to the camera edge (breadth-first search)."""
+
+        num_neighbors = np.diff(self.adjacency.indptr)
+        edge_distance = np.full(self.num_pixels, -1, dtype=np.intp)
+
+        # Pixels on the edge of the camera (or next to a gap between modules)
+        # have less neighbors than the other pixels
+        frontier = num_neighbors < num_neighbors.max(initial=0)
+        distance = 0
+
+        while frontier.any():
+            edge_distance[frontier] = distance
+            frontier = (self.adjacency.dot(frontier.astype(np.int8)) > 0) & (edge_distance < 0)
+            distance += 1
+
+        # Pixels that cannot reach the edge (e.g. a camera without edge)
+        edge_distance[edge_distance < 0] = 0
+
+        return edge_distance
+
+    def label(self, mask):
+        """Label the connected components ("islands") of the selected pixels.
+
+        This is the 1D counterpart of `scipy.ndimage.label`.
+
+        Parameters
+        ----------
+        mask : array_like of bool
+            The 1D array of the selected pixels.
+
+        Returns
+        -------
+        tuple
+            ``(label_array, num_labels)`` where ``label_array`` is a 1D array
+            of int giving the island number (from 1 to ``num_labels``) of each
+            selected pixel and 0 for other pixels.
+        """
+
+        mask = np.asarray(mask, dtype=np.bool_)
+        label_array = np.zeros(self.num_pixels, dtype=np.intp)
+
+        selected_pixels = np.flatnonzero(mask)
+
+        if selected_pixels.size == 0:
+            return label_array, 0
+
+        sub_adjacency = self.adjacency[selected_pixels][:, selected_pixels]
+        num_labels, sub_labels = csgraph.connected_components(sub_adjacency, directed=False)
+        label_array[selected_pixels] = sub_labels + 1
+
+        return label_array, num_labels
+
+
+def get_pixel_graph(cam_id):
+    """Return the `cam_id` pixel neighbor graph.
+
+    The graph is built on the first call and then kept in memory and on disk
+    (see `datapipe.io.cache`).
+
+    Parameters
+    ----------
+    cam_id : str
+        The camera name.
+
+    Returns
+    -------
+    PixelGraph
+        The `cam_id` pixel graph.
+    """
+
+    pixel_graph_module = sys.modules[__name__]
+    var_name = "_pixel_graph_" + cam_id
+
+    if not hasattr(pixel_graph_module, var_name):
+        indptr, indices = geometry_converter.get_neighbor_table(cam_id)
+        edge_distance = cache.load_camera_cache(cam_id).get("pixel_graph_edge_distance")
+
+        if (edge_distance is not None) and (len(edge_distance) != len(indptr) - 1):
+            edge_distance = None   # Incompatible cache file: rebuild it
+
+        pixel_graph = PixelGraph(indptr, indices, cam_id=cam_id, edge_distance=edge_distance)
+
+        if edge_distance is None:
+            cache.update_camera_cache(cam_id, {"pixel_graph_edge_distance": pixel_graph.edge_distance})
+
+        setattr(pixel_graph_module, var_name, pixel_graph)
+
+    return getattr(pixel_graph_module, var_name)
+
+
+def _ring_sums(image, pixel_graph):
+    """Return the signal sum of each ring of pixels at the same distance from the camera edge."""
+
+    image = np.asarray(image, dtype=np.float64)
+
+    if image.shape != (pixel_graph.num_pixels,):
+        raise ValueError("The image shape {} doesn't match the number of pixels of the camera ({})".format(image.shape, pixel_graph.num_pixels))
+
+    return np.bincount(pixel_graph.edge_distance,
+                       weights=np.nan_to_num(image, nan=0.))
+
+
+def signal_to_border(image, pixel_graph):
+    """Return the signal sum of the image successively shrunk by one pixel.
+
+    This is the 1D counterpart of
+    `datapipe.image.signal_to_border_distance.signal_to_border`: the first item
+    is the sum of all pixels, the second item is the sum of the pixels that are
+    not on the camera edge, and so on. NaN pixels are ignored.
+
+    Parameters
+    ----------
+    image : array_like
+        The 1D image to analyse.
+    pixel_graph : PixelGraph
+        The camera pixel graph (see `get_pixel_graph`).
+
+    Returns
+    -------
+    list
+        The list of the signal sum of each shrunk image.
+    """
+
+    ring_sums = _ring_sums(image, pixel_graph)
+    res = np.cumsum(ring_sums[::-1])[::-1]
+
+    return [float(pe) for pe in res]
+
+
+def signal_to_border_distance(image, pixel_graph):
+    """Return the distance (in pixels) between the signal and the camera edge.
+
+    This is the 1D counterpart of
+    `datapipe.image.signal_to_border_distance.signal_to_border_distance`.
+
+    Parameters
+    ----------
+    image : array_like
+        The 1D image to analyse.
+    pixel_graph : PixelGraph
+        The camera pixel graph (see `get_pixel_graph`).
+
+    Returns
+    -------
+    int
+        The distance between the signal and the camera edge.
+    """
+
+    ring_sums = _ring_sums(image, pixel_graph)
+
+    dist = 0
+    cumulated_pe = 0.
+
+    for pe in ring_sums[:-1]:
+        cumulated_pe += pe
+        if cumulated_pe != 0.:
+            break
+        dist += 1
+
+    return dist
+
+
+def pemax_on_border(image, pixel_graph):
+    """Return the maximum value of the pixels on the camera edge.
+
+    This is the 1D counterpart of
+    `datapipe.image.signal_to_border_distance.pemax_on_border`.
+
+    Parameters
+    ----------
+    image : array_like
+        The 1D image to analyse.
+    pixel_graph : PixelGraph
+        The camera pixel graph (see `get_pixel_graph`).
+
+    Returns
+    -------
+    float or None
+        The maximum value of the pixels on the camera edge (``None`` if it
+        cannot be computed).
+    """
+
+    try:
+        image = np.asarray(image, dtype=np.float64)
+        res = float(np.nanmax(image[pixel_graph.edge_distance == 0]))
+    except:
+        res = None
+
+    return res
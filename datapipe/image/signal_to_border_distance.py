@@ -26,60 +26,119 @@ __all__ = ['signal_to_border',
 
 import math
 import numpy as np
+from scipy import ndimage
 
 """
 Warning: so far, this module only works with "rectangular 2D images".
 """
 
-def signal_to_border(img):
-    """
-    TODO
+def _ring_sums(img):
+    """Return the sum of the signal of each "ring" of `img`.
+
+    The ring index of a valid (i.e. finite) pixel is its chessboard distance
+    to the nearest invalid pixel or to the image frame, minus one: pixels on
+    the border of the valid area are in ring 0, their inner neighbors in ring
+    1 and so on. A single distance transform thus replaces the successive
+    erosions of the valid area.
+
+    Parameters
+    ----------
+    img : array_like
+        The 2D image to analyse (NaN pixels are considered as invalid pixels).
+
+    Returns
+    -------
+    Numpy array
+        The 1D array of the signal sum of each ring (from the outer ring to the
+        inner ring).
     """
 
-    res = []
+    img = np.asanyarray(img)
 
-    # make a bigger array
-    em = np.zeros(np.array(img.shape) + 2)
-    em = em.astype("bool")
-    em[1:-1,1:-1] = np.isfinite(img)
+    # Pad the mask with invalid pixels so that the image frame is a border too
+    valid_mask = np.zeros(np.array(img.shape) + 2, dtype=np.bool_)
+    valid_mask[1:-1,1:-1] = np.isfinite(img)
 
-    while em.any():
+    distance_map = ndimage.distance_transform_cdt(valid_mask, metric="chessboard")[1:-1,1:-1]
 
-        # Get the pixel sum of the shrinked image
-        res.append(float(np.nansum(img[em[1:-1,1:-1]])))
+    valid_pixels = valid_mask[1:-1,1:-1]
+    ring_index = distance_map[valid_pixels] - 1
 
-        emt = em.copy()
+    if ring_index.size == 0:
+        return np.zeros(0)
 
-        # "shrink" the "True" area in the mask by moving it in all directions, taking the logical 'AND'
-        em[1:  ,1:]   &= emt[0:-1,0:-1]
-        em[0:-1,0:-1] &= emt[1:,1:]
-        em[1:  ,0:-1] &= emt[0:-1,1:]
-        em[0:-1,1:]   &= emt[1:,0:-1]
+    return np.bincount(ring_index,
+                       weights=img[valid_pixels].astype(np.float64, copy=False),
+                       minlength=ring_index.max() + 1)
 
-        em[0:-1,:]    &= emt[1:  ,:]
-        em[1:  ,:]    &= emt[0:-1,:]
-        em[:   ,0:-1] &= emt[:   ,1:]
-        em[:   ,1:]   &= emt[:   ,0:-1]
 
-    return res
+def signal_to_border(img):
+    """Return the signal sum of the image successively shrunk by one pixel.
+
+    The first item is the sum of all (finite) pixels, the second item is the
+    sum of the pixels that are not on the border of the valid area, and so on
+    until the valid area is empty.
+
+    Parameters
+    ----------
+    img : array_like
+        The 2D image to analyse (NaN pixels are ignored and are considered as
+        a border).
+
+    Returns
+    -------
+    list
+        The list of the signal sum of each shrunk image (an empty list if the
+        image has no valid pixel).
+    """
+
+    ring_sums = _ring_sums(img)
+
+    # The sum of the k-th shrunk image is the sum of the rings k, k+1, ...
+    res = np.cumsum(ring_sums[::-1])[::-1]
+
+    return [float(pe) for pe in res]
 
 
 def signal_to_border_distance(img):
-    """
-    TODO
+    """Return the distance (in pixels) between the signal and the border.
+
+    This is the number of times the image can be shrunk by one pixel without
+    changing its signal sum (i.e. the number of outer rings whose cumulated
+    signal is null). It is computed from the same ring sums as
+    `signal_to_border` (one distance transform and one `np.bincount` for the
+    whole image).
+
+    Parameters
+    ----------
+    img : array_like
+        The 2D image to analyse (NaN pixels are ignored and are considered as
+        a border).
+
+    Returns
+    -------
+    int
+        The distance between the signal and the border of the image.
+
+    Raises
+    ------
+    ValueError
+        If the image has no valid pixel.
     """
 
-    res = signal_to_border(img)
+    ring_sums = _ring_sums(img)
 
-    sum_pe_img = res[0]
+    if ring_sums.size == 0:
+        raise ValueError("The image has no valid (finite) pixel")
 
     dist = 0
+    cumulated_pe = 0.
 
-    for pe in res[1:]:
-        if pe == sum_pe_img:
-            dist += 1
-        else:
+    for pe in ring_sums[:-1]:
+        cumulated_pe += pe
+        if cumulated_pe != 0.:
             break
+        dist += 1
 
     return dist
 
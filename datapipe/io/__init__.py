@@ -20,6 +20,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-__all__ = ['geometry_converter',
+__all__ = ['cache',
+           'geometry_converter',
            'images',
            'simtel']
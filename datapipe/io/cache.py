@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+Persistent on-disk cache of camera products (geometries, neighbor tables,
+1D/2D conversion index maps, ...).
+
+Each camera has its own ".npz" file in the cache directory. Files are named
+after the ctapipe version and the cache format version (`CACHE_VERSION`) thus
+they are ignored (and rebuilt) when ctapipe is updated.
+
+The cache directory is (by order of priority):
+
+- the `DATAPIPE_CACHE_DIR` environment variable;
+- `$XDG_CACHE_HOME/datapipe`;
+- `~/.cache/datapipe`.
+
+Setting `DATAPIPE_CACHE_DIR` to an empty string disables the cache.
+"""
+
+__all__ = ['CACHE_VERSION',
+           'cache_dir',
+           'camera_cache_path',
+           'load_camera_cache',
+           'update_camera_cache']
+
+import os
+import tempfile
+
+import numpy as np
+
+# Increment this number when the content or the layout of cache files changes
+CACHE_VERSION = 1
+
+def _ctapipe_version():
+    """Return the installed ctapipe version (ctapipe is only imported when
+    the cache is actually used)."""
+
+    import ctapipe
+    return ctapipe.__version__
+
+
+def cache_dir():
+    """Return the cache directory path (or ``None`` if the cache is disabled)."""
+
+    if "DATAPIPE_CACHE_DIR" in os.environ:
+        path = os.environ["DATAPIPE_CACHE_DIR"]
+        if path == "":
+            return None
+    elif os.environ.get("XDG_CACHE_HOME", "") != "":
+        path = os.path.join(os.environ["XDG_CACHE_HOME"], "datapipe")
+    else:
+        path = os.path.join("~", ".cache", "datapipe")
+
+    return os.path.expanduser(path)
+
+
+def camera_cache_path(cam_id):
+    """Return the path of the `cam_id` cache file (or ``None`` if the cache is disabled)."""
+
+    directory_path = cache_dir()
+
+    if directory_path is None:
+        return None
+
+    file_name = "{}.ctapipe-{}.v{}.npz".format(cam_id, _ctapipe_version(), CACHE_VERSION)
+
+    return os.path.join(directory_path, file_name)
+
+
+def load_camera_cache(cam_id):
+    """Return the arrays cached for `cam_id`.
+
+    Parameters
+    ----------
+    cam_id : str
+        The camera name.
+
+    Returns
+    -------
+    dict
+        A dictionary of Numpy arrays. It is empty if there is no (valid) cache
+        file for `cam_id`.
+    """
+
+    file_path = camera_cache_path(cam_id)
+
+    if (file_path is None) or (not os.path.isfile(file_path)):
+        return {}
+
+    try:
+        with np.load(file_path, allow_pickle=False) as npz_file:
+            arrays_dict = {key: npz_file[key] for key in npz_file.files}
+    except (OSError, ValueError):
+        # Corrupted or unreadable file: it will be rewritten
+        return {}
+
+    if str(arrays_dict.get("ctapipe_version")) != _ctapipe_version():
+        return {}
+
+    return arrays_dict
+
+
+def update_camera_cache(cam_id, arrays_dict):
+    """Add `arrays_dict` to the `cam_id` cache file.
+
+    Arrays already in the cache file and not in `arrays_dict` are kept. The
+    file is written atomically thus concurrent processes (e.g. pool workers)
+    never read a partially written file. Errors (e.g. a read only cache
+    directory) are silently ignored: the cache is only an optimization.
+
+    Parameters
+    ----------
+    cam_id : str
+        The camera name.
+    arrays_dict : dict
+        The arrays to cache (anything accepted by `numpy.savez`; object arrays
+        are not allowed).
+    """
+
+    file_path = camera_cache_path(cam_id)
+
+    if file_path is None:
+        return
+
+    new_arrays_dict = load_camera_cache(cam_id)
+    new_arrays_dict.update(arrays_dict)
+    new_arrays_dict["ctapipe_version"] = np.array(_ctapipe_version())
+
+    try:
+        directory_path = os.path.dirname(file_path)
+        os.makedirs(directory_path, exist_ok=True)
+
+        fd, tmp_file_path = tempfile.mkstemp(suffix=".npz", dir=directory_path)
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                np.savez(tmp_file, **new_arrays_dict)
+            os.replace(tmp_file_path, file_path)
+        except:
+            os.remove(tmp_file_path)
+            raise
+    except OSError:
+        pass
@@ -20,9 +20,19 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-__all__ = ['get_geom1d',
+__all__ = ['IndexMap',
+           'get_geom1d',
+           'get_index_map',
+           'get_neighbor_table',
            'image_2d_to_1d',
-           'image_1d_to_2d']
+           'image_1d_to_2d',
+           'images_2d_to_1d',
+           'images_1d_to_2d']
+
+import collections
+
+import astropy.units as u
+from astropy.coordinates import Angle
 
 import ctapipe.image.geometry_converter as geomconv
 from ctapipe.instrument import camera
@@ -30,17 +40,64 @@ from ctapipe.instrument import camera
 import numpy as np
 import sys
 
+from datapipe.io import cache
+
 """
 Convert the 2D array image format used by the wavelet image cleaning to the
 1D array image format used by ctapipe.
 """
 
+def _geom_to_cache_arrays(geom1d):
+    """Return the arrays required to rebuild `geom1d` (see `_cache_arrays_to_geom`)."""
+
+    neighbors = geom1d.neighbors
+    neighbors_indptr = np.cumsum([0] + [len(pixel_neighbors) for pixel_neighbors in neighbors])
+    neighbors_indices = np.array([index for pixel_neighbors in neighbors for index in pixel_neighbors], dtype=np.intp)
+
+    return {"geom_pix_id": np.asarray(geom1d.pix_id),
+            "geom_pix_x": geom1d.pix_x.to(u.m).value,
+            "geom_pix_y": geom1d.pix_y.to(u.m).value,
+            "geom_pix_area": geom1d.pix_area.to(u.m**2).value,
+            "geom_pix_type": np.array(geom1d.pix_type),
+            "geom_pix_rotation": np.array(Angle(geom1d.pix_rotation).to(u.deg).value),
+            "geom_cam_rotation": np.array(Angle(geom1d.cam_rotation).to(u.deg).value),
+            "geom_neighbors_indptr": neighbors_indptr,
+            "geom_neighbors_indices": neighbors_indices}
+
+def _cache_arrays_to_geom(cam_id, arrays_dict):
+    """Rebuild a camera geometry from cached arrays (``None`` if not cached)."""
+
+    if "geom_pix_x" not in arrays_dict:
+        return None
+
+    indptr = arrays_dict["geom_neighbors_indptr"]
+    indices = arrays_dict["geom_neighbors_indices"]
+    neighbors = [indices[indptr[pixel]:indptr[pixel + 1]].tolist() for pixel in range(len(indptr) - 1)]
+
+    # Cached positions are already derotated (and the cached rotation angles
+    # are the ones of the derotated geometry) thus ctapipe's derotation is a
+    # no-op here
+    geom1d = camera.CameraGeometry(cam_id=cam_id,
+                                   pix_id=arrays_dict["geom_pix_id"],
+                                   pix_x=arrays_dict["geom_pix_x"] * u.m,
+                                   pix_y=arrays_dict["geom_pix_y"] * u.m,
+                                   pix_area=arrays_dict["geom_pix_area"] * u.m**2,
+                                   pix_type=str(arrays_dict["geom_pix_type"]),
+                                   pix_rotation=Angle(float(arrays_dict["geom_pix_rotation"]), u.deg),
+                                   cam_rotation=Angle(float(arrays_dict["geom_cam_rotation"]), u.deg),
+                                   neighbors=neighbors)
+
+    return geom1d
+
 def get_geom1d(cam_id):
     """Return the `cam_id` geometry for ctapipe.
 
     Use `camera.CameraGeometry.get_known_camera_names()` to get the list of
     available cameras.
 
+    Geometries are cached in memory and on disk (see `datapipe.io.cache`)
+    thus ctapipe geometry loading is only done once per ctapipe version.
+
     Parameters
     ----------
     cam_id: str
@@ -62,17 +119,56 @@ def get_geom1d(cam_id):
 
     else:
 
-        camera_names = camera.CameraGeometry.get_known_camera_names()
+        try:
+            geom1d = _cache_arrays_to_geom(cam_id, cache.load_camera_cache(cam_id))
+        except Exception:
+            geom1d = None   # Incompatible cache file: rebuild it
+
+        if geom1d is None:
+            camera_names = camera.CameraGeometry.get_known_camera_names()
+
+            if cam_id not in camera_names:
+                error_str = "Unknown camera name {}. Should be one of: {}.".format(cam_id, ", ".join(camera_names))
+                raise ValueError(error_str)
 
-        if cam_id not in camera_names:
-            error_str = "Unknown camera name {}. Should be one of: {}.".format(cam_id, ", ".join(camera_names))
-            raise ValueError(error_str)
+            geom1d = camera.CameraGeometry.from_name(cam_id)
+            cache.update_camera_cache(cam_id, _geom_to_cache_arrays(geom1d))
 
-        geom1d = camera.CameraGeometry.from_name(cam_id)
         setattr(geometry_converter_module, var_name, geom1d)
 
     return geom1d
 
+def get_neighbor_table(cam_id):
+    """Return the `cam_id` pixels neighbors table in a compressed form.
+
+    Neighbors of the 1D pixel ``i`` are ``indices[indptr[i]:indptr[i+1]]``
+    (this is the CSR layout used by `scipy.sparse`).
+
+    Parameters
+    ----------
+    cam_id: str
+        The instrument name.
+
+    Returns
+    -------
+    tuple of 1D ndarray
+        The ``(indptr, indices)`` arrays.
+    """
+
+    geometry_converter_module = sys.modules[__name__]
+    var_name = "_neighbor_table_" + cam_id
+
+    if not hasattr(geometry_converter_module, var_name):
+        arrays_dict = cache.load_camera_cache(cam_id)
+
+        if "geom_neighbors_indptr" not in arrays_dict:
+            arrays_dict = _geom_to_cache_arrays(get_geom1d(cam_id))
+
+        neighbor_table = (arrays_dict["geom_neighbors_indptr"], arrays_dict["geom_neighbors_indices"])
+        setattr(geometry_converter_module, var_name, neighbor_table)
+
+    return getattr(geometry_converter_module, var_name)
+
 def get_geom2d(cam_id):
     """TODO!!!!!!!!!!!!!
 
@@ -129,6 +225,198 @@ def get_geom2d(cam_id):
 
     return geom2d
 
+# INDEX MAPS ##################################################################
+
+# Conversions between 1D and 2D images are pure pixels permutations: each 1D
+# pixel is written in one cell of the 2D image (the other cells are either 0
+# or NaN for blank pixels) and each 1D pixel is read from one cell of the 2D
+# image. These permutations are compiled once per camera (by probing the
+# ctapipe converters) into integer index arrays thus a conversion is a single
+# numpy gather/scatter operation.
+
+IndexMap = collections.namedtuple('IndexMap', ('cam_id',
+                                               'num_pixels',       # number of 1D pixels
+                                               'shape_2d',         # shape of 2D images
+                                               'template_2d',      # 2D image of a null 1D image (0 or NaN cells)
+                                               'pixel_index',      # 1D pixels written in 2D images...
+                                               'cell_index',       # ... and their (flat) position in 2D images
+                                               'gather_index'))    # (flat) 2D position read for each 1D pixel
+
+def _image_1d_to_2d_ctapipe(image1d, cam_id):
+    """Convert a 1D image to 2D with ctapipe converters (reference implementation)."""
+
+    if cam_id in ("DigiCam", "NectarCam", "FlashCam", "LSTCam"):
+        geom1d = get_geom1d(cam_id)
+        rotation = 0  # TODO: should be avoided...
+        geom2d, image2d = geomconv.convert_geometry_hex1d_to_rect2d(geom1d,
+                                                                    image1d,
+                                                                    cam_id + str(rotation),
+                                                                    add_rot=rotation) # TODO
+    elif cam_id == "ASTRICam":
+        image2d = geomconv.astri_to_2d_array(image1d)
+    elif cam_id == "CHEC":
+        image2d = geomconv.chec_to_2d_array(image1d)
+    else:
+        raise ValueError("1D to 2D image converter: unknown camera {}.".format(cam_id))
+
+    return image2d
+
+def _image_2d_to_1d_ctapipe(image2d, cam_id):
+    """Convert a 2D image to 1D with ctapipe converters (reference implementation)."""
+
+    if cam_id in ("DigiCam", "NectarCam", "FlashCam", "LSTCam"):
+        geom1d = get_geom1d(cam_id)
+        rotation = 0  # TODO: should be avoided...
+        _, image1d = geomconv.convert_geometry_rect2d_back_to_hexe1d(geom1d,
+                                                                     image2d,
+                                                                     cam_id + str(rotation),
+                                                                     add_rot=rotation) # TODO
+    elif cam_id == "ASTRICam":
+        image1d = geomconv.array_2d_to_astri(image2d)
+    elif cam_id == "CHEC":
+        image1d = geomconv.array_2d_to_chec(image2d)
+    else:
+        raise ValueError("2D to 1D image converter: unknown camera {}.".format(cam_id))
+
+    return image1d
+
+def _compile_index_map(cam_id):
+    """Compile the `cam_id` index map by probing the ctapipe converters.
+
+    Returns ``None`` if the ctapipe converters are not a pixel permutation for
+    this camera (the check is made on random images); the ctapipe converters
+    are then used as is.
+    """
+
+    num_pixels = len(get_geom1d(cam_id).pix_x)
+
+    # 1D -> 2D: each 1D pixel is tagged with its index + 1
+
+    template_2d = np.array(_image_1d_to_2d_ctapipe(np.zeros(num_pixels), cam_id), dtype=np.float64)
+    probe_2d = np.array(_image_1d_to_2d_ctapipe(np.arange(1, num_pixels + 1, dtype=np.float64), cam_id), dtype=np.float64)
+
+    shape_2d = probe_2d.shape
+    flat_probe_2d = np.nan_to_num(probe_2d.ravel())
+
+    cell_index = np.flatnonzero(flat_probe_2d != 0)
+    pixel_index = np.rint(flat_probe_2d[cell_index]).astype(np.intp) - 1
+
+    # 2D -> 1D: each 2D cell is tagged with its (flat) index + 1
+
+    probe_1d = np.array(_image_2d_to_1d_ctapipe(np.arange(1, probe_2d.size + 1, dtype=np.float64).reshape(shape_2d), cam_id), dtype=np.float64)
+    gather_index = np.rint(np.nan_to_num(probe_1d)).astype(np.intp) - 1
+
+    if (pixel_index.min(initial=0) < 0) or (pixel_index.max(initial=0) >= num_pixels) or np.any(gather_index < 0):
+        return None
+
+    index_map = IndexMap(cam_id=cam_id,
+                         num_pixels=num_pixels,
+                         shape_2d=shape_2d,
+                         template_2d=template_2d,
+                         pixel_index=pixel_index,
+                         cell_index=cell_index,
+                         gather_index=gather_index)
+
+    # Check the compiled map against ctapipe on random images
+
+    rng = np.random.RandomState(0)
+
+    random_1d = rng.uniform(1., 2., num_pixels)
+    expected_2d = np.array(_image_1d_to_2d_ctapipe(random_1d, cam_id), dtype=np.float64)
+
+    random_2d = rng.uniform(1., 2., shape_2d)
+    expected_1d = np.array(_image_2d_to_1d_ctapipe(random_2d, cam_id), dtype=np.float64)
+
+    if not (np.array_equal(_scatter_1d_to_2d(random_1d, index_map), expected_2d, equal_nan=True) and
+            np.array_equal(_gather_2d_to_1d(random_2d, index_map), expected_1d, equal_nan=True)):
+        return None
+
+    return index_map
+
+def _index_map_to_cache_arrays(index_map):
+    if index_map is None:
+        return {"index_map_compiled": np.array(False)}
+
+    return {"index_map_compiled": np.array(True),
+            "index_map_num_pixels": np.array(index_map.num_pixels),
+            "index_map_shape_2d": np.array(index_map.shape_2d),
+            "index_map_template_2d": index_map.template_2d,
+            "index_map_pixel_index": index_map.pixel_index,
+            "index_map_cell_index": index_map.cell_index,
+            "index_map_gather_index": index_map.gather_index}
+
+def _cache_arrays_to_index_map(cam_id, arrays_dict):
+    if not bool(arrays_dict["index_map_compiled"]):
+        return None
+
+    return IndexMap(cam_id=cam_id,
+                    num_pixels=int(arrays_dict["index_map_num_pixels"]),
+                    shape_2d=tuple(int(length) for length in arrays_dict["index_map_shape_2d"]),
+                    template_2d=arrays_dict["index_map_template_2d"],
+                    pixel_index=arrays_dict["index_map_pixel_index"],
+                    cell_index=arrays_dict["index_map_cell_index"],
+                    gather_index=arrays_dict["index_map_gather_index"])
+
+def get_index_map(cam_id):
+    """Return the `cam_id` index map used to convert 1D and 2D images.
+
+    The map is compiled on the first call and then kept in memory and on disk
+    (see `datapipe.io.cache`).
+
+    Parameters
+    ----------
+    cam_id: str
+        The instrument name.
+
+    Returns
+    -------
+    IndexMap or None
+        The `cam_id` index map or ``None`` if the ctapipe converters for
+        `cam_id` cannot be compiled into an index map.
+    """
+
+    geometry_converter_module = sys.modules[__name__]
+    var_name = "_index_map_" + cam_id
+
+    if hasattr(geometry_converter_module, var_name):
+
+        index_map = getattr(geometry_converter_module, var_name)
+
+    else:
+
+        if cam_id not in ("DigiCam", "NectarCam", "FlashCam", "LSTCam", "ASTRICam", "CHEC"):
+            raise ValueError("Image converter: unknown camera {}.".format(cam_id))
+
+        arrays_dict = cache.load_camera_cache(cam_id)
+
+        if "index_map_compiled" in arrays_dict:
+            index_map = _cache_arrays_to_index_map(cam_id, arrays_dict)
+        else:
+            index_map = _compile_index_map(cam_id)
+            cache.update_camera_cache(cam_id, _index_map_to_cache_arrays(index_map))
+
+        setattr(geometry_converter_module, var_name, index_map)
+
+    return index_map
+
+def _scatter_1d_to_2d(images1d, index_map):
+    """Convert 1D images of shape (..., num_pixels) to 2D images of shape (..., H, W)."""
+    images1d = np.asarray(images1d)
+    leading_shape = images1d.shape[:-1]
+
+    images2d = np.empty(leading_shape + (index_map.template_2d.size,), dtype=np.float64)
+    images2d[...] = index_map.template_2d.reshape(-1)
+    images2d[..., index_map.cell_index] = images1d[..., index_map.pixel_index]
+
+    return images2d.reshape(leading_shape + index_map.shape_2d)
+
+def _gather_2d_to_1d(images2d, index_map):
+    """Convert 2D images of shape (..., H, W) to 1D images of shape (..., num_pixels)."""
+    images2d = np.asarray(images2d)
+    leading_shape = images2d.shape[:-2]
+
+    return np.take(images2d.reshape(leading_shape + (-1,)), index_map.gather_index, axis=-1)
+
 def image_2d_to_1d(image2d, cam_id):
     """Convert a wavelet compatible 2D image to a ctapipe compliant 1D image.
 
@@ -148,22 +436,12 @@ def image_2d_to_1d(image2d, cam_id):
         The converted image in its 1D version compliant with ctapipe.
     """
 
-    geom1d = get_geom1d(cam_id)  # TODO: should be avoided...
+    index_map = get_index_map(cam_id)
 
-    if cam_id in ("DigiCam", "NectarCam", "FlashCam", "LSTCam"):
-        rotation = 0  # TODO: should be avoided...
-        _, image1d = geomconv.convert_geometry_rect2d_back_to_hexe1d(geom1d,
-                                                                     image2d,
-                                                                     cam_id + str(rotation),
-                                                                     add_rot=rotation) # TODO
-    elif cam_id == "ASTRICam":
-        image1d = geomconv.array_2d_to_astri(image2d)
-    elif cam_id == "CHEC":
-        image1d = geomconv.array_2d_to_chec(image2d)
-    else:
-        raise ValueError("2D to 1D image converter: unknown camera {}.".format(cam_id))
+    if index_map is None:
+        return _image_2d_to_1d_ctapipe(image2d, cam_id)
 
-    return image1d
+    return _gather_2d_to_1d(image2d, index_map)
 
 def image_1d_to_2d(image1d, cam_id):
     """Convert a ctapipe compliant 1D image to a wavelet compatible 2D image.
@@ -184,19 +462,70 @@ def image_1d_to_2d(image1d, cam_id):
         The converted image in its 2D version compliant with wavelet packages.
     """
 
-    geom1d = get_geom1d(cam_id)  # TODO: should be avoided...
+    index_map = get_index_map(cam_id)
 
-    if cam_id in ("DigiCam", "NectarCam", "FlashCam", "LSTCam"):
-        rotation = 0  # TODO: should be avoided...
-        geom2d, image2d = geomconv.convert_geometry_hex1d_to_rect2d(geom1d,
-                                                                    image1d,
-                                                                    cam_id + str(rotation),
-                                                                    add_rot=rotation) # TODO
-    elif cam_id == "ASTRICam":
-        image2d = geomconv.astri_to_2d_array(image1d)
-    elif cam_id == "CHEC":
-        image2d = geomconv.chec_to_2d_array(image1d)
-    else:
-        raise ValueError("1D to 2D image converter: unknown camera {}.".format(cam_id))
+    if index_map is None:
+        return _image_1d_to_2d_ctapipe(image1d, cam_id)
 
-    return image2d
+    return _scatter_1d_to_2d(image1d, index_map)
+
+def images_2d_to_1d(images2d, cam_id):
+    """Convert a stack of 2D images to a stack of ctapipe compliant 1D images.
+
+    All images (and channels) are converted in one vectorized operation.
+
+    Parameters
+    ----------
+    images2d: ndarray
+        The 2D images to convert. The array shape is (..., H, W) where the
+        leading dimensions can be anything (e.g. (num_images, num_channels)).
+    cam_id: str
+        The instrument name (required to guess the image geometry).
+
+    Returns
+    -------
+    ndarray
+        The converted images. The array shape is (..., num_pixels).
+    """
+
+    images2d = np.asarray(images2d)
+    index_map = get_index_map(cam_id)
+
+    if index_map is None:
+        leading_shape = images2d.shape[:-2]
+        images1d = [_image_2d_to_1d_ctapipe(image2d, cam_id) for image2d in images2d.reshape((-1,) + images2d.shape[-2:])]
+        images1d = np.array(images1d).reshape(leading_shape + (-1,))
+        return images1d
+
+    return _gather_2d_to_1d(images2d, index_map)
+
+def images_1d_to_2d(images1d, cam_id):
+    """Convert a stack of ctapipe compliant 1D images to a stack of 2D images.
+
+    All images (and channels) are converted in one vectorized operation.
+
+    Parameters
+    ----------
+    images1d: ndarray
+        The 1D images to convert. The array shape is (..., num_pixels) where
+        the leading dimensions can be anything (e.g. (num_images,
+        num_channels)).
+    cam_id: str
+        The instrument name (required to guess the image geometry).
+
+    Returns
+    -------
+    ndarray
+        The converted images. The array shape is (..., H, W).
+    """
+
+    images1d = np.asarray(images1d)
+    index_map = get_index_map(cam_id)
+
+    if index_map is None:
+        leading_shape = images1d.shape[:-1]
+        images2d = [_image_1d_to_2d_ctapipe(image1d, cam_id) for image1d in images1d.reshape((-1, images1d.shape[-1]))]
+        images2d = np.array(images2d)
+        return images2d.reshape(leading_shape + images2d.shape[1:])
+
+    return _scatter_1d_to_2d(images1d, index_map)
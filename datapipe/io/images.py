@@ -21,10 +21,12 @@
 # THE SOFTWARE.
 
 __all__ = ['fill_nan_pixels',
+           'find_files',
            'hillas_parameters_to_df',
            'image_files_in_dir',
            'image_files_in_paths',
            'image_generator',
+           'load_benchmark_container',
            'load_benchmark_images',
            'load_fits',
            'mpl_save',
@@ -33,6 +35,7 @@ __all__ = ['fill_nan_pixels',
            'plot_hillas_parameters_on_axes',
            'print_hillas_parameters',
            'quantity_to_tuple',
+           'save_benchmark_container',
            'save_benchmark_images',
            'save_fits',
            'simtel_event_to_images',
@@ -42,6 +45,10 @@ import math
 
 import collections
 
+import fnmatch
+
+import json
+
 import numpy as np
 
 import matplotlib.pyplot as plt
@@ -50,6 +57,8 @@ from matplotlib.patches import Ellipse
 
 import os
 
+import re
+
 from astropy.io import fits
 import astropy.units as u
 
@@ -196,11 +205,134 @@ def fill_nan_pixels(image, noise_distribution=None):
 
 # DIRECTORY PARSER ############################################################
 
-def image_files_in_dir(directory_path, max_num_files=None):
+IMAGE_FILE_EXT = (".simtel", ".simtel.gz", ".fits", ".fit", ".npz")
+
+def _file_name_matcher(extensions=None, glob=None, regex=None):
+    """Return a predicate telling whether a file name passes all filters."""
+
+    if extensions is not None:
+        extensions = tuple(extension.lower() for extension in extensions)
+
+    if isinstance(glob, str):
+        glob = (glob,)
+
+    if isinstance(regex, str):
+        regex = re.compile(regex)
+
+    def match(file_name):
+        if (extensions is not None) and not file_name.lower().endswith(extensions):
+            return False
+        if (glob is not None) and not any(fnmatch.fnmatch(file_name, pattern) for pattern in glob):
+            return False
+        if (regex is not None) and (regex.search(file_name) is None):
+            return False
+        return True
+
+    return match
+
+
+def _scan_dir(directory_path, match, recursive, sort):
+    """Yield (lazily) the path of files in `directory_path` accepted by `match`."""
+
+    with os.scandir(directory_path) as dir_iterator:
+
+        if sort:
+            # Only names are sorted (DirEntry objects don't stat files)
+            entries = sorted(dir_iterator, key=lambda entry: entry.name)
+        else:
+            entries = dir_iterator
+
+        for entry in entries:
+            # DirEntry.is_file() and DirEntry.is_dir() don't require a stat
+            # call on most platforms; the name filter is checked first anyway
+            if match(entry.name) and entry.is_file():
+                yield entry.path
+            elif recursive and entry.is_dir():
+                yield from _scan_dir(entry.path, match, recursive, sort)
+
+
+def find_files(path_list,
+               extensions=IMAGE_FILE_EXT,
+               recursive=False,
+               glob=None,
+               regex=None,
+               sort=False,
+               max_num_files=None):
+    """Return (lazily) the path of files in `path_list`.
+
+    Directories are scanned with `os.scandir` and paths are yielded as soon as
+    they are found (the full list of files is never built).
+
+    Parameters
+    ----------
+    path_list : str or sequence of str
+        The directories where files are searched. It can also directly contain
+        individual file paths (or a mix of files and directories path);
+        individual files are always yielded (filters only apply to the content
+        of directories).
+    extensions : sequence of str
+        If not ``None``, only files ending with one of these extensions (case
+        insensitive) are yielded.
+    recursive : bool
+        Scan subdirectories if ``True``.
+    glob : str or sequence of str
+        If not ``None``, only files whose name match one of these shell-style
+        patterns (e.g. ``"*_TEL001_*"``) are yielded.
+    regex : str or compiled regular expression
+        If not ``None``, only files whose name contains a match of this
+        regular expression are yielded.
+    sort : bool
+        If ``True``, the content of each directory is yielded in lexicographic
+        order of names (directories are then scanned in the same order) thus
+        the sequence of paths is deterministic.
+    max_num_files : int
+        The maximum number of files to return (the scan stops as soon as this
+        number is reached).
+
+    Yields
+    ------
+    str
+        The path of the next file.
+
+    Raises
+    ------
+    Exception
+        If an item of `path_list` is neither a file nor a directory.
+    """
+
+    if isinstance(path_list, str):
+        path_list = [path_list]
+
+    if (max_num_files is not None) and (max_num_files <= 0):
+        return
+
+    match = _file_name_matcher(extensions, glob, regex)
+
+    files_counter = 0
+
+    for path in path_list:
+        path = os.path.expanduser(path)
+
+        if os.path.isdir(path):
+            file_path_iterator = _scan_dir(path, match, recursive, sort)
+        elif os.path.isfile(path):
+            file_path_iterator = (path,)
+        else:
+            raise Exception("Wrong item:", path)
+
+        for file_path in file_path_iterator:
+            yield file_path
+
+            files_counter += 1
+            if (max_num_files is not None) and (files_counter >= max_num_files):
+                return
+
+
+def image_files_in_dir(directory_path, max_num_files=None, **kwargs):
     """Return the path of FITS and Simtel files in `directory_path`.
 
     Return the path of all (or `max_num_files`) files having the extension
-    ".simtel", ".simtel.gz", ".fits" or ".fit" in `directory_path`.
+    ".simtel", ".simtel.gz", ".fits", ".fit" or ".npz" in `directory_path`.
 
     Parameters
     ----------
@@ -208,6 +340,9 @@ def image_files_in_dir(directory_path, max_num_files=None):
         The directory's path where FITS and Simtel files are searched.
     max_num_files : int
         The maximum number of files to return.
+    kwargs
+        Additional filters (`recursive`, `glob`, `regex`, `sort`) passed to
+        `find_files`.
 
     Yields
     ------
@@ -215,26 +350,19 @@ def image_files_in_dir(directory_path, max_num_files=None):
         The path of the next FITS or Simtel files in `directory_path`.
     """
 
-    FILE_EXT = (".simtel", ".simtel.gz", ".fits", ".fit")
     directory_path = os.path.expanduser(directory_path)
 
-    files_counter = 0
+    if not os.path.isdir(directory_path):
+        raise NotADirectoryError(directory_path)
 
-    for file_name in os.listdir(directory_path):
-        file_path = os.path.join(directory_path, file_name)
-        if os.path.isfile(file_path) and file_name.lower().endswith(FILE_EXT):
-            files_counter += 1
-            if (max_num_files is not None) and (files_counter > max_num_files):
-                break
-            else:
-                yield file_path
+    yield from find_files([directory_path], max_num_files=max_num_files, **kwargs)
 
 
-def image_files_in_paths(path_list, max_num_files=None):
+def image_files_in_paths(path_list, max_num_files=None, **kwargs):
     """Return the path of FITS and Simtel files in `path_list`.
 
     Return the path of all (or `max_num_files`) files having the extension
-    ".simtel", ".simtel.gz", ".fits" or ".fit" in `path_list`.
+    ".simtel", ".simtel.gz", ".fits", ".fit" or ".npz" in `path_list`.
 
     Parameters
     ----------
@@ -244,6 +372,9 @@ def image_files_in_paths(path_list, max_num_files=None):
         and directories path).
     max_num_files : int
         The maximum number of files to return.
+    kwargs
+        Additional filters (`recursive`, `glob`, `regex`, `sort`) passed to
+        `find_files`.
 
     Yields
     ------
@@ -251,27 +382,7 @@ def image_files_in_paths(path_list, max_num_files=None):
         The path of the next FITS or Simtel files in `path_list`.
     """
 
-    files_counter = 0
-
-    for path in path_list:
-        path = os.path.expanduser(path)
-        if os.path.isdir(path):
-            # If path is a directory
-            for file_path in image_files_in_dir(path):
-                files_counter += 1
-                if (max_num_files is not None) and (files_counter > max_num_files):
-                    break
-                else:
-                    yield file_path
-        elif os.path.isfile(path):
-            # If path is a regular file
-            files_counter += 1
-            if (max_num_files is not None) and (files_counter > max_num_files):
-                break
-            else:
-                yield path
-        else:
-            raise Exception("Wrong item:", path)
+    yield from find_files(path_list, max_num_files=max_num_files, **kwargs)
 
 
 # LOAD IMAGES ################################################################
@@ -357,6 +468,16 @@ def image_generator(path_list,
                         if (cam_filter_list is None) or (fits_metadata_dict['cam_id'] in cam_filter_list):
                             images_counter += 1
                             yield Image2D(**image_dict, meta=fits_metadata_dict)
+            elif file_path.lower().endswith(".npz"):
+                # BENCHMARK CONTAINERS
+                for image_dict, metadata_dict in load_benchmark_container(file_path):
+                    if (max_num_images is not None) and (images_counter >= max_num_images):
+                        break
+                    if (tel_filter_list is None) or (metadata_dict['tel_id'] in tel_filter_list):
+                        if (ev_filter_list is None) or (metadata_dict['event_id'] in ev_filter_list):
+                            if (cam_filter_list is None) or (metadata_dict['cam_id'] in cam_filter_list):
+                                images_counter += 1
+                                yield Image2D(**image_dict, meta=metadata_dict)
             else:
                 raise Exception("Wrong item:", file_path)
 
@@ -383,6 +504,105 @@ def quantity_to_tuple(quantity, unit_str):
     return quantity.to(unit_str).value, quantity.to(unit_str).unit.to_string(format='FITS')
 
 
+# Camera static products (geometry, 2D pixels position, 2D mask, ...) are
+# computed once per (cam_id, tel_id) and reused for all the following images
+# of this telescope (see `_get_camera_static_products`).
+_CAMERA_STATIC_CACHE = {}
+_CAMERA_GEOM_CACHE = {}
+
+def _get_camera_static_products(event, tel_id):
+    """Return a dictionary of `tel_id`'s products that don't depend on the event.
+
+    The camera geometry is guessed only once for each telescope (and each
+    focal length and number of pixels, so that files from different arrays can
+    be mixed). The 2D mask and the 2D (mock) pixels position are computed on
+    the first call for a given (cam_id, tel_id) and their arrays are made read
+    only as they are shared between all images.
+    """
+
+    x, y = event.inst.pixel_pos[tel_id]
+    foclen = event.inst.optical_foclen[tel_id]
+
+    geom_key = (tel_id, len(x), float(foclen.to(u.m).value))
+
+    if geom_key not in _CAMERA_GEOM_CACHE:
+        _CAMERA_GEOM_CACHE[geom_key] = CameraGeometry.guess(x, y, foclen)
+
+    geom1d = _CAMERA_GEOM_CACHE[geom_key]
+    cam_id = geom1d.cam_id
+
+    static_key = (cam_id, tel_id)
+
+    if static_key not in _CAMERA_STATIC_CACHE:
+        products = {'geom1d': geom1d}
+
+        try:
+            mask_1d = np.ones(x.shape)
+            mask_2d = geometry_converter.image_1d_to_2d(mask_1d, cam_id=cam_id)
+
+            # Make a mock pixel position array...
+            pixel_pos_2d = np.array(np.meshgrid(np.linspace(x.min().value,
+                                                            x.max().value,
+                                                            mask_2d.shape[0]),
+                                                np.linspace(y.min().value,
+                                                            y.max().value,
+                                                            mask_2d.shape[1])))
+
+            mask_2d.setflags(write=False)
+            pixel_pos_2d.setflags(write=False)
+
+            products['mask_2d'] = mask_2d
+            products['pixel_pos_2d'] = pixel_pos_2d
+        except ValueError:
+            # Unknown camera for the 2D converter (only 1D images are available)
+            pass
+
+        products['static_2d'] = {}     # {name: (array_1d, array_2d)}
+
+        _CAMERA_STATIC_CACHE[static_key] = products
+
+    return _CAMERA_STATIC_CACHE[static_key]
+
+
+def _get_static_image_2d(products, name, image_1d):
+    """Return the 2D version of a static per run image (pedestal, gains, ...).
+
+    The 2D conversion of `image_1d` is reused as long as the 1D array is
+    identical to the one converted at the previous call (pedestal and gains are
+    static per run).
+
+    Parameters
+    ----------
+    products : dict
+        The dictionary returned by `_get_camera_static_products`.
+    name : str
+        The name of the image (e.g. "pedestal").
+    image_1d : ndarray
+        The 1D image of one or several channels (shape (num_channels, npix)).
+
+    Returns
+    -------
+    ndarray
+        The 3D array (shape (num_channels, height, width)) of the converted
+        channels. This array is read only.
+    """
+
+    cam_id = products['geom1d'].cam_id
+    static_2d = products['static_2d']
+
+    if name in static_2d:
+        cached_image_1d, cached_image_2d = static_2d[name]
+        if cached_image_1d.shape == image_1d.shape and np.array_equal(cached_image_1d, image_1d):
+            return cached_image_2d
+
+    image_2d = geometry_converter.images_1d_to_2d(image_1d, cam_id=cam_id)
+    image_2d.setflags(write=False)
+
+    static_2d[name] = (np.array(image_1d, copy=True), image_2d)
+
+    return image_2d
+
+
 def simtel_event_to_images(event, tel_id, ctapipe_format=False, mix_channels=True, **kwargs):
     """Extract and return `tel_id`'s images and metadata from a ctapipe `event`.
 
@@ -409,9 +629,9 @@ def simtel_event_to_images(event, tel_id, ctapipe_format=False, mix_channels=Tru
 
     # GUESS THE IMAGE GEOMETRY ################################
 
-    x, y = event.inst.pixel_pos[tel_id]
-    foclen = event.inst.optical_foclen[tel_id]
-    geom1d = CameraGeometry.guess(x, y, foclen)
+    # Camera static products are computed once per (cam_id, tel_id)
+    static_products = _get_camera_static_products(event, tel_id)
+    geom1d = static_products['geom1d']
 
     # GET IMAGES ##############################################
 
@@ -498,68 +718,47 @@ def simtel_event_to_images(event, tel_id, ctapipe_format=False, mix_channels=Tru
         # CONVERTING GEOMETRY (1D TO 2D) ##########################
 
         if cam_id in SINGLE_CHANNEL_CAMERAS:
-
-            pe_image_2d = geometry_converter.image_1d_to_2d(pe_image, cam_id=cam_id)
-            calibrated_image_2d = geometry_converter.image_1d_to_2d(calibrated_image, cam_id=cam_id)
-
-            calibrated_samples_2d = None    # TODO
-            uncalibrated_samples_2d = None  # TODO
-            extracted_samples_2d = None     # TODO
-            peakpos_2d = None               # TODO
-
-            uncalibrated_image_2d = geometry_converter.image_1d_to_2d(uncalibrated_image[0], cam_id=cam_id)
-            pedestal_2d = geometry_converter.image_1d_to_2d(pedestal[0], cam_id=cam_id)
-            gains_2d = geometry_converter.image_1d_to_2d(gain[0], cam_id=cam_id)
-
+            num_channels = 1
         elif cam_id in TWO_CHANNELS_CAMERAS:
-
-            pe_image_2d = geometry_converter.image_1d_to_2d(pe_image, cam_id=cam_id)
-            calibrated_image_2d = geometry_converter.image_1d_to_2d(calibrated_image, cam_id=cam_id)
-
-            calibrated_samples_2d = None    # TODO
-            uncalibrated_samples_2d = None  # TODO
-            extracted_samples_2d = None     # TODO
-            peakpos_2d = None               # TODO
-
-            uncalibrated_image_2d_ch0 = geometry_converter.image_1d_to_2d(uncalibrated_image[0], cam_id=cam_id)
-            uncalibrated_image_2d_ch1 = geometry_converter.image_1d_to_2d(uncalibrated_image[1], cam_id=cam_id)
-            pedestal_2d_ch0 = geometry_converter.image_1d_to_2d(pedestal[0], cam_id=cam_id)
-            pedestal_2d_ch1 = geometry_converter.image_1d_to_2d(pedestal[1], cam_id=cam_id)
-            gains_2d_ch0 = geometry_converter.image_1d_to_2d(gain[0], cam_id=cam_id)
-            gains_2d_ch1 = geometry_converter.image_1d_to_2d(gain[1], cam_id=cam_id)
-
+            num_channels = 2
         else:
             raise NotImplementedError("Unknown camera: {}".format(cam_id))
 
-        # Make a mock pixel position array...
-        pixel_pos_2d = np.array(np.meshgrid(np.linspace(pixel_pos[0].min().value,
-                                                        pixel_pos[0].max().value,
-                                                        pe_image_2d.shape[0]),
-                                            np.linspace(pixel_pos[1].min().value,
-                                                        pixel_pos[1].max().value,
-                                                        pe_image_2d.shape[1])))
+        calibrated_samples_2d = None    # TODO
+        uncalibrated_samples_2d = None  # TODO
+        extracted_samples_2d = None     # TODO
+        peakpos_2d = None               # TODO
 
-        # FIX THE ARRAY SHAPE #####################################
+        # All the dynamic images (pe, calibrated and the adc sums of each
+        # channel) are converted in one vectorized operation.
+        # Datapipe fits files keep all channels thus adc sums, pedestal and
+        # gains are 3D arrays (channel, x, y).
 
-        # The ctapipe geometry converter operate on one channel
-        # only and then takes and return a 2D array but datapipe
-        # fits files keep all channels and thus takes 3D arrays...
+        calibrated_image_1d = np.atleast_2d(calibrated_image)   # 2 rows if channels are not mixed
+        num_calibrated_rows = calibrated_image_1d.shape[0]
 
-        if cam_id in SINGLE_CHANNEL_CAMERAS:
-            uncalibrated_image_2d = np.array([uncalibrated_image_2d])
-            pedestal_2d =           np.array([pedestal_2d])
-            gains_2d =              np.array([gains_2d])
-        elif cam_id in TWO_CHANNELS_CAMERAS:
-            uncalibrated_image_2d = np.array([uncalibrated_image_2d_ch0, uncalibrated_image_2d_ch1])
-            pedestal_2d =           np.array([pedestal_2d_ch0, pedestal_2d_ch1 ])
-            gains_2d =              np.array([gains_2d_ch0, gains_2d_ch1])
+        dynamic_images_1d = np.concatenate([np.atleast_2d(pe_image),
+                                            calibrated_image_1d,
+                                            uncalibrated_image[:num_channels]])
+        dynamic_images_2d = geometry_converter.images_1d_to_2d(dynamic_images_1d, cam_id=cam_id)
+
+        pe_image_2d = dynamic_images_2d[0]
+        if num_calibrated_rows == 1:
+            calibrated_image_2d = dynamic_images_2d[1]
         else:
-            raise NotImplementedError("Unknown camera: {}".format(cam_id))
+            calibrated_image_2d = dynamic_images_2d[1:1 + num_calibrated_rows]
+        uncalibrated_image_2d = dynamic_images_2d[1 + num_calibrated_rows:]
+
+        # Static per run images are converted once
+        pedestal_2d = _get_static_image_2d(static_products, "pedestal", pedestal[:num_channels])
+        gains_2d = _get_static_image_2d(static_products, "gains", gain[:num_channels])
+
+        # Mock pixel position array (static, computed once per telescope)
+        pixel_pos_2d = static_products['pixel_pos_2d']
 
         # GET PIXEL MASK AND PUT NAN IN BLANK PIXELS ##############
 
-        mask_1d = np.ones(pe_image.shape)
-        mask_2d = geometry_converter.image_1d_to_2d(mask_1d, cam_id=cam_id)
+        mask_2d = static_products['mask_2d']   # static, computed once per telescope
 
         # TODO: apparently nan values are already there so this step is useless...
 
@@ -1054,6 +1253,121 @@ def save_benchmark_images(img,
     hdu_list.writeto(output_file_path)
 
 
+# LOAD AND SAVE BENCHMARK CONTAINERS ########################################
+
+# Name of the FITS header keywords used by `save_benchmark_images` for each
+# metadata item yielded by `simtel_images_generator`.
+BENCHMARK_FITS_KEYWORDS = collections.OrderedDict((('version', 'version'),
+                                                   ('cam_id', 'cam_id'),
+                                                   ('tel_id', 'tel_id'),
+                                                   ('event_id', 'event_id'),
+                                                   ('simtel_path', 'simtel'),
+                                                   ('num_tel_with_trigger', 'tel_trig'),
+                                                   ('mc_energy', 'energy'),
+                                                   ('mc_azimuth', 'mc_az'),
+                                                   ('mc_altitude', 'mc_alt'),
+                                                   ('mc_core_x', 'mc_corex'),
+                                                   ('mc_core_y', 'mc_corey'),
+                                                   ('mc_height_first_interaction', 'mc_hfi'),
+                                                   ('ev_count', 'count'),
+                                                   ('run_id', 'run_id'),
+                                                   ('num_tel_with_data', 'tel_data'),
+                                                   ('optical_foclen', 'foclen'),
+                                                   ('tel_pos_x', 'tel_posx'),
+                                                   ('tel_pos_y', 'tel_posy'),
+                                                   ('tel_pos_z', 'tel_posz')))
+
+BENCHMARK_CONTAINER_ARRAYS = ('input_image',
+                              'reference_image',
+                              'adc_sum_image',
+                              'pedestal_image',
+                              'gains_image',
+                              'pixels_position',
+                              'pixels_mask')
+
+def save_benchmark_container(image_list, output_file_path):
+    """Write several benchmark images of the same camera in one ".npz" file.
+
+    Each image array of `image_list` is stacked along a new first axis (one
+    entry per image) and the metadata are stored as a JSON string. This
+    container is a lot faster to write and to read than one FITS file per
+    image.
+
+    Parameters
+    ----------
+    image_list : sequence of Image2D
+        The images to save. All images should come from the same camera (i.e.
+        they should have the same shape). The list can be empty.
+    output_file_path : str
+        The path of the output ".npz" file. The file is written atomically
+        (a partially written container is never left at this path).
+    """
+
+    arrays_dict = {}
+
+    for array_name in BENCHMARK_CONTAINER_ARRAYS:
+        if len(image_list) > 0:
+            arrays_dict[array_name] = np.stack([getattr(image, array_name) for image in image_list])
+
+    meta_list = [dict(image.meta) for image in image_list]
+    arrays_dict["meta"] = np.array(json.dumps(meta_list))
+
+    tmp_file_path = output_file_path + ".tmp.npz"
+    np.savez(tmp_file_path, **arrays_dict)
+    os.replace(tmp_file_path, output_file_path)
+
+
+def load_benchmark_container(input_file_path):
+    """Return images contained in the given ".npz" benchmark container.
+
+    Parameters
+    ----------
+    input_file_path : str
+        The path of the container to load (written by
+        `save_benchmark_container`).
+
+    Returns
+    -------
+    list
+        A list of (images_dict, metadata_dict) tuples having the same
+        structure than the ones returned by `load_benchmark_images`.
+    """
+
+    with np.load(input_file_path, allow_pickle=False) as npz_file:
+        meta_list = json.loads(str(npz_file["meta"]))
+        arrays_dict = {array_name: npz_file[array_name] for array_name in BENCHMARK_CONTAINER_ARRAYS if array_name in npz_file}
+
+    image_list = []
+
+    for index, meta in enumerate(meta_list):
+        images_dict = {array_name: arrays_dict[array_name][index] for array_name in BENCHMARK_CONTAINER_ARRAYS}
+
+        images_dict["input_samples"] = None         # TODO
+        images_dict["adc_samples"] = None           # TODO
+        images_dict["extracted_samples"] = None     # TODO
+        images_dict["peakpos"] = None               # TODO
+
+        metadata_dict = {}
+
+        for key, val in meta.items():
+            if isinstance(val, list):
+                # (value, unit) tuples are serialized as JSON lists
+                metadata_dict[key] = val[0]
+                metadata_dict[key + '_unit'] = val[1]
+            else:
+                metadata_dict[key] = val
+
+        metadata_dict['file_path'] = input_file_path
+
+        metadata_dict['npe'] = float(np.nansum(images_dict["reference_image"]))
+        metadata_dict['min_npe'] = float(np.nanmin(images_dict["reference_image"]))
+        metadata_dict['max_npe'] = float(np.nanmax(images_dict["reference_image"]))
+
+        image_list.append((images_dict, metadata_dict))
+
+    return image_list
+
+
 # LOAD AND SAVE FITS FILES ###################################################
 
 def load_fits(input_file_path, hdu_index):
@@ -21,5 +21,12 @@
 # THE SOFTWARE.
 
 __all__ = ['bruteforce',
+           'checkpoint',
+           'evaluation_cache',
+           'multi_objective',
+           'racing',
            'objectivefunc',
-           'saes']
+           'process_pool',
+           'saes',
+           'surrogate',
+           'tailcut_grid']
@@ -20,10 +20,18 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-__all__ = []
+__all__ = ['brute']
 
+import argparse
 import json
-from scipy import optimize
+import numpy as np
+from datapipe.optimization.checkpoint import Checkpoint
+from datapipe.optimization.checkpoint import get_function_state
+from datapipe.optimization.checkpoint import set_function_state
+from datapipe.optimization.evaluation_cache import EvaluationCache
+from datapipe.optimization.multi_objective import MultiObjectiveEvaluator
+from datapipe.optimization.racing import RacingEvaluator
+from datapipe.optimization import tailcut_grid
 from datapipe.optimization.objectivefunc.wavelets_mrfilter_delta_psi import ObjectiveFunction as WaveletObjectiveFunction
 from datapipe.optimization.objectivefunc.tailcut_delta_psi import ObjectiveFunction as TailcutObjectiveFunction
 
@@ -31,8 +39,91 @@ from datapipe.optimization.objectivefunc.tailcut_delta_psi import ObjectiveFunct
 import datapipe.denoising.cdf
 from datapipe.denoising.inverse_transform_sampling import EmpiricalDistribution
 
+def brute(objective_function, ranges, checkpoint=None, resume=False):
+    """Minimize `objective_function` over a grid.
+
+    This is equivalent to ``scipy.optimize.brute(func, ranges,
+    full_output=True, finish=None)`` except that the run can be checkpointed
+    and resumed.
+
+    Parameters
+    ----------
+    objective_function : callable
+        The function to minimize. It takes a 1D array (a point) and returns a
+        float.
+    ranges : tuple of slice
+        The grid ranges (as in ``scipy.optimize.brute``).
+    checkpoint : Checkpoint
+        If given, the scores of the assessed grid points and the objective
+        function state are saved every ``checkpoint.interval`` grid points.
+    resume : bool
+        If `True`, the run saved in `checkpoint` (if any) is continued from
+        the first grid point that was not assessed.
+
+    Returns
+    -------
+    tuple
+        ``(x0, fval, grid, Jout)``: the best point, its score, the grid
+        points and the score of each grid point. Points scored NaN (rejected
+        points) are ignored.
+
+    Raises
+    ------
+    ValueError
+        If all grid points are scored NaN.
+    """
+
+    grid = np.mgrid[tuple(ranges)]
+    points = grid.reshape(len(ranges), -1).T
+    scores = np.full(len(points), np.nan)
+
+    def save_checkpoint(num_done):
+        checkpoint.save("bruteforce", {"num_done": num_done,
+                                       "scores": scores[:num_done].tolist(),
+                                       "function_state": get_function_state(objective_function)})
+
+    state = checkpoint.load("bruteforce") if (resume and checkpoint is not None) else None
+
+    if state is None:
+        num_done = 0
+    else:
+        num_done = state["num_done"]
+        if num_done > len(points):
+            raise ValueError("The checkpoint doesn't match the search ranges")
+        scores[:num_done] = state["scores"]
+        set_function_state(objective_function, state["function_state"])
+
+    for point_index in range(num_done, len(points)):
+        scores[point_index] = objective_function(points[point_index])
+
+        if (checkpoint is not None) and (checkpoint.due(point_index) or point_index == len(points) - 1):
+            save_checkpoint(point_index + 1)
+
+    scores = scores.reshape(grid.shape[1:])
+
+    # Rejected points (e.g. tailcut points with low > high) are scored NaN
+    if np.all(np.isnan(scores)):
+        raise ValueError("All grid points are rejected")
+
+    best_index = np.unravel_index(np.nanargmin(scores), scores.shape)
+
+    return grid[(slice(None),) + best_index], scores[best_index], grid, scores
+
+
 def main():
 
+    # PARSE OPTIONS ###########################################################
+
+    parser = argparse.ArgumentParser(description="Optimize cleaning parameters with a grid search.")
+
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the run saved in the checkpoint file")
+
+    parser.add_argument("--checkpoint", default="optimize_sigma_checkpoint.json", metavar="FILE",
+                        help="The checkpoint file path (default: %(default)s)")
+
+    args = parser.parse_args()
+
     algo = "wavelet_mrfilter"
     #algo = "tailcut"
 
@@ -48,31 +139,37 @@ def main():
 
     if instrument == "astri":
 
+        cam_id = "ASTRICam"
         input_files = ["/dev/shm/.jd/astri/gamma/"]
         noise_distribution = EmpiricalDistribution(datapipe.denoising.cdf.ASTRI_CDF_FILE)
 
     elif instrument == "astri_konrad":
 
+        cam_id = "ASTRICam"
         input_files = ["/dev/shm/.jd/astri_konrad/gamma/"]
         noise_distribution = EmpiricalDistribution(datapipe.denoising.cdf.ASTRI_CDF_FILE)
 
     elif instrument == "digicam":
 
+        cam_id = "DigiCam"
         input_files = ["/dev/shm/.jd/digicam/gamma/"]
         noise_distribution = EmpiricalDistribution(datapipe.denoising.cdf.DIGICAM_CDF_FILE)
 
     elif instrument == "flashcam":
 
+        cam_id = "FlashCam"
         input_files = ["/dev/shm/.jd/flashcam/gamma/"]
         noise_distribution = EmpiricalDistribution(datapipe.denoising.cdf.FLASHCAM_CDF_FILE)
 
     elif instrument == "nectarcam":
 
+        cam_id = "NectarCam"
         input_files = ["/dev/shm/.jd/nectarcam/gamma/"]
         noise_distribution = EmpiricalDistribution(datapipe.denoising.cdf.NECTARCAM_CDF_FILE)
 
     elif instrument == "lstcam":
 
+        cam_id = "LSTCam"
         input_files = ["/dev/shm/.jd/lstcam/gamma/"]
         noise_distribution = EmpiricalDistribution(datapipe.denoising.cdf.LSTCAM_CDF_FILE)
 
@@ -80,12 +177,17 @@ def main():
 
         raise Exception("Unknown instrument", instrument)
 
+    # Evaluations are cached (on disk) and shared between runs
+    cache = EvaluationCache()
+
     if algo == "wavelet_mrfilter":
 
         func = WaveletObjectiveFunction(input_files=input_files,
+                                        cam_id=cam_id,
                                         noise_distribution=noise_distribution,
                                         max_num_img=None,
-                                        aggregation_method="mean")  # "mean" or "median"
+                                        aggregation_method="mean",  # "mean" or "median"
+                                        cache=cache)
 
         s1_slice = slice(1, 5, 1)
         s2_slice = slice(1, 5, 1)
@@ -100,8 +202,10 @@ def main():
     elif algo == "tailcut":
 
         func = TailcutObjectiveFunction(input_files=input_files,
+                                        cam_id=cam_id,
                                         max_num_img=None,
-                                        aggregation_method="mean")  # "mean" or "median"
+                                        aggregation_method="mean",  # "mean" or "median"
+                                        cache=cache)
 
         s1_slice = slice(-2., 10., 0.5)
         s2_slice = slice(-2., 10., 0.5)
@@ -113,10 +217,39 @@ def main():
 
         raise ValueError("Unknown algorithm", algo)
 
-    res = optimize.brute(func,
-                         search_ranges,
-                         full_output=True,
-                         finish=None)     #optimize.fmin)
+    # Compute the tailcut masks of all grid points at once for each image
+    # (the whole grid costs about one pass over the dataset)
+    use_tailcut_grid = True
+
+    # Assess candidates on growing (stratified) subsets of images and only
+    # assess the most promising ones on the whole dataset
+    use_racing = True
+
+    # Record the cleaning time of each candidate along with its quality score
+    # and keep the Pareto front (candidates are then fully assessed: racing
+    # is not used)
+    multi_objective = False
+    quality_tolerance = 0.1     # The delta psi tolerance (in degrees) used to pick the fastest candidate
+
+    if algo == "tailcut" and use_tailcut_grid and not multi_objective:
+
+        # A single pass over the dataset (its scores are in the evaluation
+        # cache thus there is nothing to checkpoint)
+        res = tailcut_grid.brute(func, search_ranges)
+
+    else:
+
+        if multi_objective:
+            func = MultiObjectiveEvaluator(func)
+        elif use_racing:
+            func = RacingEvaluator(func)
+
+        checkpoint = Checkpoint(args.checkpoint, interval=1, cache=cache)
+
+        res = brute(func,
+                    search_ranges,
+                    checkpoint=checkpoint,
+                    resume=args.resume)
 
     print("x* =", res[0])
     print("f(x*) =", res[1])
@@ -133,6 +266,12 @@ def main():
     with open("optimize_sigma.json", "w") as fd:
         json.dump(res_dict, fd, sort_keys=True, indent=4)  # pretty print format
 
+    if multi_objective:
+        func.save("optimize_sigma_pareto_front.json")
+        print("Pareto front (quality vs cleaning time):", func.pareto_front())
+        print("Fastest candidate within {} degree(s) of the best one:".format(quality_tolerance),
+              func.fastest_within(quality_tolerance))
+
 
 if __name__ == "__main__":
     main()
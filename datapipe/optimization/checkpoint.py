@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+Checkpoints of optimizer runs.
+
+A checkpoint is a small JSON file containing what an optimizer needs to
+continue a run exactly where it stopped: its population (or its position in
+the search grid), its strategy parameters, the state of its random number
+generator and the state of the objective function wrapper (e.g. a
+:class:`datapipe.optimization.racing.RacingEvaluator`). The path of the
+evaluation cache (see :mod:`datapipe.optimization.evaluation_cache`) is also
+recorded: evaluations made since the checkpoint are read from the cache when
+the run is resumed.
+
+Checkpoints are written atomically (a temporary file is renamed) thus a crash
+while writing never leaves a truncated checkpoint.
+
+Iteration logs written by the optimizer scripts use the JSON Lines format
+(one JSON document per line, see `append_json_line`): each iteration appends
+one line instead of rewriting the whole history.
+"""
+
+__all__ = ['Checkpoint',
+           'get_rng_state',
+           'set_rng_state',
+           'get_function_state',
+           'set_function_state',
+           'append_json_line',
+           'read_json_lines']
+
+import datetime
+import json
+import os
+import tempfile
+
+import numpy as np
+
+# Increment this number when the layout of checkpoint files changes
+CHECKPOINT_VERSION = 1
+
+def _json_default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError("{} is not JSON serializable".format(type(obj)))
+
+
+def get_rng_state(rng):
+    """Return the state of a Numpy random number generator as a JSON
+    serializable list.
+
+    Parameters
+    ----------
+    rng : numpy.random.RandomState or the numpy.random module
+        The random number generator.
+    """
+
+    name, keys, pos, has_gauss, cached_gaussian = rng.get_state()
+
+    return [name, keys.tolist(), int(pos), int(has_gauss), float(cached_gaussian)]
+
+
+def set_rng_state(rng, state):
+    """Restore the state of a Numpy random number generator (see
+    `get_rng_state`)."""
+
+    name, keys, pos, has_gauss, cached_gaussian = state
+
+    rng.set_state((name, np.array(keys, dtype=np.uint32), pos, has_gauss, cached_gaussian))
+
+
+def get_function_state(objective_function):
+    """Return the state of an objective function wrapper having a
+    ``get_state`` method (e.g. a `RacingEvaluator`) or ``None``."""
+
+    if hasattr(objective_function, "get_state"):
+        return objective_function.get_state()
+
+    return None
+
+
+def set_function_state(objective_function, state):
+    """Restore the state returned by `get_function_state` (if any)."""
+
+    if (state is not None) and hasattr(objective_function, "set_state"):
+        objective_function.set_state(state)
+
+
+def append_json_line(file_path, obj):
+    """Append `obj` to a JSON Lines file (one JSON document per line)."""
+
+    with open(file_path, "a") as fd:
+        fd.write(json.dumps(obj, sort_keys=True, default=_json_default) + "\n")
+
+
+def read_json_lines(file_path):
+    """Return the list of documents of a JSON Lines file (an empty list if
+    the file doesn't exist). A truncated last line is ignored."""
+
+    if not os.path.isfile(file_path):
+        return []
+
+    obj_list = []
+
+    with open(file_path, "r") as fd:
+        for line in fd:
+            try:
+                obj_list.append(json.loads(line))
+            except ValueError:
+                break
+
+    return obj_list
+
+
+class Checkpoint(object):
+    """The checkpoint file of an optimizer run.
+
+    Parameters
+    ----------
+    file_path : str
+        The checkpoint file path.
+    interval : int
+        A checkpoint is written every `interval` iterations (see `due`).
+    cache : EvaluationCache
+        The evaluation cache of the run (its path is recorded in the
+        checkpoint).
+
+    Attributes
+    ----------
+    file_path : str
+        The checkpoint file path.
+    interval : int
+        The number of iterations between two checkpoints.
+    cache_file_path : str
+        The path of the evaluation cache database (or ``None``).
+    """
+
+    def __init__(self, file_path, interval=1, cache=None):
+        if interval < 1:
+            raise ValueError("interval should be greater than 0")
+
+        self.file_path = file_path
+        self.interval = interval
+        self.cache_file_path = None if cache is None else cache.file_path
+
+    def due(self, iteration):
+        """Return `True` if a checkpoint should be written after `iteration`
+        (iterations are counted from 0)."""
+        return (iteration + 1) % self.interval == 0
+
+    def save(self, optimizer, state):
+        """Write the checkpoint (atomically).
+
+        Parameters
+        ----------
+        optimizer : str
+            The optimizer name (checked by `load`).
+        state : dict
+            The optimizer state (JSON serializable; Numpy arrays are
+            accepted).
+        """
+
+        checkpoint_dict = {"version": CHECKPOINT_VERSION,
+                           "optimizer": optimizer,
+                           "date_time": datetime.datetime.now().isoformat(),
+                           "cache_file_path": self.cache_file_path,
+                           "state": state}
+
+        directory_path = os.path.dirname(os.path.abspath(self.file_path))
+
+        fd, tmp_file_path = tempfile.mkstemp(suffix=".json", dir=directory_path)
+        try:
+            with os.fdopen(fd, "w") as tmp_file:
+                json.dump(checkpoint_dict, tmp_file, default=_json_default)
+            os.replace(tmp_file_path, self.file_path)
+        except:
+            os.remove(tmp_file_path)
+            raise
+
+    def load(self, optimizer):
+        """Return the optimizer state saved in the checkpoint (or ``None`` if
+        there is no checkpoint file).
+
+        Parameters
+        ----------
+        optimizer : str
+            The optimizer name given to `save`.
+
+        Raises
+        ------
+        ValueError
+            If the checkpoint was written by another optimizer or by an
+            incompatible version.
+        """
+
+        if not os.path.isfile(self.file_path):
+            return None
+
+        with open(self.file_path, "r") as fd:
+            checkpoint_dict = json.load(fd)
+
+        if checkpoint_dict.get("version") != CHECKPOINT_VERSION:
+            raise ValueError("Incompatible checkpoint version: {}".format(checkpoint_dict.get("version")))
+
+        if checkpoint_dict.get("optimizer") != optimizer:
+            raise ValueError("{} is a {} checkpoint (expected {})".format(self.file_path,
+                                                                          checkpoint_dict.get("optimizer"),
+                                                                          optimizer))
+
+        if checkpoint_dict["cache_file_path"] != self.cache_file_path:
+            print("Warning: the checkpoint was written with the evaluation cache {} (current cache: {}); "
+                  "evaluations made since the checkpoint will be made again".format(checkpoint_dict["cache_file_path"],
+                                                                                   self.cache_file_path))
+
+        return checkpoint_dict["state"]
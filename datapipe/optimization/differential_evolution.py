@@ -22,8 +22,20 @@
 
 __all__ = []
 
+import argparse
 import json
+import numpy as np
 from scipy import optimize
+from datapipe.optimization.checkpoint import Checkpoint
+from datapipe.optimization.checkpoint import append_json_line
+from datapipe.optimization.checkpoint import get_function_state
+from datapipe.optimization.checkpoint import get_rng_state
+from datapipe.optimization.checkpoint import read_json_lines
+from datapipe.optimization.checkpoint import set_function_state
+from datapipe.optimization.checkpoint import set_rng_state
+from datapipe.optimization.evaluation_cache import EvaluationCache
+from datapipe.optimization.multi_objective import MultiObjectiveEvaluator
+from datapipe.optimization.racing import RacingEvaluator
 from datapipe.optimization.objectivefunc.wavelets_mrfilter_delta_psi import ObjectiveFunction
 
 import datapipe.denoising.cdf
@@ -31,6 +43,18 @@ from datapipe.denoising.inverse_transform_sampling import EmpiricalDistribution
 
 def main():
 
+    # PARSE OPTIONS ###########################################################
+
+    parser = argparse.ArgumentParser(description="Optimize cleaning parameters with the differential evolution algorithm.")
+
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the run saved in the checkpoint file")
+
+    parser.add_argument("--checkpoint", default="optimize_sigma_diff_evo_checkpoint.json", metavar="FILE",
+                        help="The checkpoint file path (default: %(default)s)")
+
+    args = parser.parse_args()
+
     instrument = "astri"
     #instrument = "astri_konrad"
     #instrument = "digicam"
@@ -40,31 +64,37 @@ def main():
 
     if instrument == "astri":
 
+        cam_id = "ASTRICam"
         noise_distribution = EmpiricalDistribution(datapipe.denoising.cdf.ASTRI_CDF_FILE)
         input_files = ["/dev/shm/.jd/astri/gamma/"]
 
     elif instrument == "astri_konrad":
 
+        cam_id = "ASTRICam"
         noise_distribution = EmpiricalDistribution(datapipe.denoising.cdf.ASTRI_CDF_FILE)
         input_files = ["/dev/shm/.jd/astri_konrad/gamma/"]
 
     elif instrument == "digicam":
 
+        cam_id = "DigiCam"
         noise_distribution = EmpiricalDistribution(datapipe.denoising.cdf.DIGICAM_CDF_FILE)
         input_files = ["/dev/shm/.jd/digicam/gamma/"]
 
     elif instrument == "flashcam":
 
+        cam_id = "FlashCam"
         noise_distribution = EmpiricalDistribution(datapipe.denoising.cdf.FLASHCAM_CDF_FILE)
         input_files = ["/dev/shm/.jd/flashcam/gamma/"]
 
     elif instrument == "nectarcam":
 
+        cam_id = "NectarCam"
         noise_distribution = EmpiricalDistribution(datapipe.denoising.cdf.NECTARCAM_CDF_FILE)
         input_files = ["/dev/shm/.jd/nectarcam/gamma/"]
 
     elif instrument == "lstcam":
 
+        cam_id = "LSTCam"
         noise_distribution = EmpiricalDistribution(datapipe.denoising.cdf.LSTCAM_CDF_FILE)
         input_files = ["/dev/shm/.jd/lstcam/gamma/"]
 
@@ -72,40 +102,95 @@ def main():
 
         raise Exception("Unknown instrument", instrument)
 
+    # Evaluations are cached (on disk) and shared between runs
+    cache = EvaluationCache()
+
     func = ObjectiveFunction(input_files=input_files,
+                             cam_id=cam_id,
                              noise_distribution=noise_distribution,
                              max_num_img=None,
-                             aggregation_method="mean")  # "mean" or "median"
+                             aggregation_method="mean",  # "mean" or "median"
+                             cache=cache)
+
+    # Assess candidates on growing (stratified) subsets of images and only
+    # assess the most promising ones on the whole dataset
+    use_racing = True
+
+    # Record the cleaning time of each candidate along with its quality score
+    # and keep the Pareto front (candidates are then fully assessed: racing
+    # is not used)
+    multi_objective = False
+    quality_tolerance = 0.1     # The delta psi tolerance (in degrees) used to pick the fastest candidate
+
+    if multi_objective:
+        func = MultiObjectiveEvaluator(func)
+    elif use_racing:
+        func = RacingEvaluator(func)
 
     bounds = ((0.5, 6), (0.5, 6), (0.5, 6), (0.5, 6))
+    maxiter = 1000
 
-    x_list = []
-    fx_list = []
+    rng = np.random.RandomState()
+    checkpoint = Checkpoint(args.checkpoint, interval=1, cache=cache)
 
-    def callback(xk, convergence):
-        x_list.append(xk.tolist())
-        fx_list.append(float(func(xk)))
+    # The best individual of each iteration is appended to the iterations
+    # file (JSON Lines)
+    iterations_file_path = "optimize_sigma_diff_evo_iterations.jsonl"
+
+    state = checkpoint.load("differential_evolution") if args.resume else None
+
+    if state is None:
+        first_nit = 0
+        init = "latinhypercube"
+        iteration_list = []
+    else:
+        # Continue from the checkpointed population. The energies of this
+        # population are read from the evaluation cache. Scipy doesn't expose
+        # all its internal state thus the next iterations are not exactly the
+        # ones of an uninterrupted run.
+        first_nit = state["nit"]
+        init = np.array(state["population"])
+        set_rng_state(rng, state["rng_state"])
+        set_function_state(func, state["function_state"])
+        iteration_list = [it_dict for it_dict in read_json_lines(iterations_file_path) if it_dict["nit"] <= first_nit]
+
+    with open(iterations_file_path, "w") as fd:
+        for it_dict in iteration_list:
+            fd.write(json.dumps(it_dict, sort_keys=True) + "\n")
+
+    x_list = [it_dict["x"] for it_dict in iteration_list]
+    fx_list = [it_dict["fun"] for it_dict in iteration_list]
+
+    def callback(intermediate_result):
+        nit = first_nit + intermediate_result.nit
+
+        x_list.append(intermediate_result.x.tolist())
+        fx_list.append(float(intermediate_result.fun))
 
         fx_best = min(fx_list)
         fx_best_index = fx_list.index(fx_best)
         x_best = x_list[fx_best_index]
 
-        print("{}: f({})={} ({}) ; best ({}): f({})={}".format(len(x_list), x_list[-1], fx_list[-1], convergence, fx_best_index, x_best, fx_best))
+        print("{}: f({})={} ({}) ; best ({}): f({})={}".format(len(x_list), x_list[-1], fx_list[-1], intermediate_result.convergence, fx_best_index, x_best, fx_best))
 
-        res_dict = {
-                    "best_solution": x_best,
-                    "best_score": float(fx_best),
-                    "solutions": x_list,
-                    "scores": fx_list
-                   }
+        append_json_line(iterations_file_path, {"nit": nit,
+                                                "x": x_list[-1],
+                                                "fun": fx_list[-1],
+                                                "convergence": float(intermediate_result.convergence)})
 
-        with open("optimize_sigma_diff_evo.json", "w") as fd:
-            json.dump(res_dict, fd, sort_keys=True, indent=4)  # pretty print format
+        if checkpoint.due(nit - 1):
+            checkpoint.save("differential_evolution", {"nit": nit,
+                                                       "population": intermediate_result.population,
+                                                       "population_energies": intermediate_result.population_energies,
+                                                       "rng_state": get_rng_state(rng),
+                                                       "function_state": get_function_state(func)})
 
     res = optimize.differential_evolution(func,
                                           bounds,
-                                          maxiter=1000,        # The number of iterations
+                                          maxiter=maxiter - first_nit,  # The number of iterations
                                           popsize=10,
+                                          init=init,
+                                          seed=rng,
                                           callback=callback,
                                           #polish=False,
                                           disp=False)          # Print status messages
@@ -114,7 +199,7 @@ def main():
     print("f(x*) =", res.fun)
     print("Cause of the termination:", res.message)
     print("Number of evaluations of the objective functions:", res.nfev)
-    print("Number of iterations performed by the optimizer:", res.nit)
+    print("Number of iterations performed by the optimizer:", first_nit + res.nit)
 
     # SAVE RESULTS ############################################################
 
@@ -128,6 +213,12 @@ def main():
     with open("optimize_sigma_diff_evo.json", "w") as fd:
         json.dump(res_dict, fd, sort_keys=True, indent=4)  # pretty print format
 
+    if multi_objective:
+        func.save("optimize_sigma_diff_evo_pareto_front.json")
+        print("Pareto front (quality vs cleaning time):", func.pareto_front())
+        print("Fastest candidate within {} degree(s) of the best one:".format(quality_tolerance),
+              func.fastest_within(quality_tolerance))
+
 
 if __name__ == "__main__":
     main()
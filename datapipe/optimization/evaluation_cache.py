@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+Persistent cache of objective function evaluations.
+
+Each evaluation of an objective function is a full benchmark pass over a
+dataset. Results are stored in a SQLite database, keyed by:
+
+- a *dataset fingerprint* (the objective function, its fixed options and
+  the path, size and modification time of each input file; see
+  `dataset_fingerprint`);
+- the *canonical parameter vector* (parameters rounded to a fixed number of
+  decimals; see `canonical_params`).
+
+Thus repeated (or rounded-equal) points return instantly, across optimizer
+runs, restarts and processes (e.g. pool workers).
+
+The default database is "objective_function_evaluations.sqlite" in the
+datapipe cache directory (see :func:`datapipe.io.cache.cache_dir`).
+"""
+
+__all__ = ['EvaluationCache',
+           'canonical_params',
+           'dataset_fingerprint']
+
+import datetime
+import hashlib
+import json
+import math
+import os
+import sqlite3
+
+import numpy as np
+
+from datapipe.io.cache import cache_dir
+from datapipe.io.images import image_files_in_paths
+
+DEFAULT_FILE_NAME = "objective_function_evaluations.sqlite"
+
+def canonical_params(params, decimals=6):
+    """Return the canonical (string) form of a parameter vector.
+
+    Parameters are rounded to `decimals` decimals thus vectors that only
+    differ by rounding errors have the same canonical form.
+
+    Parameters
+    ----------
+    params : sequence of float
+        The parameter vector.
+    decimals : int
+        The number of decimals kept.
+
+    Returns
+    -------
+    str
+        The canonical parameter vector.
+    """
+
+    # "+ 0." turns -0. into 0.
+    rounded_params = [float(np.round(float(param), decimals)) + 0. for param in params]
+
+    return json.dumps(rounded_params)
+
+
+def _json_default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError("{} is not JSON serializable".format(type(obj)))
+
+
+def dataset_fingerprint(input_files, **options):
+    """Return a fingerprint of a dataset and of the options used to assess it.
+
+    The fingerprint changes if an input file is added, removed or modified
+    (its size or its modification time changes) or if an option changes.
+
+    Parameters
+    ----------
+    input_files : sequence of str
+        The input files or directories (as given to
+        :meth:`datapipe.denoising.abstract_cleaning_algorithm.AbstractCleaningAlgorithm.run`).
+    options
+        The options having an effect on evaluations (e.g. the objective
+        function name, the aggregation method, the maximum number of images,
+        ...). Values must be JSON serializable (Numpy arrays are accepted).
+
+    Returns
+    -------
+    str
+        The fingerprint (a SHA-1 hexadecimal digest).
+    """
+
+    file_list = []
+
+    for file_path in sorted(image_files_in_paths(input_files)):
+        file_stat = os.stat(file_path)
+        file_list.append((os.path.abspath(file_path), file_stat.st_size, file_stat.st_mtime_ns))
+
+    content = json.dumps({"files": file_list, "options": options},
+                         sort_keys=True,
+                         default=_json_default)
+
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+class EvaluationCache(object):
+    """A persistent cache of objective function evaluations.
+
+    Only finite values are cached: failures (e.g. an infinite score returned
+    when the dataset cannot be read) and rejected points (NaN) are evaluated
+    again.
+
+    The SQLite database is opened for each access thus instances can be
+    copied to (or pickled for) other processes.
+
+    Parameters
+    ----------
+    file_path : str
+        The SQLite database path. The default database of the datapipe cache
+        directory is used if `None`. Evaluations are only cached in memory if
+        the datapipe cache is disabled.
+    decimals : int
+        The number of decimals of canonical parameter vectors (see
+        `canonical_params`).
+    timeout : float
+        How long (in seconds) to wait for the database lock held by another
+        process.
+    """
+
+    def __init__(self, file_path=None, decimals=6, timeout=60.):
+        if file_path is None:
+            directory_path = cache_dir()
+            if directory_path is not None:
+                file_path = os.path.join(directory_path, DEFAULT_FILE_NAME)
+
+        self.file_path = file_path
+        self.decimals = decimals
+        self.timeout = timeout
+
+        self._memory_cache = {}
+
+        if self.file_path is not None:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.file_path)), exist_ok=True)
+                self._execute("CREATE TABLE IF NOT EXISTS evaluations ("
+                              "fingerprint TEXT NOT NULL, "
+                              "params TEXT NOT NULL, "
+                              "value REAL NOT NULL, "
+                              "date_time TEXT, "
+                              "PRIMARY KEY (fingerprint, params))")
+            except (OSError, sqlite3.Error) as e:
+                # The cache is only an optimization: keep going without it
+                print("Evaluation cache disabled ({}): {}".format(self.file_path, e))
+                self.file_path = None
+
+    def _execute(self, sql, parameters=()):
+        """Execute `sql` in a transaction and return the fetched rows."""
+
+        connection = sqlite3.connect(self.file_path, timeout=self.timeout)
+        try:
+            with connection:
+                return connection.execute(sql, parameters).fetchall()
+        finally:
+            connection.close()
+
+    def get(self, fingerprint, params):
+        """Return the cached value of `params` (or ``None`` if it is not cached).
+
+        Parameters
+        ----------
+        fingerprint : str
+            The dataset fingerprint (see `dataset_fingerprint`).
+        params : sequence of float
+            The parameter vector.
+
+        Returns
+        -------
+        float or None
+            The cached value.
+        """
+
+        key = (fingerprint, canonical_params(params, self.decimals))
+
+        if key in self._memory_cache:
+            return self._memory_cache[key]
+
+        if self.file_path is None:
+            return None
+
+        try:
+            rows = self._execute("SELECT value FROM evaluations WHERE fingerprint=? AND params=?", key)
+        except sqlite3.Error:
+            return None
+
+        if len(rows) == 0:
+            return None
+
+        self._memory_cache[key] = rows[0][0]
+
+        return rows[0][0]
+
+    def put(self, fingerprint, params, value):
+        """Store the value of `params` (non finite values are ignored).
+
+        Parameters
+        ----------
+        fingerprint : str
+            The dataset fingerprint (see `dataset_fingerprint`).
+        params : sequence of float
+            The parameter vector.
+        value : float
+            The objective function value.
+        """
+
+        value = float(value)
+
+        if not math.isfinite(value):
+            return
+
+        key = (fingerprint, canonical_params(params, self.decimals))
+        self._memory_cache[key] = value
+
+        if self.file_path is None:
+            return
+
+        try:
+            self._execute("INSERT OR REPLACE INTO evaluations VALUES (?, ?, ?, ?)",
+                          key + (value, str(datetime.datetime.now())))
+        except sqlite3.Error as e:
+            print("Cannot write the evaluation cache ({}): {}".format(self.file_path, e))
+
+    def __len__(self):
+        """Return the number of cached evaluations (all fingerprints)."""
+
+        if self.file_path is None:
+            return len(self._memory_cache)
+
+        return self._execute("SELECT COUNT(*) FROM evaluations")[0][0]
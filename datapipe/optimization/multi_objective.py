@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+Multi-objective (quality vs cleaning time) assessment of objective functions.
+
+Objective functions of :mod:`datapipe.optimization.objectivefunc` only score
+the cleaning quality (the aggregated delta psi) but the production budget is
+the cleaning time per event. A `MultiObjectiveEvaluator` wraps an objective
+function and records, for each candidate, both its quality score and its
+mean cleaning time per image (``full_clean_execution_time_sec``). The
+non-dominated candidates (the Pareto front) can then be listed and the
+fastest candidate within a quality tolerance of the best one can be picked
+(e.g. a wavelet parameter set using fewer scales) instead of only the most
+accurate one.
+
+A `MultiObjectiveEvaluator` is a callable taking a point and returning a
+float, like the objective function it wraps, thus it can be given to
+``bruteforce``, ``saes`` or ``differential_evolution`` as is. It returns the
+quality score (plus ``time_weight`` times the cleaning time, to steer the
+optimizer towards fast candidates).
+
+Candidates are always assessed on the whole dataset thus a
+`MultiObjectiveEvaluator` can't be combined with a
+:class:`datapipe.optimization.racing.RacingEvaluator`.
+"""
+
+__all__ = ['MultiObjectiveEvaluator',
+           'pareto_front_mask']
+
+import json
+import math
+
+import numpy as np
+
+from datapipe.benchmark.aggregation import aggregate_array
+
+
+def pareto_front_mask(costs):
+    """Return the mask of non-dominated points (all objectives are minimized).
+
+    A point is dominated if another point is not worse on any objective and
+    better on at least one. Points having a non finite cost are never in the
+    front. Duplicated points are all in the front (or none of them).
+
+    Parameters
+    ----------
+    costs : array_like
+        The costs (shape ``(num_points, num_objectives)``).
+
+    Returns
+    -------
+    Numpy array
+        A boolean array of shape ``(num_points,)``.
+    """
+
+    costs = np.asarray(costs, dtype=np.float64)
+
+    if costs.ndim != 2:
+        raise ValueError("costs should be a 2D array (num_points, num_objectives)")
+
+    mask = np.all(np.isfinite(costs), axis=1)
+
+    for point_index in np.flatnonzero(mask):
+        others = costs[mask]
+        dominated = np.any(np.all(others <= costs[point_index], axis=1) & np.any(others < costs[point_index], axis=1))
+        if dominated:
+            mask[point_index] = False
+
+    return mask
+
+
+class MultiObjectiveEvaluator(object):
+    """Assess candidates of an objective function on quality and cleaning
+    time (see the module documentation).
+
+    Records are kept by the instance: with a process pool executor (see
+    :func:`datapipe.optimization.saes.minimize`) each worker has its own
+    copy, thus use a single worker to get the whole front.
+
+    Parameters
+    ----------
+    objective_function : ObjectiveFunction
+        An objective function of :mod:`datapipe.optimization.objectivefunc`
+        (it must have `aggregation_method`, `cleaning_function_params` and
+        `score_images` attributes).
+    time_weight : float
+        The weight of the mean cleaning time (in score units per second) in
+        the value returned to the optimizer. With the default (0), the
+        optimizer only minimizes the quality score.
+
+    Attributes
+    ----------
+    records : list of dict
+        The assessed candidates: their point ("x"), their quality score
+        ("score") and their mean cleaning time per image ("time_sec").
+    """
+
+    def __init__(self, objective_function, time_weight=0.):
+        self.objective_function = objective_function
+        self.time_weight = time_weight
+        self.records = []
+
+        # Times are cached along with scores (with a distinct fingerprint).
+        # Beware that cached times were measured on the machine that made
+        # the evaluation.
+        self.cache = getattr(objective_function, "cache", None)
+
+        if self.cache is not None:
+            self.score_fingerprint = objective_function.fingerprint
+            self.time_fingerprint = objective_function.fingerprint + "/full_clean_execution_time_sec"
+
+    def get_state(self):
+        """Return the recorded candidates (a JSON serializable dictionary; see
+        :mod:`datapipe.optimization.checkpoint`)."""
+
+        return {"records": self.records}
+
+    def set_state(self, state):
+        """Restore the recorded candidates returned by `get_state`."""
+
+        self.records = [dict(record) for record in state["records"]]
+
+    def _evaluate(self, x):
+        """Return the quality score and the mean cleaning time of `x`."""
+
+        objective_function = self.objective_function
+
+        if self.cache is not None:
+            score = self.cache.get(self.score_fingerprint, x)
+            time_sec = self.cache.get(self.time_fingerprint, x)
+            if (score is not None) and (time_sec is not None):
+                return score, time_sec
+
+        delta_psi_deg, execution_time_sec = objective_function.score_images(x)
+
+        score = aggregate_array(delta_psi_deg, objective_function.aggregation_method)
+        time_sec = aggregate_array(execution_time_sec, "mean")
+
+        if self.cache is not None:
+            self.cache.put(self.score_fingerprint, x, score)
+            self.cache.put(self.time_fingerprint, x, time_sec)
+
+        return score, time_sec
+
+    def __call__(self, x):
+        """Return the weighted score of `x` and record its quality score and
+        cleaning time."""
+
+        if self.objective_function.cleaning_function_params(x) is None:
+            return float('nan')           # Rejected solution (see the objective function)
+
+        try:
+            score, time_sec = self._evaluate(x)
+        except Exception as e:
+            print(e)
+            return float('inf')
+
+        if math.isfinite(score) and math.isfinite(time_sec):
+            self.records.append({"x": [float(value) for value in x],
+                                 "score": score,
+                                 "time_sec": time_sec})
+
+        return score + self.time_weight * time_sec
+
+    def pareto_front(self):
+        """Return the non-dominated records (quality score and cleaning time
+        are minimized), sorted by increasing cleaning time."""
+
+        if len(self.records) == 0:
+            return []
+
+        costs = [(record["score"], record["time_sec"]) for record in self.records]
+        front = [record for record, in_front in zip(self.records, pareto_front_mask(costs)) if in_front]
+
+        return sorted(front, key=lambda record: (record["time_sec"], record["score"]))
+
+    def fastest_within(self, tolerance):
+        """Return the fastest record whose quality score is at most the best
+        score plus `tolerance` (in score units, e.g. degrees for delta psi).
+
+        The returned record is in the Pareto front. ``None`` is returned if
+        there is no record.
+        """
+
+        front = self.pareto_front()
+
+        if len(front) == 0:
+            return None
+
+        best_score = min(record["score"] for record in front)
+
+        # The front is sorted by increasing time
+        return next(record for record in front if record["score"] <= best_score + tolerance)
+
+    def save(self, file_path):
+        """Save the records and the Pareto front in a JSON file."""
+
+        front = self.pareto_front()
+
+        with open(file_path, "w") as fd:
+            json.dump({"time_weight": self.time_weight,
+                       "records": self.records,
+                       "pareto_front": front}, fd, sort_keys=True, indent=4)  # pretty print format
@@ -20,5 +20,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-__all__ = ['tailcut_delta_psi',
+__all__ = ['image_filter',
+           'preloaded_dataset',
+           'tailcut_delta_psi',
            'wavelets_mrfilter_delta_psi']
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+Declarative selection of the images assessed by objective functions.
+
+An `ImageFilter` describes which images of a dataset are kept (MC energy
+range, reference npe range, minimum distance between the reference signal
+and the camera border, telescopes). Filters are resolved against a
+`DatasetIndex`: the few metadata filters need (event and telescope ids, MC
+energy, reference npe and signal to border distance) for every image of the
+dataset. The index is built on the first pass over a dataset and then kept
+in the datapipe cache directory (see :func:`datapipe.io.cache.cache_dir`),
+thus on following runs excluded images are never loaded nor cleaned.
+"""
+
+__all__ = ['ImageFilter',
+           'DatasetIndex',
+           'index_record']
+
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from datapipe.image import pixel_graph as pixel_graph_analysis
+from datapipe.image.signal_to_border_distance import signal_to_border_distance
+from datapipe.io import geometry_converter
+from datapipe.io.cache import cache_dir
+from datapipe.optimization.evaluation_cache import dataset_fingerprint
+
+# Increment this number when the content of index records changes
+INDEX_VERSION = 1
+
+def _in_range(value, value_range):
+    """Return `True` if `value` is in the closed interval `value_range`
+    (``(min, max)``, either bound can be ``None``)."""
+
+    if value_range is None:
+        return True
+
+    if value is None:
+        return False
+
+    min_value, max_value = value_range
+
+    return ((min_value is None) or (value >= min_value)) and ((max_value is None) or (value <= max_value))
+
+
+def index_record(image, cam_id, pixel_graph=None):
+    """Return the index record of an image (the metadata used by filters).
+
+    Parameters
+    ----------
+    image : Image2D
+        An image yielded by :func:`datapipe.io.images.image_generator`.
+    cam_id : str
+        The camera name.
+    pixel_graph : PixelGraph, optional
+        If given, the signal to border distance is computed on the camera
+        pixel graph (like in
+        :meth:`datapipe.denoising.abstract_cleaning_algorithm.AbstractCleaningAlgorithm.run`
+        for hexagonal cameras), otherwise it is computed on the 2D image.
+
+    Returns
+    -------
+    dict
+        The record (JSON serializable).
+    """
+
+    meta = image.meta
+
+    mc_energy = meta.get('mc_energy')
+    if isinstance(mc_energy, (tuple, list)):
+        mc_energy = mc_energy[0]    # (value, unit) tuple of simtel images
+
+    reference_image = np.asarray(image.reference_image, dtype=np.float64)
+
+    try:
+        if pixel_graph is None:
+            border_distance = signal_to_border_distance(reference_image)
+        else:
+            reference_image_1d = geometry_converter.image_2d_to_1d(reference_image, cam_id)
+            border_distance = pixel_graph_analysis.signal_to_border_distance(reference_image_1d, pixel_graph)
+        border_distance = int(border_distance)
+    except ValueError:
+        border_distance = None
+
+    return {"file_path": meta['file_path'],
+            "event_id": int(meta['event_id']),
+            "tel_id": int(meta['tel_id']),
+            "mc_energy": None if mc_energy is None else float(mc_energy),
+            "npe": float(np.nansum(reference_image)),
+            "signal_to_border_distance": border_distance}
+
+
+class ImageFilter(object):
+    """A declarative image selection.
+
+    All criteria are optional (``None`` means "no constraint"); an image is
+    kept if it meets all of them.
+
+    Parameters
+    ----------
+    mc_energy_range : tuple of float
+        The ``(min, max)`` MC energy (in TeV) of kept images (closed
+        interval, either bound can be ``None``).
+    npe_range : tuple of float
+        The ``(min, max)`` number of photoelectrons of the reference image
+        of kept images.
+    min_signal_to_border_distance : int
+        The minimum distance (in pixels) between the reference signal and the
+        camera border (e.g. 1 removes images truncated by the border).
+    tel_id_list : sequence of int
+        The telescopes of kept images.
+    """
+
+    def __init__(self, mc_energy_range=None, npe_range=None, min_signal_to_border_distance=None, tel_id_list=None):
+        self.mc_energy_range = None if mc_energy_range is None else tuple(mc_energy_range)
+        self.npe_range = None if npe_range is None else tuple(npe_range)
+        self.min_signal_to_border_distance = min_signal_to_border_distance
+        self.tel_id_list = None if tel_id_list is None else sorted(int(tel_id) for tel_id in tel_id_list)
+
+        for value_range in (self.mc_energy_range, self.npe_range):
+            if (value_range is not None) and (len(value_range) != 2):
+                raise ValueError("Ranges must be (min, max) tuples: {}".format(value_range))
+
+    def __repr__(self):
+        return "ImageFilter({})".format(", ".join("{}={!r}".format(key, value) for key, value in sorted(self.to_dict().items())))
+
+    def selects_all(self):
+        """Return `True` if this filter keeps all images."""
+        return all(value is None for value in self.to_dict().values())
+
+    def to_dict(self):
+        """Return the filter criteria (a JSON serializable dictionary)."""
+        return {"mc_energy_range": None if self.mc_energy_range is None else list(self.mc_energy_range),
+                "npe_range": None if self.npe_range is None else list(self.npe_range),
+                "min_signal_to_border_distance": self.min_signal_to_border_distance,
+                "tel_id_list": self.tel_id_list}
+
+    def accept(self, record):
+        """Return `True` if the image of `record` (see `index_record`) is kept."""
+
+        if (self.tel_id_list is not None) and (record["tel_id"] not in self.tel_id_list):
+            return False
+
+        if not _in_range(record["mc_energy"], self.mc_energy_range):
+            return False
+
+        if not _in_range(record["npe"], self.npe_range):
+            return False
+
+        if self.min_signal_to_border_distance is not None:
+            border_distance = record["signal_to_border_distance"]
+            if (border_distance is None) or (border_distance < self.min_signal_to_border_distance):
+                return False
+
+        return True
+
+
+class DatasetIndex(object):
+    """The index records of all the images of a camera in a dataset.
+
+    Parameters
+    ----------
+    records : list of dict
+        The record of each image (see `index_record`), in the dataset order.
+    """
+
+    def __init__(self, records):
+        self.records = list(records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def select(self, image_filter):
+        """Return the records of images kept by `image_filter` (in the dataset order)."""
+        return [record for record in self.records if image_filter.accept(record)]
+
+    @staticmethod
+    def file_path(input_files, cam_id):
+        """Return the path of the index file of a dataset (or ``None`` if the
+        cache is disabled).
+
+        The file name contains the dataset fingerprint thus the index is
+        rebuilt when an input file is added, removed or modified.
+        """
+
+        directory_path = cache_dir()
+
+        if directory_path is None:
+            return None
+
+        fingerprint = dataset_fingerprint(input_files, cam_id=cam_id, index_version=INDEX_VERSION)
+
+        return os.path.join(directory_path, "dataset_index_{}.json".format(fingerprint))
+
+    @classmethod
+    def load(cls, input_files, cam_id):
+        """Return the index of a dataset (or ``None`` if it is not built yet)."""
+
+        file_path = cls.file_path(input_files, cam_id)
+
+        if (file_path is None) or (not os.path.isfile(file_path)):
+            return None
+
+        try:
+            with open(file_path, "r") as fd:
+                return cls(json.load(fd))
+        except (OSError, ValueError):
+            # Corrupted or unreadable file: it will be rebuilt
+            return None
+
+    def save(self, input_files, cam_id):
+        """Write the index of a dataset in the cache directory.
+
+        The file is written atomically. Errors (e.g. a read only cache
+        directory) are silently ignored: the index is only an optimization.
+        """
+
+        file_path = self.file_path(input_files, cam_id)
+
+        if file_path is None:
+            return
+
+        try:
+            directory_path = os.path.dirname(file_path)
+            os.makedirs(directory_path, exist_ok=True)
+
+            fd, tmp_file_path = tempfile.mkstemp(suffix=".json", dir=directory_path)
+            try:
+                with os.fdopen(fd, "w") as tmp_file:
+                    json.dump(self.records, tmp_file)
+                os.replace(tmp_file_path, file_path)
+            except:
+                os.remove(tmp_file_path)
+                raise
+        except OSError:
+            pass
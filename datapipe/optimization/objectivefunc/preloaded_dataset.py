@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+Datasets loaded once in memory for objective functions.
+
+Objective functions evaluate hundreds of parameter vectors on the same images.
+A `PreloadedDataset` reads the input files once (FITS or Simtel decoding,
+2D/1D geometry conversion, reference Hillas parameters, ...) and keeps what
+evaluations need in compact Numpy arrays thus each evaluation only cleans and
+scores images from memory.
+
+An `ImageFilter` (see :mod:`datapipe.optimization.objectivefunc.image_filter`)
+can restrict the dataset: once the dataset is indexed, only the kept images
+are read.
+"""
+
+__all__ = ['PreloadedDataset',
+           'save_results']
+
+import collections
+import json
+import time
+
+import numpy as np
+
+from datapipe.benchmark.assess import assess_image_cleaning_batch
+from datapipe.benchmark.assess import norm_angle_diff
+from datapipe.denoising.abstract_cleaning_algorithm import image_generator_kwargs
+from datapipe.image.hillas_parameters import get_hillas_parameters_batch
+from datapipe.image.pixel_graph import get_pixel_graph
+from datapipe.io import geometry_converter
+from datapipe.io.images import image_generator
+from datapipe.optimization.objectivefunc.image_filter import DatasetIndex
+from datapipe.optimization.objectivefunc.image_filter import index_record
+
+# The delta psi of images that cannot be cleaned or parametrized
+WORST_DELTA_PSI_DEG = 90.
+
+class PreloadedDataset(object):
+    """The images of a dataset and their reference Hillas psi angle.
+
+    Parameters
+    ----------
+    input_files : sequence of str
+        The input files or directories.
+    cam_id : str
+        The camera name (only images of this camera are loaded).
+    max_num_img : int
+        The maximum number of images to load (all if `None`). With an
+        `image_filter`, this is the maximum number of kept images.
+    image_filter : ImageFilter
+        The images to load (all if `None`). The dataset is indexed on the
+        first load (excluded images are read but neither kept nor cleaned);
+        following loads only read kept images.
+    verbose : bool
+        Print the number of loaded images and the loading time if `True`.
+
+    Attributes
+    ----------
+    cam_id : str
+        The camera name.
+    input_images : Numpy array
+        The 2D input images (shape (N, H, W)).
+    reference_images : Numpy array
+        The 2D reference images (shape (N, H, W)).
+    reference_hillas_psi : Numpy array
+        The Hillas psi angle (in radians) of each 1D reference image (NaN if
+        the reference image is empty).
+    reference_sum_pe : Numpy array
+        The total number of photoelectrons of each reference image.
+    metadata : list of dict
+        The metadata of each image (event_id, tel_id, mc_energy, ...).
+    pixels_position_1d : tuple of Numpy arrays
+        The ``(pix_x, pix_y)`` position of the camera pixels.
+    """
+
+    def __init__(self, input_files, cam_id, max_num_img=None, image_filter=None, verbose=True):
+        self.cam_id = cam_id
+
+        geom1d = geometry_converter.get_geom1d(cam_id)
+        self.pixels_position_1d = (np.asarray(geom1d.pix_x.value), np.asarray(geom1d.pix_y.value))
+
+        start_time = time.perf_counter()
+
+        input_image_list = []
+        reference_image_list = []
+        self.metadata = []
+
+        if (image_filter is None) or image_filter.selects_all():
+            image_iterator = image_generator(input_files,
+                                             max_num_images=max_num_img,
+                                             **image_generator_kwargs(cam_id))
+        else:
+            # Borders are analysed like in AbstractCleaningAlgorithm.run()
+            pixel_graph = get_pixel_graph(cam_id) if str(geom1d.pix_type).startswith("hex") else None
+            image_iterator = _filtered_image_generator(input_files, cam_id, image_filter, max_num_img, pixel_graph)
+
+        for image in image_iterator:
+            input_image_list.append(np.asarray(image.input_image, dtype=np.float64))
+            reference_image_list.append(np.asarray(image.reference_image, dtype=np.float64))
+            self.metadata.append(dict(image.meta))
+
+        if len(input_image_list) > 0:
+            self.input_images = np.stack(input_image_list)
+            self.reference_images = np.stack(reference_image_list)
+            reference_images_1d = geometry_converter.images_2d_to_1d(self.reference_images, cam_id)
+
+            reference_hillas = get_hillas_parameters_batch(self.pixels_position_1d, reference_images_1d)
+            self.reference_hillas_psi = np.asarray(reference_hillas["psi"], dtype=np.float64)
+            self.reference_sum_pe = np.nansum(self.reference_images, axis=(1, 2))
+        else:
+            self.input_images = np.empty((0, 0, 0))
+            self.reference_images = np.empty((0, 0, 0))
+            self.reference_hillas_psi = np.empty(0)
+            self.reference_sum_pe = np.empty(0)
+
+        if verbose:
+            print("{} {} images loaded in {:.1f}s".format(len(self), cam_id, time.perf_counter() - start_time))
+
+    def __len__(self):
+        return len(self.input_images)
+
+    def subset(self, image_indices):
+        """Return a new dataset made of the `image_indices` images (or boolean mask)."""
+
+        image_indices = np.arange(len(self))[image_indices]
+
+        dataset = PreloadedDataset.__new__(PreloadedDataset)
+        dataset.cam_id = self.cam_id
+        dataset.pixels_position_1d = self.pixels_position_1d
+        dataset.input_images = self.input_images[image_indices]
+        dataset.reference_images = self.reference_images[image_indices]
+        dataset.reference_hillas_psi = self.reference_hillas_psi[image_indices]
+        dataset.reference_sum_pe = self.reference_sum_pe[image_indices]
+        dataset.metadata = [self.metadata[index] for index in image_indices]
+
+        return dataset
+
+    def clean(self, cleaning_algorithm, cleaning_function_params, verbose=False):
+        """Clean all images.
+
+        Parameters
+        ----------
+        cleaning_algorithm : AbstractCleaningAlgorithm
+            The image cleaning algorithm.
+        cleaning_function_params : dict
+            The parameters of ``cleaning_algorithm.clean_image()`` (`cam_id`
+            is added).
+        verbose : bool
+            Print errors if `True`.
+
+        Returns
+        -------
+        tuple
+            ``(cleaned_images, execution_time_sec)``: the 2D cleaned images
+            (NaN images for failed cleanings) and the cleaning time of each
+            image (Numpy arrays).
+        """
+
+        cleaning_function_params = dict(cleaning_function_params, cam_id=self.cam_id)
+
+        cleaned_images = np.full(self.input_images.shape, np.nan)
+        execution_time_sec = np.full(len(self), np.nan)
+
+        for image_index, input_image in enumerate(self.input_images):
+            try:
+                # Copy the image (some cleaning functions like Tailcut may change it)
+                initial_time = time.perf_counter()
+                cleaned_images[image_index] = cleaning_algorithm.clean_image(input_image.copy(), **cleaning_function_params)
+                execution_time_sec[image_index] = time.perf_counter() - initial_time
+            except Exception as e:
+                if verbose:
+                    print("Abort image {}: {} ({})".format(image_index, e, type(e)))
+
+        return cleaned_images, execution_time_sec
+
+    def hillas_delta_psi(self, cleaned_images):
+        """Return the normalized delta psi (in degrees) of `cleaned_images`
+        (see `delta_psi`)."""
+
+        if len(self) == 0:
+            return np.empty(0)
+
+        # Failed cleanings (NaN images) have a null size thus a NaN psi
+        cleaned_images_1d = geometry_converter.images_2d_to_1d(cleaned_images, self.cam_id)
+        cleaned_hillas = get_hillas_parameters_batch(self.pixels_position_1d, cleaned_images_1d)
+
+        delta_psi_rad = np.asarray(cleaned_hillas["psi"], dtype=np.float64) - self.reference_hillas_psi
+        delta_psi_deg = norm_angle_diff(np.degrees(delta_psi_rad))
+        delta_psi_deg[np.isnan(delta_psi_deg)] = WORST_DELTA_PSI_DEG
+
+        return delta_psi_deg
+
+    def pixel_scores(self, cleaned_images, benchmark_method="all"):
+        """Return the pixel metrics of `cleaned_images` regarding the
+        reference images.
+
+        Parameters
+        ----------
+        cleaned_images : Numpy array
+            The 2D cleaned images (see `clean`).
+        benchmark_method : str or sequence of str
+            The metrics (see
+            :func:`datapipe.benchmark.assess.assess_image_cleaning_batch`).
+
+        Returns
+        -------
+        collections.OrderedDict
+            The score of each image (a Numpy array) for each metric name
+            (empty if the dataset is empty). Failed cleanings get NaN scores.
+        """
+
+        if len(self) == 0:
+            return collections.OrderedDict()
+
+        score_array, metric_name_tuple = assess_image_cleaning_batch(self.input_images,
+                                                                     cleaned_images,
+                                                                     self.reference_images,
+                                                                     benchmark_method)
+
+        return collections.OrderedDict(zip(metric_name_tuple, score_array.T))
+
+    def assess(self, cleaning_algorithm, cleaning_function_params, benchmark_method=None, verbose=False):
+        """Clean all images and return their delta psi, their cleaning time
+        and (optionally) their pixel metrics.
+
+        Parameters
+        ----------
+        cleaning_algorithm : AbstractCleaningAlgorithm
+            The image cleaning algorithm.
+        cleaning_function_params : dict
+            The parameters of ``cleaning_algorithm.clean_image()``.
+        benchmark_method : str or sequence of str
+            The pixel metrics to compute (see `pixel_scores`; none if
+            `None`).
+        verbose : bool
+            Print errors if `True`.
+
+        Returns
+        -------
+        tuple
+            ``(delta_psi_deg, execution_time_sec, pixel_scores)``.
+        """
+
+        cleaned_images, execution_time_sec = self.clean(cleaning_algorithm, cleaning_function_params, verbose=verbose)
+
+        delta_psi_deg = self.hillas_delta_psi(cleaned_images)
+
+        if benchmark_method is None:
+            pixel_scores = collections.OrderedDict()
+        else:
+            pixel_scores = self.pixel_scores(cleaned_images, benchmark_method)
+
+        return delta_psi_deg, execution_time_sec, pixel_scores
+
+    def delta_psi(self, cleaning_algorithm, cleaning_function_params, verbose=False):
+        """Clean all images and return their normalized delta psi (in degrees).
+
+        The delta psi of an image is the (normalized) difference between the
+        Hillas psi angle of its cleaned image and of its reference image.
+        Images that cannot be cleaned or parametrized (e.g. an empty
+        cleaned image) get the worst score (90 degrees).
+
+        Parameters
+        ----------
+        cleaning_algorithm : AbstractCleaningAlgorithm
+            The image cleaning algorithm.
+        cleaning_function_params : dict
+            The parameters of ``cleaning_algorithm.clean_image()`` (`cam_id`
+            is added).
+        verbose : bool
+            Print errors if `True`.
+
+        Returns
+        -------
+        tuple
+            ``(delta_psi_deg, execution_time_sec)``: the normalized delta psi
+            and the cleaning time of each image (Numpy arrays).
+        """
+
+        delta_psi_deg, execution_time_sec, pixel_scores = self.assess(cleaning_algorithm,
+                                                                      cleaning_function_params,
+                                                                      verbose=verbose)
+
+        return delta_psi_deg, execution_time_sec
+
+
+def _filtered_image_generator(input_files, cam_id, image_filter, max_num_img, pixel_graph):
+    """Yield the `cam_id` images of `input_files` kept by `image_filter`.
+
+    If the dataset is indexed, only the files containing kept images are read
+    (and only kept events and telescopes are decoded in simtel files).
+    Otherwise all images are read to build the index, which is saved if the
+    whole dataset has been read.
+    """
+
+    generator_kwargs = image_generator_kwargs(cam_id)
+    index = DatasetIndex.load(input_files, cam_id)
+
+    if index is None:
+        records = []
+        num_images = 0
+
+        for image in image_generator(input_files, **generator_kwargs):
+            if (max_num_img is not None) and (num_images >= max_num_img):
+                return      # incomplete index: it is not saved
+
+            record = index_record(image, cam_id, pixel_graph)
+            records.append(record)
+
+            if image_filter.accept(record):
+                num_images += 1
+                yield image
+
+        DatasetIndex(records).save(input_files, cam_id)
+
+    else:
+        records = index.select(image_filter)[:max_num_img]
+
+        # Images to read in each file (in the dataset order)
+        image_ids_by_file = collections.OrderedDict()
+        for record in records:
+            image_ids_by_file.setdefault(record["file_path"], set()).add((record["event_id"], record["tel_id"]))
+
+        for file_path, image_ids in image_ids_by_file.items():
+            for image in image_generator([file_path],
+                                         ev_filter_list=sorted({event_id for event_id, tel_id in image_ids}),
+                                         tel_filter_list=sorted({tel_id for event_id, tel_id in image_ids}),
+                                         **generator_kwargs):
+                if (image.meta['event_id'], image.meta['tel_id']) in image_ids:
+                    yield image
+
+
+def save_results(output_file_path, dataset, delta_psi_deg, execution_time_sec, pixel_scores=None, **kwargs):
+    """Save the result of an objective function evaluation in a JSON file.
+
+    Parameters
+    ----------
+    output_file_path : str
+        The JSON file path.
+    dataset : PreloadedDataset
+        The assessed dataset.
+    delta_psi_deg, execution_time_sec : Numpy array
+        The score and the cleaning time of each image (see
+        `PreloadedDataset.delta_psi`).
+    pixel_scores : dict
+        The pixel metrics of each image (see `PreloadedDataset.pixel_scores`).
+    kwargs
+        Additional (JSON serializable) entries (e.g. the cleaning parameters,
+        the aggregated score, ...).
+    """
+
+    io_list = []
+
+    if pixel_scores is None:
+        pixel_scores = {}
+
+    for image_index, (metadata, delta_psi, execution_time) in enumerate(zip(dataset.metadata, delta_psi_deg, execution_time_sec)):
+        image_dict = {key: metadata[key] for key in ("file_path", "event_id", "tel_id") if key in metadata}
+        image_dict["delta_psi"] = float(delta_psi)
+        image_dict["full_clean_execution_time_sec"] = float(execution_time)
+        for metric_name, scores in pixel_scores.items():
+            image_dict[metric_name] = float(scores[image_index])
+        io_list.append(image_dict)
+
+    output_dict = dict(kwargs)
+    output_dict["cam_id"] = dataset.cam_id
+    output_dict["io"] = io_list
+
+    with open(output_file_path, "w") as fd:
+        json.dump(output_dict, fd, sort_keys=True)
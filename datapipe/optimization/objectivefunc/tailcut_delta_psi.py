@@ -26,6 +26,13 @@ import numpy as np
 
 from datapipe.denoising.tailcut import Tailcut
 from datapipe.benchmark import assess
+from datapipe.benchmark.aggregation import AGGREGATION_METHODS
+from datapipe.benchmark.aggregation import ScoreAggregator
+from datapipe.benchmark.aggregation import aggregate_array
+from datapipe.optimization.evaluation_cache import dataset_fingerprint
+from datapipe.optimization.objectivefunc.image_filter import ImageFilter
+from datapipe.optimization.objectivefunc.preloaded_dataset import PreloadedDataset
+from datapipe.optimization.objectivefunc.preloaded_dataset import save_results
 
 
 def norm_angle_diff(angle_in_degrees):
@@ -40,111 +47,188 @@ def norm_angle_diff(angle_in_degrees):
 
 class ObjectiveFunction:
 
-    def __init__(self, input_files, max_num_img=None, aggregation_method="mean"):
+    def __init__(self,
+                 input_files,
+                 cam_id=None,
+                 max_num_img=None,
+                 mc_energy_range=None,
+                 npe_range=None,
+                 min_signal_to_border_distance=None,
+                 tel_id_list=None,
+                 aggregation_method="mean",
+                 pixel_metrics=None,
+                 cache=None,
+                 output_file_path_format=None):
         self.call_number = 0
 
         # Init the wavelet class
         self.cleaning_algorithm = Tailcut()
 
-        # Make the image list
+        # Load the images once for all evaluations
+        if cam_id is None:
+            raise ValueError('cam_id is mandatory.')
+
         self.input_files = input_files
+        self.cam_id = cam_id
         self.max_num_img = max_num_img
 
+        # PRE PROCESSING FILTERING ############################################
+
+        # Excluded images are never cleaned (and, once the dataset is indexed,
+        # never loaded)
+        self.image_filter = ImageFilter(mc_energy_range=mc_energy_range,
+                                        npe_range=npe_range,
+                                        min_signal_to_border_distance=min_signal_to_border_distance,
+                                        tel_id_list=tel_id_list)
+
+        print("image filter:", self.image_filter)
+
+        self.dataset = PreloadedDataset(input_files, cam_id, max_num_img=max_num_img, image_filter=self.image_filter)
+
+        # If not None, the result of each evaluation is saved in
+        # `output_file_path_format.format(call_number)` (a JSON file)
+        self.output_file_path_format = output_file_path_format
+
+        if aggregation_method not in AGGREGATION_METHODS:
+            raise ValueError("Unknown value for aggregation_method: {}".format(aggregation_method))
+
         self.aggregation_method = aggregation_method  # "mean" or "median"
 
         print("aggregation method:", self.aggregation_method)
 
-        # PRE PROCESSING FILTERING ############################################
+        # Pixel metrics (e.g. "e_shape", "ssim" or "all", see
+        # datapipe.benchmark.assess.assess_image_cleaning_batch) recorded
+        # along with delta psi. They are not optimized.
+        self.pixel_metrics = pixel_metrics
+
+        # EVALUATION CACHE ####################################################
+
+        # A datapipe.optimization.evaluation_cache.EvaluationCache (or None)
+        self.cache = cache
 
-        # TODO...
+        if self.cache is not None:
+            self.fingerprint = dataset_fingerprint(input_files,
+                                                   objective_function=__name__,
+                                                   cam_id=self.cam_id,
+                                                   max_num_img=self.max_num_img,
+                                                   image_filter=self.image_filter.to_dict(),
+                                                   aggregation_method=self.aggregation_method)
 
 
     def __call__(self, threshold_list):
-        self.call_number += 1
+        """Return the aggregated score of `threshold_list` (from the cache if possible)."""
 
-        aggregated_score = float('inf')
+        if self.cache is not None:
+            cached_score = self.cache.get(self.fingerprint, threshold_list)
+            if cached_score is not None:
+                return cached_score
 
-        try:
-            high_threshold = float(threshold_list[0])
-            low_threshold = float(threshold_list[1])
+        score = self.evaluate(threshold_list)
 
-            if low_threshold > high_threshold:
-                # To avoid useless computation, reject solutions where low threshold is greater than high threshold
-                # (these solutions have the same result than the solution `low_threshold == high_threshold`)
-                return float('nan')
+        if self.cache is not None:
+            self.cache.put(self.fingerprint, threshold_list, score)
 
-            #low_threshold = min(low_threshold, high_threshold)  # low threshold should not be greater than high threshold
+        return score
 
-            algo_params_var = {
-                        "high_threshold": high_threshold,
-                        "low_threshold": low_threshold
-                    }
 
-            benchmark_method = "delta_psi"          # TODO
+    def cleaning_function_params(self, threshold_list):
+        """Return the Tailcut parameters of `threshold_list` (``None`` for rejected solutions)."""
 
-            label = "TC_{}".format(self.call_number)
-            self.cleaning_algorithm.label = label
+        high_threshold = float(threshold_list[0])
+        low_threshold = float(threshold_list[1])
+
+        if low_threshold > high_threshold:
+            # To avoid useless computation, reject solutions where low threshold is greater than high threshold
+            # (these solutions have the same result than the solution `low_threshold == high_threshold`)
+            return None
+
+        #low_threshold = min(low_threshold, high_threshold)  # low threshold should not be greater than high threshold
+
+        algo_params = {
+                    "kill_isolated_pixels": True,
+                    "verbose": False,
+                    "high_threshold": high_threshold,
+                    "low_threshold": low_threshold
+                }
+
+        return algo_params
 
-            output_file_path = "score_tailcut_optim_{}.json".format(self.call_number)
 
-            algo_params = {
-                        "kill_isolated_pixels": True,
-                        "verbose": False,
-                    }
+    def score_images(self, threshold_list, image_indices=None):
+        """Clean (a subset of) the dataset with `threshold_list` and return the
+        normalized delta psi and the cleaning time of each image.
 
-            algo_params.update(algo_params_var)
+        Parameters
+        ----------
+        threshold_list
+            The parameters to assess.
+        image_indices : sequence of int
+            The images to assess (all images if `None`).
 
-            # TODO: randomly make a subset fo self.input_files
-            input_files = self.input_files
+        Returns
+        -------
+        tuple
+            ``(delta_psi_deg, execution_time_sec)`` (Numpy arrays).
+        """
 
-            output_dict = self.cleaning_algorithm.run(algo_params,
-                                                      input_file_or_dir_path_list=input_files,
-                                                      benchmark_method=benchmark_method,
-                                                      output_file_path=output_file_path,
-                                                      max_num_img=self.max_num_img)
+        algo_params = self.cleaning_function_params(threshold_list)
 
-            score_list = []
+        if algo_params is None:
+            raise ValueError("Rejected solution: {}".format(list(threshold_list)))
 
-            # Read and compute results from output_dict
-            for image_dict in output_dict["io"]:
+        if image_indices is None:
+            dataset = self.dataset
+        else:
+            dataset = self.dataset.subset(image_indices)
 
-                # POST PROCESSING FILTERING #######################################
+        return dataset.delta_psi(self.cleaning_algorithm, algo_params)
 
-                # >>>TODO<<<: Filter images: decide wether the image should be used or not ? (contained vs not contained)
-                # TODO: filter these images *before* cleaning them to avoid waste of computation...
 
-                # >>>TODO<<<: Filter images by energy range: decide wether the image should be used or not ?
-                # TODO: filter these images *before* cleaning them to avoid waste of computation...
+    def evaluate(self, threshold_list):
+        """Clean and assess the dataset with `threshold_list` and return the aggregated score."""
 
-                ###################################################################
+        self.call_number += 1
 
-                # GET THE CLEANED IMAGE SCORE
+        aggregated_score = float('inf')
 
-                if ("img_ref_hillas_2_psi" in image_dict) and ("img_cleaned_hillas_2_psi" in image_dict):
-                    output_image_parameter_psi_rad = image_dict["img_ref_hillas_2_psi"]
-                    reference_image_parameter_psi_rad = image_dict["img_cleaned_hillas_2_psi"]
-                    delta_psi_rad = reference_image_parameter_psi_rad - output_image_parameter_psi_rad
-                    normalized_delta_psi_deg = norm_angle_diff(np.degrees(delta_psi_rad))
+        try:
+            algo_params = self.cleaning_function_params(threshold_list)
 
-                    #if image_dict["score_name"][0] != "delta_psi":
-                    #    raise Exception("Cannot get the score")
-                    #normalized_delta_psi_deg = image_dict["score"][0]
+            if algo_params is None:
+                return float('nan')
 
-                    score_list.append(normalized_delta_psi_deg)
-                else:
-                    # The cleaning algorithm failed to clean this image
-                    # TODO: add a penalty
-                    score_list.append(90.)  # the worst score
+            algo_params_var = {key: algo_params[key] for key in ("high_threshold", "low_threshold")}
+
+            label = "TC_{}".format(self.call_number)
+            self.cleaning_algorithm.label = label
 
-            # Compute the mean
-            if self.aggregation_method == "mean":
-                aggregated_score = np.array([score_list]).mean()
-            elif self.aggregation_method == "median":
-                aggregated_score = np.array([score_list]).median()
-            else:
-                raise ValueError("Unknown value for aggregation_method: {}".format(self.aggregation_method))
+            delta_psi_deg, execution_time_sec, pixel_scores = self.dataset.assess(self.cleaning_algorithm,
+                                                                                  algo_params,
+                                                                                  benchmark_method=self.pixel_metrics)
+
+            aggregator = ScoreAggregator()
+            aggregator.update_array("delta_psi", delta_psi_deg)
+            aggregator.update_array("full_clean_execution_time_sec", execution_time_sec)
+            for metric_name, scores in pixel_scores.items():
+                aggregator.update_array(metric_name, scores)
+
+            # Compute the mean (or the median, ...) on the whole array: the
+            # aggregator sketches are only used for the saved summary
+            aggregated_score = aggregate_array(delta_psi_deg, self.aggregation_method)
+
+            if self.output_file_path_format is not None:
+                save_results(self.output_file_path_format.format(self.call_number),
+                             self.dataset,
+                             delta_psi_deg,
+                             execution_time_sec,
+                             pixel_scores=pixel_scores,
+                             label=label,
+                             algo_params=algo_params_var,
+                             aggregation_method=self.aggregation_method,
+                             image_filter=self.image_filter.to_dict(),
+                             aggregated_score=float(aggregated_score),
+                             score_summary=aggregator.summary())
 
-            # TODO: save results in a JSON file (?)
             print(algo_params_var, aggregated_score, self.aggregation_method)
         except Exception as e:
             print(e)
@@ -156,7 +240,7 @@ if __name__ == "__main__":
     # Test...
 
     #func = ObjectiveFunction(input_files=["./MISC/testset/gamma/digicam/"])
-    func = ObjectiveFunction(input_files=["/dev/shm/.jd/digicam/gamma/"])
+    func = ObjectiveFunction(input_files=["/dev/shm/.jd/digicam/gamma/"], cam_id="DigiCam")
 
     threshold_list = [10, 5]
 
@@ -26,6 +26,13 @@ import numpy as np
 
 from datapipe.denoising.wavelets_mrfilter import WaveletTransform
 from datapipe.benchmark import assess
+from datapipe.benchmark.aggregation import AGGREGATION_METHODS
+from datapipe.benchmark.aggregation import ScoreAggregator
+from datapipe.benchmark.aggregation import aggregate_array
+from datapipe.optimization.evaluation_cache import dataset_fingerprint
+from datapipe.optimization.objectivefunc.image_filter import ImageFilter
+from datapipe.optimization.objectivefunc.preloaded_dataset import PreloadedDataset
+from datapipe.optimization.objectivefunc.preloaded_dataset import save_results
 
 
 def norm_angle_diff(angle_in_degrees):
@@ -40,128 +47,212 @@ def norm_angle_diff(angle_in_degrees):
 
 class ObjectiveFunction:
 
-    def __init__(self, input_files, noise_distribution=None, max_num_img=None, aggregation_method="mean"):
+    def __init__(self,
+                 input_files,
+                 cam_id=None,
+                 noise_distribution=None,
+                 max_num_img=None,
+                 mc_energy_range=None,
+                 npe_range=None,
+                 min_signal_to_border_distance=None,
+                 tel_id_list=None,
+                 aggregation_method="mean",
+                 pixel_metrics=None,
+                 cache=None,
+                 output_file_path_format=None):
         self.call_number = 0
 
         # Init the wavelet class
         self.cleaning_algorithm = WaveletTransform()
 
-        # Make the image list
+        # Load the images once for all evaluations
+        if cam_id is None:
+            raise ValueError('cam_id is mandatory.')
+
         self.input_files = input_files
+        self.cam_id = cam_id
         self.max_num_img = max_num_img
 
+        # PRE PROCESSING FILTERING ############################################
+
+        # Excluded images are never cleaned (and, once the dataset is indexed,
+        # never loaded)
+        self.image_filter = ImageFilter(mc_energy_range=mc_energy_range,
+                                        npe_range=npe_range,
+                                        min_signal_to_border_distance=min_signal_to_border_distance,
+                                        tel_id_list=tel_id_list)
+
+        print("image filter:", self.image_filter)
+
+        self.dataset = PreloadedDataset(input_files, cam_id, max_num_img=max_num_img, image_filter=self.image_filter)
+
+        # If not None, the result of each evaluation is saved in
+        # `output_file_path_format.format(call_number)` (a JSON file)
+        self.output_file_path_format = output_file_path_format
+
         self.noise_distribution = noise_distribution
 
+        if aggregation_method not in AGGREGATION_METHODS:
+            raise ValueError("Unknown value for aggregation_method: {}".format(aggregation_method))
+
         self.aggregation_method = aggregation_method  # "mean" or "median"
 
         print("aggregation method:", self.aggregation_method)
 
-        # PRE PROCESSING FILTERING ############################################
+        # Pixel metrics (e.g. "e_shape", "ssim" or "all", see
+        # datapipe.benchmark.assess.assess_image_cleaning_batch) recorded
+        # along with delta psi. They are not optimized.
+        self.pixel_metrics = pixel_metrics
+
+        # EVALUATION CACHE ####################################################
 
-        # TODO...
+        # A datapipe.optimization.evaluation_cache.EvaluationCache (or None)
+        self.cache = cache
+
+        if self.cache is not None:
+            if noise_distribution is None:
+                noise_cdf = None
+            else:
+                noise_cdf = [noise_distribution.cdf_x, noise_distribution.cdf_y]
+
+            self.fingerprint = dataset_fingerprint(input_files,
+                                                   objective_function=__name__,
+                                                   cam_id=self.cam_id,
+                                                   max_num_img=self.max_num_img,
+                                                   image_filter=self.image_filter.to_dict(),
+                                                   aggregation_method=self.aggregation_method,
+                                                   noise_distribution=noise_cdf)
 
 
     def __call__(self, sigma_list):
+        """Return the aggregated score of `sigma_list` (from the cache if possible)."""
+
+        if self.cache is not None:
+            cached_score = self.cache.get(self.fingerprint, sigma_list)
+            if cached_score is not None:
+                return cached_score
+
+        score = self.evaluate(sigma_list)
+
+        if self.cache is not None:
+            self.cache.put(self.fingerprint, sigma_list, score)
+
+        return score
+
+
+    def cleaning_function_params(self, sigma_list):
+        """Return the wavelet cleaning parameters of `sigma_list`."""
+
+        k_sigma_noise_threshold = ",".join([str(sigma) for sigma in sigma_list])
+
+        algo_params = {
+                    "coef_detection_method": 1,
+                    "correction_offset": False,
+                    "detect_only_positive_structure": False,
+                    "epsilon": None,
+                    "first_detection_scale": None,
+                    "input_image_scale": "linear",
+                    #"k_sigma_noise_threshold": "2,2,3,3",
+                    "kill_isolated_pixels": True,
+                    "mask_file_path": None,
+                    #"mrfilter_directory": "/dev/shm/.jd",
+                    "noise_distribution": self.noise_distribution,
+                    "noise_model": 3,
+                    "number_of_iterations": None,
+                    "number_of_scales": 4,
+                    "offset_after_calibration": None,
+                    "precision": None,
+                    "support_file_name": None,
+                    "suppress_isolated_pixels": True,
+                    "suppress_last_scale": True,
+                    "suppress_positivity_constraint": False,
+                    "tmp_files_directory": "/dev/shm/.jd",
+                    "type_of_filtering": None,
+                    "type_of_filters": None,
+                    "type_of_multiresolution_transform": None,
+                    "type_of_non_orthog_filters": None,
+                    "verbose": False,
+                    "k_sigma_noise_threshold": k_sigma_noise_threshold
+                }
+
+        return algo_params
+
+
+    def score_images(self, sigma_list, image_indices=None):
+        """Clean (a subset of) the dataset with `sigma_list` and return the
+        normalized delta psi and the cleaning time of each image.
+
+        Parameters
+        ----------
+        sigma_list
+            The parameters to assess.
+        image_indices : sequence of int
+            The images to assess (all images if `None`).
+
+        Returns
+        -------
+        tuple
+            ``(delta_psi_deg, execution_time_sec)`` (Numpy arrays).
+        """
+
+        algo_params = self.cleaning_function_params(sigma_list)
+
+        if algo_params is None:
+            raise ValueError("Rejected solution: {}".format(list(sigma_list)))
+
+        if image_indices is None:
+            dataset = self.dataset
+        else:
+            dataset = self.dataset.subset(image_indices)
+
+        return dataset.delta_psi(self.cleaning_algorithm, algo_params)
+
+
+    def evaluate(self, sigma_list):
+        """Clean and assess the dataset with `sigma_list` and return the aggregated score."""
+
         self.call_number += 1
 
         aggregated_score = np.inf
 
         try:
-            k_sigma_noise_threshold = ",".join([str(sigma) for sigma in sigma_list])
+            algo_params = self.cleaning_function_params(sigma_list)
 
-            algo_params_var = {
-                        "k_sigma_noise_threshold": k_sigma_noise_threshold
-                    }
+            if algo_params is None:
+                return float('nan')
 
-            benchmark_method = "delta_psi"          # TODO
+            algo_params_var = {key: algo_params[key] for key in ("k_sigma_noise_threshold",)}
 
             label = "WT_{}".format(self.call_number)
             self.cleaning_algorithm.label = label
 
-            output_file_path = "score_wavelets_optim_{}.json".format(self.call_number)
-
-            algo_params = {
-                        "coef_detection_method": 1,
-                        "correction_offset": False,
-                        "detect_only_positive_structure": False,
-                        "epsilon": None,
-                        "first_detection_scale": None,
-                        "input_image_scale": "linear",
-                        #"k_sigma_noise_threshold": "2,2,3,3",
-                        "kill_isolated_pixels": True,
-                        "mask_file_path": None,
-                        #"mrfilter_directory": "/dev/shm/.jd",
-                        "noise_distribution": self.noise_distribution,
-                        "noise_model": 3,
-                        "number_of_iterations": None,
-                        "number_of_scales": 4,
-                        "offset_after_calibration": None,
-                        "precision": None,
-                        "support_file_name": None,
-                        "suppress_isolated_pixels": True,
-                        "suppress_last_scale": True,
-                        "suppress_positivity_constraint": False,
-                        "tmp_files_directory": "/dev/shm/.jd",
-                        "type_of_filtering": None,
-                        "type_of_filters": None,
-                        "type_of_multiresolution_transform": None,
-                        "type_of_non_orthog_filters": None,
-                        "verbose": False
-                    }
-
-            algo_params.update(algo_params_var)
-
-            # TODO: randomly make a subset fo self.input_files
-            input_files = self.input_files
-
-            output_dict = self.cleaning_algorithm.run(algo_params,
-                                                      input_file_or_dir_path_list=input_files,
-                                                      benchmark_method=benchmark_method,
-                                                      output_file_path=output_file_path,
-                                                      max_num_img=self.max_num_img)
-
-            score_list = []
-
-            # Read and compute results from output_dict
-            for image_dict in output_dict["io"]:
-
-                # POST PROCESSING FILTERING #######################################
-
-                # >>>TODO<<<: Filter images: decide wether the image should be used or not ? (contained vs not contained)
-                # TODO: filter these images *before* cleaning them to avoid waste of computation...
-
-                # >>>TODO<<<: Filter images by energy range: decide wether the image should be used or not ?
-                # TODO: filter these images *before* cleaning them to avoid waste of computation...
-
-                ###################################################################
-
-                # GET THE CLEANED IMAGE SCORE
-
-                if ("img_ref_hillas_2_psi" in image_dict) and ("img_cleaned_hillas_2_psi" in image_dict):
-                    output_image_parameter_psi_rad = image_dict["img_ref_hillas_2_psi"]
-                    reference_image_parameter_psi_rad = image_dict["img_cleaned_hillas_2_psi"]
-                    delta_psi_rad = reference_image_parameter_psi_rad - output_image_parameter_psi_rad
-                    normalized_delta_psi_deg = norm_angle_diff(np.degrees(delta_psi_rad))
-
-                    #if image_dict["score_name"][0] != "delta_psi":
-                    #    raise Exception("Cannot get the score")
-                    #normalized_delta_psi_deg = image_dict["score"][0]
-
-                    score_list.append(normalized_delta_psi_deg)
-                else:
-                    # The cleaning algorithm failed to clean this image
-                    # TODO: add a penalty
-                    score_list.append(90.)  # the worst score
-
-            # Compute the mean
-            if self.aggregation_method == "mean":
-                aggregated_score = np.array([score_list]).mean()
-            elif self.aggregation_method == "median":
-                aggregated_score = np.array([score_list]).median()
-            else:
-                raise ValueError("Unknown value for aggregation_method: {}".format(self.aggregation_method))
+            delta_psi_deg, execution_time_sec, pixel_scores = self.dataset.assess(self.cleaning_algorithm,
+                                                                                  algo_params,
+                                                                                  benchmark_method=self.pixel_metrics)
+
+            aggregator = ScoreAggregator()
+            aggregator.update_array("delta_psi", delta_psi_deg)
+            aggregator.update_array("full_clean_execution_time_sec", execution_time_sec)
+            for metric_name, scores in pixel_scores.items():
+                aggregator.update_array(metric_name, scores)
+
+            # Compute the mean (or the median, ...) on the whole array: the
+            # aggregator sketches are only used for the saved summary
+            aggregated_score = aggregate_array(delta_psi_deg, self.aggregation_method)
+
+            if self.output_file_path_format is not None:
+                save_results(self.output_file_path_format.format(self.call_number),
+                             self.dataset,
+                             delta_psi_deg,
+                             execution_time_sec,
+                             pixel_scores=pixel_scores,
+                             label=label,
+                             algo_params=algo_params_var,
+                             aggregation_method=self.aggregation_method,
+                             image_filter=self.image_filter.to_dict(),
+                             aggregated_score=float(aggregated_score),
+                             score_summary=aggregator.summary())
 
-            # TODO: save results in a JSON file (?)
             print(algo_params_var, aggregated_score, self.aggregation_method)
         except Exception as e:
             print(e)
@@ -174,7 +265,7 @@ if __name__ == "__main__":
 
     #func = ObjectiveFunction(input_files=["/Users/jdecock/astri_data/fits/gamma/"])
     #func = ObjectiveFunction(input_files=["./testset/gamma/astri/tel1/"])
-    func = ObjectiveFunction(input_files=["/Volumes/ramdisk/flashcam/fits/gamma/"])
+    func = ObjectiveFunction(input_files=["/Volumes/ramdisk/flashcam/fits/gamma/"], cam_id="FlashCam")
 
     sigma_list = [2, 2, 3, 3]
 
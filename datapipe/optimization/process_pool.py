@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+Process pools holding an objective function.
+
+Objective functions of :mod:`datapipe.optimization.objectivefunc` hold their
+whole preloaded dataset (input and reference images). Submitting
+``objective_function`` to a plain ``concurrent.futures.ProcessPoolExecutor``
+pickles it (thus the dataset) again for every evaluated point.
+
+An `ObjectiveFunctionPool` gives the objective function to each worker once,
+when the worker starts (with the pool ``initializer``); only points are then
+sent to workers. Optimizers of this package (see `evaluate` and `submit`)
+recognize such a pool when it is given as their executor.
+
+Each worker keeps its own copy of the objective function thus the state of
+objective function wrappers (e.g. a
+:class:`datapipe.optimization.racing.RacingEvaluator`) is per worker.
+"""
+
+__all__ = ['ObjectiveFunctionPool',
+           'evaluate',
+           'submit']
+
+import concurrent.futures
+
+# The objective function of the current worker process (see `_init_worker`)
+_worker_objective_function = None
+
+
+def _init_worker(objective_function):
+    global _worker_objective_function
+    _worker_objective_function = objective_function
+
+
+def _call_worker_objective_function(x):
+    return _worker_objective_function(x)
+
+
+class ObjectiveFunctionPool(concurrent.futures.ProcessPoolExecutor):
+    """A process pool whose workers hold `objective_function`.
+
+    Parameters
+    ----------
+    objective_function : callable
+        The objective function to evaluate in workers (it must be
+        picklable; it is sent once to each worker).
+    max_workers : int
+        The number of worker processes (as in
+        ``concurrent.futures.ProcessPoolExecutor``).
+    """
+
+    def __init__(self, objective_function, max_workers=None):
+        super().__init__(max_workers=max_workers,
+                         initializer=_init_worker,
+                         initargs=(objective_function,))
+        self.objective_function = objective_function
+
+    def holds(self, objective_function):
+        """Return `True` if the workers of this pool hold `objective_function`."""
+        return objective_function is self.objective_function
+
+
+def submit(objective_function, x, executor=None):
+    """Submit the evaluation of `x` and return its future.
+
+    Without executor, `x` is evaluated immediately (the returned future is
+    already done). With an `ObjectiveFunctionPool` holding
+    `objective_function`, only `x` is sent to the worker.
+    """
+
+    if executor is None:
+        future = concurrent.futures.Future()
+        future.set_result(objective_function(x))
+        return future
+    elif isinstance(executor, ObjectiveFunctionPool) and executor.holds(objective_function):
+        return executor.submit(_call_worker_objective_function, x)
+    else:
+        return executor.submit(objective_function, x)
+
+
+def evaluate(objective_function, x_list, executor=None):
+    """Return the value of `objective_function` for each point of `x_list`.
+
+    Points are evaluated concurrently if an executor is given (with an
+    `ObjectiveFunctionPool` holding `objective_function`, only points are
+    sent to workers). Results are in the order of `x_list` whatever the order
+    evaluations complete.
+    """
+
+    if executor is None:
+        return [objective_function(x) for x in x_list]
+    elif isinstance(executor, ObjectiveFunctionPool) and executor.holds(objective_function):
+        return list(executor.map(_call_worker_objective_function, x_list))
+    else:
+        return list(executor.map(objective_function, x_list))
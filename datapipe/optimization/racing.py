@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+Racing (successive halving) evaluation of objective functions.
+
+Most candidates proposed by an optimizer are clearly worse than the best one
+found so far: a few images are enough to discard them. A `RacingEvaluator`
+wraps an objective function (see :mod:`datapipe.optimization.objectivefunc`)
+and assesses each candidate on growing *rungs* (nested subsets of images,
+stratified by reference npe):
+
+- a candidate starts on the first (small) rung;
+- it is promoted to the next rung (e.g. 3 times larger) only if its score is
+  among the best ``1 / eta`` scores obtained by candidates on this rung
+  (asynchronous successive halving [1]_) and if it is not significantly
+  worse than the best fully assessed candidate on the same images (the
+  confidence interval of the mean per image score difference is above 0);
+- only candidates reaching the last rung are assessed on the whole dataset.
+
+Images already assessed on a rung are not assessed again on the next one.
+
+A `RacingEvaluator` is a callable taking a point and returning a float, like
+the objective function it wraps, thus it can be given to ``bruteforce``,
+``saes`` or ``differential_evolution`` as is. Rejected candidates get their
+partial score, but never a better one than the best fully assessed
+candidate thus optimizers can't select them.
+
+References
+----------
+.. [1] Li, L., Jamieson, K., Rostamizadeh, A., et al. (2020). A system for
+   massively parallel hyperparameter tuning. MLSys 2020.
+   https://arxiv.org/abs/1810.05934
+"""
+
+__all__ = ['RacingEvaluator',
+           'stratified_order']
+
+import math
+
+import numpy as np
+from scipy import stats
+
+from datapipe.benchmark.aggregation import aggregate_array
+
+
+def stratified_order(strata_values, num_strata=5, seed=0):
+    """Return an image order such that every prefix is a stratified sample.
+
+    Images are split in `num_strata` strata of equal size (quantiles of
+    `strata_values`) and strata are interleaved: the first images of the
+    order come from all strata in turn (in a random order within each
+    stratum).
+
+    Parameters
+    ----------
+    strata_values : array_like
+        The value used to stratify images (e.g. their reference npe).
+    num_strata : int
+        The number of strata.
+    seed : int
+        The seed of the random number generator.
+
+    Returns
+    -------
+    Numpy array
+        The image indices.
+    """
+
+    strata_values = np.asarray(strata_values, dtype=np.float64)
+    rng = np.random.RandomState(seed)
+
+    if len(strata_values) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # Split images sorted by value (and shuffled within equal values)
+    shuffled_indices = rng.permutation(len(strata_values))
+    sorted_indices = shuffled_indices[np.argsort(strata_values[shuffled_indices], kind='stable')]
+    strata = [rng.permutation(stratum) for stratum in np.array_split(sorted_indices, min(num_strata, len(strata_values)))]
+
+    # Interleave strata: the k-th image of a stratum of size n is placed at
+    # (k + u) / n where u is a random offset of the stratum
+    order_keys = np.concatenate([(np.arange(len(stratum)) + rng.uniform()) / len(stratum) for stratum in strata])
+    indices = np.concatenate(strata)
+
+    return indices[np.argsort(order_keys, kind='stable')]
+
+
+class RacingEvaluator(object):
+    """Assess candidates of an objective function by racing (see the module
+    documentation).
+
+    The racing state (scores of each rung and best full score) is kept by
+    the instance: with a process pool executor (see
+    :func:`datapipe.optimization.saes.minimize`) each worker has its own
+    copy, which makes promotions less selective.
+
+    Parameters
+    ----------
+    objective_function : ObjectiveFunction
+        An objective function of :mod:`datapipe.optimization.objectivefunc`
+        (it must have `dataset`, `aggregation_method`,
+        `cleaning_function_params` and `score_images` attributes).
+    min_num_images : int
+        The minimum number of images of the first rung. The default is the
+        number of images divided by ``eta ** 3`` (i.e. 4 rungs), but at least
+        10.
+    eta : float
+        The ratio between the size of consecutive rungs; only the best
+        ``1 / eta`` candidates of a rung are promoted.
+    confidence : float
+        The confidence level of the interval used for early rejection.
+    num_strata : int
+        The number of reference npe strata (see `stratified_order`).
+    seed : int
+        The seed used to draw the image order.
+    verbose : bool
+        Print each decision if `True`.
+
+    Attributes
+    ----------
+    rung_sizes : list of int
+        The number of images of each rung (the last rung is the full dataset).
+    best_score : float
+        The best score of fully assessed candidates.
+    best_image_scores : Numpy array
+        The score of each image (in `image_order`) of the best fully assessed
+        candidate.
+    num_calls : int
+        The number of assessed candidates.
+    num_image_evaluations : int
+        The number of cleaned images (to compare with ``num_calls *
+        rung_sizes[-1]``, the cost without racing).
+    """
+
+    def __init__(self,
+                 objective_function,
+                 min_num_images=None,
+                 eta=3,
+                 confidence=0.95,
+                 num_strata=5,
+                 seed=0,
+                 verbose=True):
+
+        self.objective_function = objective_function
+        self.eta = eta
+        self.verbose = verbose
+
+        dataset = objective_function.dataset
+        num_images = len(dataset)
+
+        if min_num_images is None:
+            min_num_images = max(10, int(num_images / eta ** 3))
+
+        # Rungs are num_images / eta^k images (k = num_rungs - 1, ..., 1, 0)
+        if 0 < min_num_images < num_images:
+            num_rungs = 1 + int(math.floor(math.log(num_images / min_num_images) / math.log(eta) + 1e-9))
+        else:
+            num_rungs = 1
+
+        self.rung_sizes = [int(math.ceil(num_images / eta ** k)) for k in range(num_rungs - 1, -1, -1)]
+
+        self.image_order = stratified_order(dataset.reference_sum_pe, num_strata=num_strata, seed=seed)
+        self.z_score = stats.norm.ppf(0.5 + confidence / 2.)
+
+        self.rung_scores = [[] for rung_size in self.rung_sizes]
+        self.best_score = float('inf')
+        self.best_image_scores = None     # The image scores of the best candidate (in `image_order`)
+
+        self.num_calls = 0
+        self.num_image_evaluations = 0
+
+    @property
+    def cost_ratio(self):
+        """The number of cleaned images relative to the cost without racing."""
+
+        if self.num_calls == 0:
+            return float('nan')
+
+        return self.num_image_evaluations / float(self.num_calls * self.rung_sizes[-1])
+
+    def get_state(self):
+        """Return the racing state (a JSON serializable dictionary; see
+        :mod:`datapipe.optimization.checkpoint`)."""
+
+        return {"rung_scores": [[float(score) for score in rung_scores] for rung_scores in self.rung_scores],
+                "best_score": float(self.best_score),
+                "best_image_scores": None if self.best_image_scores is None else self.best_image_scores.tolist(),
+                "num_calls": self.num_calls,
+                "num_image_evaluations": self.num_image_evaluations}
+
+    def set_state(self, state):
+        """Restore a racing state returned by `get_state`."""
+
+        if len(state["rung_scores"]) != len(self.rung_sizes):
+            raise ValueError("The racing state doesn't match the rungs of this dataset")
+
+        self.rung_scores = [list(rung_scores) for rung_scores in state["rung_scores"]]
+        self.best_score = float(state["best_score"])
+        self.best_image_scores = None if state["best_image_scores"] is None else np.array(state["best_image_scores"], dtype=np.float64)
+        self.num_calls = state["num_calls"]
+        self.num_image_evaluations = state["num_image_evaluations"]
+
+    def _aggregate(self, delta_psi_deg):
+        return aggregate_array(delta_psi_deg, self.objective_function.aggregation_method)
+
+    def _is_promoted(self, rung_index, score, delta_psi_deg):
+        """Decide whether a candidate having `score` (and the `delta_psi_deg`
+        image scores) on `rung_index` is promoted."""
+
+        rung_scores = self.rung_scores[rung_index]
+        num_images = len(delta_psi_deg)
+
+        # Confidence interval based rejection: paired comparison with the
+        # best fully assessed candidate on the same images
+        if (num_images > 1) and (self.best_image_scores is not None):
+            score_diff = delta_psi_deg - self.best_image_scores[:num_images]
+            lower_bound = score_diff.mean() - self.z_score * score_diff.std(ddof=1) / math.sqrt(num_images)
+            if lower_bound > 0:
+                return False
+
+        # Successive halving: keep the best 1/eta of the rung (the first
+        # candidates are always promoted)
+        if len(rung_scores) >= self.eta:
+            if score > np.quantile(rung_scores, 1. / self.eta):
+                return False
+
+        return True
+
+    def __call__(self, x):
+        """Return the (possibly partial) score of `x`."""
+
+        objective_function = self.objective_function
+
+        cache = getattr(objective_function, "cache", None)
+        if cache is not None:
+            cached_score = cache.get(objective_function.fingerprint, x)
+            if cached_score is not None:
+                return cached_score
+
+        if objective_function.cleaning_function_params(x) is None:
+            return float('nan')           # Rejected solution (see the objective function)
+
+        self.num_calls += 1
+
+        delta_psi_deg = np.empty(0)
+
+        try:
+            for rung_index, rung_size in enumerate(self.rung_sizes):
+
+                # Only assess images that have not been assessed on previous rungs
+                new_image_indices = self.image_order[len(delta_psi_deg):rung_size]
+                new_delta_psi_deg, execution_time_sec = objective_function.score_images(x, new_image_indices)
+                delta_psi_deg = np.concatenate((delta_psi_deg, new_delta_psi_deg))
+                self.num_image_evaluations += len(new_image_indices)
+
+                score = self._aggregate(delta_psi_deg)
+
+                if rung_index == len(self.rung_sizes) - 1:
+                    # Full evaluation
+                    if score < self.best_score:
+                        self.best_score = score
+                        self.best_image_scores = delta_psi_deg
+
+                    if cache is not None:
+                        cache.put(objective_function.fingerprint, x, score)
+
+                    if self.verbose:
+                        print("Racing: f({}) = {} (full evaluation, cost ratio {:.3f})".format(list(x), score, self.cost_ratio))
+
+                    return float(score)
+
+                is_promoted = self._is_promoted(rung_index, score, delta_psi_deg)
+                self.rung_scores[rung_index].append(score)
+
+                if not is_promoted:
+                    if self.verbose:
+                        print("Racing: f({}) ~ {} (rejected on {} images, cost ratio {:.3f})".format(list(x), score, rung_size, self.cost_ratio))
+
+                    # Never better than a fully assessed candidate
+                    if math.isfinite(self.best_score):
+                        score = max(score, np.nextafter(self.best_score, np.inf))
+
+                    return float(score)
+
+        except Exception as e:
+            print(e)
+
+        return float('inf')
@@ -20,12 +20,28 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-__all__ = []
+__all__ = ['minimize',
+           'minimize_steady_state']
 
+import argparse
+import concurrent.futures
 import math
 import numpy as np
+import time
 
 import json
+from datapipe.optimization.checkpoint import Checkpoint
+from datapipe.optimization.checkpoint import append_json_line
+from datapipe.optimization.checkpoint import get_function_state
+from datapipe.optimization.checkpoint import get_rng_state
+from datapipe.optimization.checkpoint import read_json_lines
+from datapipe.optimization.checkpoint import set_function_state
+from datapipe.optimization.checkpoint import set_rng_state
+from datapipe.optimization.evaluation_cache import EvaluationCache
+from datapipe.optimization.multi_objective import MultiObjectiveEvaluator
+from datapipe.optimization import process_pool
+from datapipe.optimization.process_pool import ObjectiveFunctionPool
+from datapipe.optimization.racing import RacingEvaluator
 from datapipe.optimization.objectivefunc.wavelets_mrfilter_delta_psi import ObjectiveFunction as WaveletObjectiveFunction
 from datapipe.optimization.objectivefunc.tailcut_delta_psi import ObjectiveFunction as TailcutObjectiveFunction
 
@@ -35,6 +51,18 @@ from datapipe.denoising.inverse_transform_sampling import EmpiricalDistribution
 
 def main():
 
+    # PARSE OPTIONS ###########################################################
+
+    parser = argparse.ArgumentParser(description="Optimize cleaning parameters with a self-adaptive evolution strategy.")
+
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the run saved in the checkpoint file")
+
+    parser.add_argument("--checkpoint", default="optimize_sigma_saes_checkpoint.json", metavar="FILE",
+                        help="The checkpoint file path (default: %(default)s)")
+
+    args = parser.parse_args()
+
     algo = "wavelet_mrfilter"
     #algo = "tailcut"
 
@@ -50,6 +78,7 @@ def main():
 
     if instrument == "astri":
 
+        cam_id = "ASTRICam"
         input_files = ["/dev/shm/.jd/astri/gamma/"]
         noise_distribution = EmpiricalDistribution(datapipe.denoising.cdf.ASTRI_CDF_FILE)
 
@@ -62,6 +91,7 @@ def main():
 
     elif instrument == "astri_konrad":
 
+        cam_id = "ASTRICam"
         input_files = ["/dev/shm/.jd/astri_konrad/gamma/"]
         noise_distribution = EmpiricalDistribution(datapipe.denoising.cdf.ASTRI_CDF_FILE)
 
@@ -74,6 +104,7 @@ def main():
 
     elif instrument == "digicam":
 
+        cam_id = "DigiCam"
         input_files = ["/dev/shm/.jd/digicam/gamma/"]
         noise_distribution = EmpiricalDistribution(datapipe.denoising.cdf.DIGICAM_CDF_FILE)
 
@@ -86,6 +117,7 @@ def main():
 
     elif instrument == "flashcam":
 
+        cam_id = "FlashCam"
         input_files = ["/dev/shm/.jd/flashcam/gamma/"]
         noise_distribution = EmpiricalDistribution(datapipe.denoising.cdf.FLASHCAM_CDF_FILE)
 
@@ -98,6 +130,7 @@ def main():
 
     elif instrument == "nectarcam":
 
+        cam_id = "NectarCam"
         input_files = ["/dev/shm/.jd/nectarcam/gamma/"]
         noise_distribution = EmpiricalDistribution(datapipe.denoising.cdf.NECTARCAM_CDF_FILE)
 
@@ -110,6 +143,7 @@ def main():
 
     elif instrument == "lstcam":
 
+        cam_id = "LSTCam"
         input_files = ["/dev/shm/.jd/lstcam/gamma/"]
         noise_distribution = EmpiricalDistribution(datapipe.denoising.cdf.LSTCAM_CDF_FILE)
 
@@ -124,39 +158,107 @@ def main():
 
         raise Exception("Unknown instrument", instrument)
 
+    # Evaluations are cached (on disk) and shared between runs
+    cache = EvaluationCache()
+
     if algo == "wavelet_mrfilter":
 
         func = WaveletObjectiveFunction(input_files=input_files,
+                                        cam_id=cam_id,
                                         noise_distribution=noise_distribution,
                                         max_num_img=None,
-                                        aggregation_method="mean")  # "mean" or "median"
+                                        aggregation_method="mean",  # "mean" or "median"
+                                        cache=cache)
 
     elif algo == "tailcut":
 
         func = TailcutObjectiveFunction(input_files=input_files,
+                                        cam_id=cam_id,
                                         max_num_img=None,
-                                        aggregation_method="mean")  # "mean" or "median"
+                                        aggregation_method="mean",  # "mean" or "median"
+                                        cache=cache)
 
     else:
 
         raise ValueError("Unknown algorithm", algo)
 
+    # Assess candidates on growing (stratified) subsets of images and only
+    # assess the most promising ones on the whole dataset
+    use_racing = True
+
+    # Record the cleaning time of each candidate along with its quality score
+    # and keep the Pareto front (candidates are then fully assessed: racing
+    # is not used)
+    multi_objective = False
+    quality_tolerance = 0.1     # The delta psi tolerance (in degrees) used to pick the fastest candidate
+
+    if multi_objective:
+        func = MultiObjectiveEvaluator(func)
+    elif use_racing:
+        func = RacingEvaluator(func)
+
+    num_workers = 1     # The number of objective function evaluations made in parallel
+
+    # Submit a new candidate as soon as a worker is free instead of waiting
+    # for the slowest candidate of each generation
+    steady_state = False
+
+    checkpoint = Checkpoint(args.checkpoint, interval=1, cache=cache)
+
+    # Each generation is appended to the iterations file (JSON Lines)
+    iterations_file_path = "optimize_sigma_saes_iterations.jsonl"
+
+    if args.resume:
+        # Drop the generations made after the checkpoint (they are made again)
+        state = checkpoint.load("saes_steady_state" if steady_state else "saes")
+        last_gen = -2 if state is None else state["gen"]
+        gen_list = [gen_dict for gen_dict in read_json_lines(iterations_file_path) if gen_dict["gen"] <= last_gen]
+    else:
+        gen_list = []
 
-    pop_list = []
+    with open(iterations_file_path, "w") as fd:
+        for gen_dict in gen_list:
+            fd.write(json.dumps(gen_dict, sort_keys=True) + "\n")
 
-    def callback(pop):
+    def callback(pop, gen_info):
         print(pop)
-        pop_list.append(pop)
-        with open("optimize_sigma_saes_iterations.json", "w") as fd:
-            json.dump(pop_list, fd, sort_keys=True, indent=4)  # pretty print format
-
-    res = minimize(func,
-                   init_min_val=init_min_val,
-                   init_max_val=init_max_val,
-                   num_gen=100,
-                   mu=3,
-                   lmb=6,
-                   callback=callback)
+        print("Generation {gen}: {num_evals} evaluations in {wall_time_sec:.1f}s ({evals_per_sec:.2f} evaluations/s)".format(**gen_info))
+        append_json_line(iterations_file_path, dict(gen_info, pop=pop))
+
+    if steady_state:
+
+        res = minimize_steady_state(func,
+                                    init_min_val=init_min_val,
+                                    init_max_val=init_max_val,
+                                    num_gen=100,
+                                    mu=3,
+                                    lmb=6,
+                                    callback=callback,
+                                    num_workers=num_workers,
+                                    checkpoint=checkpoint,
+                                    resume=args.resume)
+
+    else:
+
+        if num_workers > 1:
+            executor = ObjectiveFunctionPool(func, max_workers=num_workers)
+        else:
+            executor = None
+
+        try:
+            res = minimize(func,
+                           init_min_val=init_min_val,
+                           init_max_val=init_max_val,
+                           num_gen=100,
+                           mu=3,
+                           lmb=6,
+                           callback=callback,
+                           executor=executor,
+                           checkpoint=checkpoint,
+                           resume=args.resume)
+        finally:
+            if executor is not None:
+                executor.shutdown()
 
     print("x* =", res['x'])
     print("f(x*) =", res['fun'])
@@ -168,6 +270,12 @@ def main():
     with open("optimize_sigma_saes.json", "w") as fd:
         json.dump(res, fd, sort_keys=True, indent=4)  # pretty print format
 
+    if multi_objective:
+        func.save("optimize_sigma_saes_pareto_front.json")
+        print("Pareto front (quality vs cleaning time):", func.pareto_front())
+        print("Fastest candidate within {} degree(s) of the best one:".format(quality_tolerance),
+              func.fastest_within(quality_tolerance))
+
 
 def minimize(objective_function,
              init_min_val,
@@ -175,7 +283,84 @@ def minimize(objective_function,
              num_gen=50,
              mu=3,
              lmb=6,
-             callback=None):
+             callback=None,
+             executor=None,
+             seed=None,
+             checkpoint=None,
+             resume=False):
+    """Minimize `objective_function` with a (mu+lambda) self-adaptive
+    evolution strategy.
+
+    Each child is a copy of a random parent whose strategy is mutated
+    (``sigma * exp(tau * N(0, 1))``) and then its value
+    (``x + sigma * N(0, d)``).
+
+    Parameters
+    ----------
+    objective_function : callable
+        The function to minimize. It takes a list of floats (a point) and
+        returns a float.
+    init_min_val, init_max_val : ndarray
+        The bounds of the uniform distribution used to draw the initial
+        parents.
+    num_gen : int
+        The number of generations.
+    mu : int
+        The number of parents.
+    lmb : int
+        The number of children made at each generation.
+    callback : callable
+        A function called after the evaluation of the initial parents and
+        after each generation with two arguments: the population (a list of
+        ``[sigma, x_1, ..., x_d, f(x)]`` lists, parents first) and a
+        dictionary containing the generation number ("gen", -1 for initial
+        parents), the number of evaluations of this generation
+        ("num_evals"), its wall time ("wall_time_sec") and its throughput
+        ("evals_per_sec").
+    executor : concurrent.futures.Executor
+        If given, the individuals of a generation are evaluated concurrently
+        with ``executor.map``. With a
+        :class:`datapipe.optimization.process_pool.ObjectiveFunctionPool`
+        holding `objective_function`, only points are sent to workers; with
+        another process pool, `objective_function` is pickled for every
+        evaluation. Otherwise individuals are evaluated one after another.
+    seed : int
+        The seed of the random number generator. If `None`, the global Numpy
+        random number generator is used. Random numbers are only drawn by
+        the calling process thus the result doesn't depend on `executor`.
+    checkpoint : Checkpoint
+        If given, the parents, the random number generator state and the
+        objective function state (see
+        :mod:`datapipe.optimization.checkpoint`) are saved after the initial
+        parents and every ``checkpoint.interval`` generations.
+    resume : bool
+        If `True`, the run saved in `checkpoint` (if any) is continued: the
+        following generations are the ones of the interrupted run.
+
+    Returns
+    -------
+    dict
+        The best individuals (parents) and some metadata.
+    """
+
+    if seed is None:
+        rng = np.random
+    else:
+        rng = np.random.RandomState(seed)
+
+    def evaluate(x_array, gen):
+        start_time = time.perf_counter()
+        fx_list = process_pool.evaluate(objective_function, x_array.tolist(), executor)
+        wall_time_sec = time.perf_counter() - start_time
+
+        gen_info = {"gen": gen,
+                    "num_evals": len(fx_list),
+                    "wall_time_sec": wall_time_sec,
+                    "evals_per_sec": len(fx_list) / wall_time_sec if wall_time_sec > 0 else float('inf')}
+
+        return fx_list, gen_info
+
+    launch_time = time.perf_counter()
 
     d = len(init_min_val)
     tau = 1./math.sqrt(2.*d)         # self-adaptation learning rate
@@ -190,47 +375,74 @@ def minimize(objective_function,
     # - the other columns contain the individual value (x)
 
     pop = np.full([mu+lmb, d+2], np.nan)
-    pop[:mu, 0] = 1.                                       # init the parents strategy to 1.0
-    #pop[:mu, 1:-1] = np.random.multivariate_normal(mean=init_pop_mu,
-    #                                               cov=np.diag(init_pop_sigma**2),
-    #                                               size=[mu,d])         # init the parents value
-    pop[:mu, 1:-1] = np.array([np.random.uniform(min_, max_, size=mu)
-                               for min_, max_
-                               in zip(init_min_val, init_max_val)]).T    # init the parents value
-    for parent_index in range(mu):
-        pop[parent_index, -1] = objective_function(pop[parent_index, 1:-1].tolist())    # evaluate parents
-
-    if callback is not None:
-        callback(pop.tolist())
-
-    for gen in range(num_gen):
+
+    def save_checkpoint(gen):
+        checkpoint.save("saes", {"gen": gen,
+                                 "mu": mu,
+                                 "lambda": lmb,
+                                 "parents": pop[:mu, :].tolist(),
+                                 "rng_state": get_rng_state(rng),
+                                 "function_state": get_function_state(objective_function)})
+
+    state = checkpoint.load("saes") if (resume and checkpoint is not None) else None
+
+    if state is None:
+        pop[:mu, 0] = 1.                                       # init the parents strategy to 1.0
+        #pop[:mu, 1:-1] = np.random.multivariate_normal(mean=init_pop_mu,
+        #                                               cov=np.diag(init_pop_sigma**2),
+        #                                               size=[mu,d])         # init the parents value
+        pop[:mu, 1:-1] = np.array([rng.uniform(min_, max_, size=mu)
+                                   for min_, max_
+                                   in zip(init_min_val, init_max_val)]).T    # init the parents value
+        pop[:mu, -1], gen_info = evaluate(pop[:mu, 1:-1], -1)                # evaluate parents
+
+        if callback is not None:
+            callback(pop.tolist(), gen_info)
+
+        if checkpoint is not None:
+            save_checkpoint(-1)
+
+        first_gen = 0
+    else:
+        if (state["mu"], state["lambda"], len(state["parents"][0])) != (mu, lmb, d+2):
+            raise ValueError("The checkpoint doesn't match the optimizer options (mu, lambda or dimension)")
+
+        pop[:mu, :] = state["parents"]
+        set_rng_state(rng, state["rng_state"])
+        set_function_state(objective_function, state["function_state"])
+
+        first_gen = state["gen"] + 1
+
+    for gen in range(first_gen, num_gen):
         # Make children ################################
-        pop[mu:,:] = pop[np.random.randint(mu, size=lmb)]
+        pop[mu:,:] = pop[rng.randint(mu, size=lmb)]
         pop[mu:,-1] = np.nan
 
         # Mutate children's sigma ######################
-        pop[mu:,0] = pop[mu:,0] * np.exp(tau * np.random.normal(size=lmb))
+        pop[mu:,0] = pop[mu:,0] * np.exp(tau * rng.normal(size=lmb))
 
         # Mutate children's value ######################
-        pop[mu:,1:-1] = pop[mu:,1:-1] + pop[mu:,1:-1] * np.random.normal(size=[lmb,d])
+        pop[mu:,1:-1] = pop[mu:,1:-1] + pop[mu:,0:1] * rng.normal(size=[lmb,d])
 
         # Evaluate children ############################
-        for child_index in range(lmb):
-            pop[mu+child_index, -1] = objective_function(pop[mu+child_index, 1:-1].tolist())
+        pop[mu:, -1], gen_info = evaluate(pop[mu:, 1:-1], gen)
 
         # Select the best individuals ##################
         pop = pop[pop[:,-1].argsort()]
 
         if callback is not None:
-            callback(pop.tolist())
+            callback(pop.tolist(), gen_info)
 
         pop[mu:, :] = np.nan
 
+        if (checkpoint is not None) and (checkpoint.due(gen) or gen == num_gen - 1):
+            save_checkpoint(gen)
+
     res = {}
     res['sigma'] = pop[:mu,0].tolist()
     res['x'] =     pop[:mu,1:-1].tolist()
     res['fun'] =   pop[:mu,-1].tolist()
-    res['nit'] = gen + 1
+    res['nit'] = num_gen
     res['nfev'] = res['nit'] * lmb + mu
     res['parent_pop'] = pop[:mu,:].tolist()
     res['init_min_val'] = init_min_val.tolist()
@@ -238,6 +450,221 @@ def minimize(objective_function,
     res['num_gen'] = num_gen
     res['mu'] = mu
     res['lambda'] = lmb
+    res['seed'] = seed
+    res['wall_time_sec'] = time.perf_counter() - launch_time
+    res['evals_per_sec'] = res['nfev'] / res['wall_time_sec'] if res['wall_time_sec'] > 0 else float('inf')
+
+    return res
+
+
+def minimize_steady_state(objective_function,
+                          init_min_val,
+                          init_max_val,
+                          num_gen=50,
+                          mu=3,
+                          lmb=6,
+                          callback=None,
+                          num_workers=1,
+                          executor=None,
+                          seed=None,
+                          checkpoint=None,
+                          resume=False):
+    """Minimize `objective_function` with an asynchronous steady-state
+    self-adaptive evolution strategy.
+
+    Contrary to `minimize`, there is no generation barrier: `num_workers`
+    children are evaluated concurrently and, as soon as one of them is
+    assessed, it replaces the worst parent if it is better ((mu+1)
+    selection) and a new child is submitted. Thus workers are never idle
+    waiting for the slowest evaluation of a generation.
+
+    Children are made like in `minimize` (same self-adaptive mutation of
+    sigma, then of x with the mutated sigma).
+
+    Parameters
+    ----------
+    objective_function : callable
+        The function to minimize. It takes a list of floats (a point) and
+        returns a float.
+    init_min_val, init_max_val : ndarray
+        The bounds of the uniform distribution used to draw the initial
+        parents.
+    num_gen : int
+        The number of (virtual) generations: ``num_gen * lmb`` children are
+        evaluated, thus the budget is the one of `minimize`.
+    mu : int
+        The number of parents.
+    lmb : int
+        The number of children of a (virtual) generation, i.e. the number of
+        evaluations between two calls of `callback`.
+    callback : callable
+        A function called after the evaluation of the initial parents and
+        after every `lmb` evaluated children with the same arguments as in
+        `minimize`: the population (parents first, then the `lmb` last
+        children in their completion order) and a dictionary ("gen",
+        "num_evals", "wall_time_sec" and "evals_per_sec").
+    num_workers : int
+        The number of local worker processes (an
+        :class:`datapipe.optimization.process_pool.ObjectiveFunctionPool` is
+        made if it is greater than 1 and no executor is given;
+        `objective_function` must then be picklable).
+    executor : concurrent.futures.Executor
+        If given, candidates are submitted to this executor (`num_workers`
+        is the number of candidates evaluated concurrently). It is not shut
+        down.
+    seed : int
+        The seed of the random number generator. If `None`, the global Numpy
+        random number generator is used. With concurrent evaluations, the
+        result also depends on the completion order of evaluations.
+    checkpoint : Checkpoint
+        If given, the parents, the random number generator state and the
+        objective function state are saved after the initial parents and
+        every ``checkpoint.interval`` (virtual) generations.
+    resume : bool
+        If `True`, the run saved in `checkpoint` (if any) is continued. The
+        children that were being evaluated when the checkpoint was written
+        are drawn again thus, with concurrent evaluations, the resumed run
+        differs from an uninterrupted one (it is the same with a single
+        worker).
+
+    Returns
+    -------
+    dict
+        The best individuals (parents) and some metadata (same format as
+        `minimize`).
+    """
+
+    if seed is None:
+        rng = np.random
+    else:
+        rng = np.random.RandomState(seed)
+
+    if num_workers < 1:
+        raise ValueError("num_workers should be greater than 0")
+
+    launch_time = time.perf_counter()
+
+    d = len(init_min_val)
+    tau = 1./math.sqrt(2.*d)         # self-adaptation learning rate
+
+    num_children = num_gen * lmb
+
+    owns_executor = (executor is None) and (num_workers > 1)
+    if owns_executor:
+        executor = ObjectiveFunctionPool(objective_function, max_workers=num_workers)
+
+    def make_child(parents):
+        child = parents[rng.randint(mu)].copy()
+        child[-1] = np.nan
+        child[0] = child[0] * math.exp(tau * rng.normal())      # mutate sigma
+        child[1:-1] = child[1:-1] + child[0] * rng.normal(size=d)   # mutate x
+        return child
+
+    def gen_info(gen, num_evals, start_time):
+        wall_time_sec = time.perf_counter() - start_time
+        return {"gen": gen,
+                "num_evals": num_evals,
+                "wall_time_sec": wall_time_sec,
+                "evals_per_sec": num_evals / wall_time_sec if wall_time_sec > 0 else float('inf')}
+
+    def save_checkpoint(gen, parents):
+        checkpoint.save("saes_steady_state", {"gen": gen,
+                                              "mu": mu,
+                                              "lambda": lmb,
+                                              "parents": parents.tolist(),
+                                              "rng_state": get_rng_state(rng),
+                                              "function_state": get_function_state(objective_function)})
+
+    state = checkpoint.load("saes_steady_state") if (resume and checkpoint is not None) else None
+
+    try:
+        if state is None:
+            # Init the parents #############################
+
+            # Same layout as in `minimize`: [sigma, x_1, ..., x_d, f(x)]
+            parents = np.full([mu, d+2], np.nan)
+            parents[:, 0] = 1.
+            parents[:, 1:-1] = np.array([rng.uniform(min_, max_, size=mu)
+                                         for min_, max_
+                                         in zip(init_min_val, init_max_val)]).T
+
+            start_time = time.perf_counter()
+            futures = [process_pool.submit(objective_function, x, executor) for x in parents[:, 1:-1].tolist()]
+            parents[:, -1] = [future.result() for future in futures]
+            parents = parents[parents[:, -1].argsort()]
+
+            if callback is not None:
+                callback(parents.tolist(), gen_info(-1, mu, start_time))
+
+            if checkpoint is not None:
+                save_checkpoint(-1, parents)
+
+            gen = 0
+        else:
+            if (state["mu"], state["lambda"], len(state["parents"][0])) != (mu, lmb, d+2):
+                raise ValueError("The checkpoint doesn't match the optimizer options (mu, lambda or dimension)")
+
+            parents = np.array(state["parents"], dtype=np.float64)
+            set_rng_state(rng, state["rng_state"])
+            set_function_state(objective_function, state["function_state"])
+
+            gen = state["gen"] + 1
+
+        # Steady-state loop ############################
+
+        pending = {}                # future -> child
+        completed_children = []     # children of the current (virtual) generation
+        num_submitted = gen * lmb
+        start_time = time.perf_counter()
+
+        while (num_submitted < num_children) or (len(pending) > 0):
+
+            # Keep all workers busy
+            while (num_submitted < num_children) and (len(pending) < num_workers):
+                child = make_child(parents)
+                pending[process_pool.submit(objective_function, child[1:-1].tolist(), executor)] = child
+                num_submitted += 1
+
+            done_futures, _ = concurrent.futures.wait(list(pending), return_when=concurrent.futures.FIRST_COMPLETED)
+
+            for future in done_futures:
+                child = pending.pop(future)
+                child[-1] = future.result()
+                completed_children.append(child)
+
+                # Replace the worst parent (parents are sorted, NaN last)
+                if child[-1] < parents[-1, -1] or (np.isnan(parents[-1, -1]) and not np.isnan(child[-1])):
+                    parents[-1] = child
+                    parents = parents[parents[:, -1].argsort()]
+
+                if len(completed_children) == lmb:
+                    if callback is not None:
+                        callback(parents.tolist() + np.array(completed_children).tolist(),
+                                 gen_info(gen, lmb, start_time))
+                    if (checkpoint is not None) and (checkpoint.due(gen) or gen == num_gen - 1):
+                        save_checkpoint(gen, parents)
+                    completed_children = []
+                    gen += 1
+                    start_time = time.perf_counter()
+    finally:
+        if owns_executor:
+            executor.shutdown()
+
+    res = {}
+    res['sigma'] = parents[:,0].tolist()
+    res['x'] =     parents[:,1:-1].tolist()
+    res['fun'] =   parents[:,-1].tolist()
+    res['nit'] = gen
+    res['nfev'] = num_children + mu
+    res['parent_pop'] = parents.tolist()
+    res['init_min_val'] = init_min_val.tolist()
+    res['init_max_val'] = init_max_val.tolist()
+    res['num_gen'] = num_gen
+    res['mu'] = mu
+    res['lambda'] = lmb
+    res['seed'] = seed
+    res['wall_time_sec'] = time.perf_counter() - launch_time
+    res['evals_per_sec'] = res['nfev'] / res['wall_time_sec'] if res['wall_time_sec'] > 0 else float('inf')
 
     return res
 
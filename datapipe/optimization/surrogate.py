@@ -0,0 +1,585 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+Surrogate-model (Bayesian) optimization of expensive objective functions.
+
+Each evaluation of the wavelet objective function is a full ``mr_filter``
+pass over thousands of images, thus population based optimizers (which
+need thousands of evaluations) are very expensive. `minimize` fits a
+Gaussian process regression model (a `GaussianProcess`, implemented with
+Numpy and Scipy only) to all past evaluations and chooses the next points
+to evaluate by maximizing the expected improvement [1]_ over the best
+evaluation. Points are proposed by batches (of ``batch_size`` points) to be
+evaluated concurrently: after each proposal, the model is updated with its
+predicted value ("kriging believer" heuristic [2]_) thus the next proposal
+goes elsewhere.
+
+References
+----------
+.. [1] Jones, D. R., Schonlau, M., & Welch, W. J. (1998). Efficient global
+   optimization of expensive black-box functions. Journal of Global
+   Optimization, 13(4), 455-492.
+.. [2] Ginsbourger, D., Le Riche, R., & Carraro, L. (2010). Kriging is
+   well-suited to parallelize optimization. Computational Intelligence in
+   Expensive Optimization Problems, 131-162.
+"""
+
+__all__ = ['GaussianProcess',
+           'expected_improvement',
+           'minimize']
+
+import argparse
+import math
+import numpy as np
+import time
+
+import json
+from scipy import linalg
+from scipy import optimize
+from scipy import stats
+from datapipe.optimization.checkpoint import Checkpoint
+from datapipe.optimization.checkpoint import append_json_line
+from datapipe.optimization.checkpoint import get_function_state
+from datapipe.optimization.checkpoint import get_rng_state
+from datapipe.optimization.checkpoint import read_json_lines
+from datapipe.optimization.checkpoint import set_function_state
+from datapipe.optimization.checkpoint import set_rng_state
+from datapipe.optimization.evaluation_cache import EvaluationCache
+from datapipe.optimization import process_pool
+from datapipe.optimization.process_pool import ObjectiveFunctionPool
+from datapipe.optimization.objectivefunc.wavelets_mrfilter_delta_psi import ObjectiveFunction
+
+import datapipe.denoising.cdf
+from datapipe.denoising.inverse_transform_sampling import EmpiricalDistribution
+
+def main():
+
+    # PARSE OPTIONS ###########################################################
+
+    parser = argparse.ArgumentParser(description="Optimize cleaning parameters with a surrogate model (Bayesian optimization).")
+
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the run saved in the checkpoint file")
+
+    parser.add_argument("--checkpoint", default="optimize_sigma_surrogate_checkpoint.json", metavar="FILE",
+                        help="The checkpoint file path (default: %(default)s)")
+
+    args = parser.parse_args()
+
+    instrument = "astri"
+    #instrument = "astri_konrad"
+    #instrument = "digicam"
+    #instrument = "flashcam"
+    #instrument = "nectarcam"
+    #instrument = "lstcam"
+
+    if instrument == "astri":
+
+        cam_id = "ASTRICam"
+        noise_distribution = EmpiricalDistribution(datapipe.denoising.cdf.ASTRI_CDF_FILE)
+        input_files = ["/dev/shm/.jd/astri/gamma/"]
+
+    elif instrument == "astri_konrad":
+
+        cam_id = "ASTRICam"
+        noise_distribution = EmpiricalDistribution(datapipe.denoising.cdf.ASTRI_CDF_FILE)
+        input_files = ["/dev/shm/.jd/astri_konrad/gamma/"]
+
+    elif instrument == "digicam":
+
+        cam_id = "DigiCam"
+        noise_distribution = EmpiricalDistribution(datapipe.denoising.cdf.DIGICAM_CDF_FILE)
+        input_files = ["/dev/shm/.jd/digicam/gamma/"]
+
+    elif instrument == "flashcam":
+
+        cam_id = "FlashCam"
+        noise_distribution = EmpiricalDistribution(datapipe.denoising.cdf.FLASHCAM_CDF_FILE)
+        input_files = ["/dev/shm/.jd/flashcam/gamma/"]
+
+    elif instrument == "nectarcam":
+
+        cam_id = "NectarCam"
+        noise_distribution = EmpiricalDistribution(datapipe.denoising.cdf.NECTARCAM_CDF_FILE)
+        input_files = ["/dev/shm/.jd/nectarcam/gamma/"]
+
+    elif instrument == "lstcam":
+
+        cam_id = "LSTCam"
+        noise_distribution = EmpiricalDistribution(datapipe.denoising.cdf.LSTCAM_CDF_FILE)
+        input_files = ["/dev/shm/.jd/lstcam/gamma/"]
+
+    else:
+
+        raise Exception("Unknown instrument", instrument)
+
+    # Evaluations are cached (on disk) and shared between runs
+    cache = EvaluationCache()
+
+    # Racing is not used: partial scores of rejected candidates would bias
+    # the surrogate model
+    func = ObjectiveFunction(input_files=input_files,
+                             cam_id=cam_id,
+                             noise_distribution=noise_distribution,
+                             max_num_img=None,
+                             aggregation_method="mean",  # "mean" or "median"
+                             cache=cache)
+
+    bounds = ((0.5, 6), (0.5, 6), (0.5, 6), (0.5, 6))
+
+    num_workers = 1     # The number of objective function evaluations made in parallel
+
+    checkpoint = Checkpoint(args.checkpoint, interval=1, cache=cache)
+
+    # Each batch is appended to the iterations file (JSON Lines)
+    iterations_file_path = "optimize_sigma_surrogate_iterations.jsonl"
+
+    if args.resume:
+        # Drop the batches made after the checkpoint (they are made again)
+        state = checkpoint.load("surrogate")
+        last_it = -2 if state is None else state["nit"] - 1
+        it_list = [it_dict for it_dict in read_json_lines(iterations_file_path) if it_dict["it"] <= last_it]
+    else:
+        it_list = []
+
+    with open(iterations_file_path, "w") as fd:
+        for it_dict in it_list:
+            fd.write(json.dumps(it_dict, sort_keys=True) + "\n")
+
+    def callback(batch, it_info):
+        print(batch)
+        print("Iteration {it}: {num_evals} evaluations in {wall_time_sec:.1f}s ({evals_per_sec:.2f} evaluations/s) ; best f(x)={best_fun}".format(**it_info))
+        append_json_line(iterations_file_path, dict(it_info, batch=batch))
+
+    if num_workers > 1:
+        executor = ObjectiveFunctionPool(func, max_workers=num_workers)
+    else:
+        executor = None
+
+    try:
+        res = minimize(func,
+                       bounds,
+                       num_iter=25,
+                       batch_size=max(num_workers, 4),
+                       callback=callback,
+                       executor=executor,
+                       checkpoint=checkpoint,
+                       resume=args.resume)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    print("x* =", res['x'])
+    print("f(x*) =", res['fun'])
+    print("Number of evaluations of the objective functions:", res['nfev'])
+    print("Number of iterations performed by the optimizer:", res['nit'])
+
+    # SAVE RESULTS ############################################################
+
+    with open("optimize_sigma_surrogate.json", "w") as fd:
+        json.dump(res, fd, sort_keys=True, indent=4)  # pretty print format
+
+
+# SURROGATE MODEL #############################################################
+
+class GaussianProcess(object):
+    """A Gaussian process regression model with a Matern 5/2 kernel.
+
+    The kernel has one length scale per dimension (automatic relevance
+    determination), a signal variance and a noise variance (evaluations on
+    a finite dataset are noisy). These hyper parameters are fitted by
+    maximizing the log marginal likelihood. Targets are standardized before
+    fitting.
+
+    Parameters
+    ----------
+    length_scale_bounds : tuple of float
+        The bounds of length scales (inputs are expected to be scaled to the
+        unit hypercube).
+    noise_bounds : tuple of float
+        The bounds of the noise variance (relative to the variance of
+        targets).
+    num_restarts : int
+        The number of random restarts of the likelihood maximization.
+    seed : int, numpy.random.RandomState or the numpy.random module
+        The seed (or the random number generator) used for restarts.
+
+    Attributes
+    ----------
+    params : Numpy array
+        The log of the fitted hyper parameters (length scales, signal
+        variance and noise variance).
+    """
+
+    def __init__(self,
+                 length_scale_bounds=(1e-2, 1e1),
+                 noise_bounds=(1e-6, 1e-1),
+                 num_restarts=3,
+                 seed=None):
+
+        self.length_scale_bounds = length_scale_bounds
+        self.noise_bounds = noise_bounds
+        self.num_restarts = num_restarts
+
+        if (seed is None) or isinstance(seed, (int, np.integer)):
+            self.rng = np.random.RandomState(seed)
+        else:
+            self.rng = seed         # A RandomState or the numpy.random module
+
+        self.params = None
+
+    def _kernel(self, x1, x2, params):
+        d = x1.shape[1]
+        length_scales = np.exp(params[:d])
+        signal_variance = np.exp(params[d])
+
+        diff = (x1[:, np.newaxis, :] - x2[np.newaxis, :, :]) / length_scales
+        r = np.sqrt(np.sum(np.square(diff), axis=-1)) * math.sqrt(5.)
+
+        return signal_variance * (1. + r + np.square(r) / 3.) * np.exp(-r)
+
+    def _factorize(self, params):
+        kernel = self._kernel(self.x, self.x, params)
+        kernel[np.diag_indices_from(kernel)] += np.exp(params[-1]) + 1e-10
+        return linalg.cho_factor(kernel, lower=True)
+
+    def _negative_log_likelihood(self, params):
+        try:
+            cho = self._factorize(params)
+        except linalg.LinAlgError:
+            return 1e25
+
+        alpha = linalg.cho_solve(cho, self.y)
+
+        return 0.5 * self.y.dot(alpha) + np.sum(np.log(np.diag(cho[0]))) + 0.5 * len(self.y) * math.log(2. * math.pi)
+
+    def fit(self, x, y, optimize_params=True):
+        """Fit the model to the points `x` (shape ``(n, d)``) and the values
+        `y` (shape ``(n,)``).
+
+        If `optimize_params` is `False`, the current hyper parameters are
+        kept (e.g. to add a few points to the model quickly).
+        """
+
+        self.x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+
+        self.y_mean = y.mean()
+        self.y_std = y.std() if y.std() > 0 else 1.
+        self.y = (y - self.y_mean) / self.y_std
+
+        d = self.x.shape[1]
+        log_bounds = [np.log(self.length_scale_bounds)] * d + [np.log((1e-2, 1e2)), np.log(self.noise_bounds)]
+
+        if optimize_params or self.params is None:
+            init_params_list = [np.log([0.3] * d + [1., 1e-3])] if self.params is None else [self.params]
+            init_params_list += [np.array([self.rng.uniform(low, high) for low, high in log_bounds])
+                                 for restart_index in range(self.num_restarts)]
+
+            best_res = None
+            for init_params in init_params_list:
+                res = optimize.minimize(self._negative_log_likelihood,
+                                        init_params,
+                                        method="L-BFGS-B",
+                                        bounds=log_bounds)
+                if (best_res is None) or (res.fun < best_res.fun):
+                    best_res = res
+
+            self.params = best_res.x
+
+        self.cho = self._factorize(self.params)
+        self.alpha = linalg.cho_solve(self.cho, self.y)
+
+        return self
+
+    def predict(self, x):
+        """Return the predicted mean and standard deviation at the points `x`
+        (shape ``(m, d)``)."""
+
+        x = np.atleast_2d(np.asarray(x, dtype=np.float64))
+        d = self.x.shape[1]
+
+        cross_kernel = self._kernel(x, self.x, self.params)
+        mean = cross_kernel.dot(self.alpha)
+
+        v = linalg.solve_triangular(self.cho[0], cross_kernel.T, lower=True)
+        variance = np.exp(self.params[d]) - np.sum(np.square(v), axis=0)
+        std = np.sqrt(np.maximum(variance, 1e-12))
+
+        return self.y_mean + self.y_std * mean, self.y_std * std
+
+
+def expected_improvement(mean, std, best_value, xi=0.):
+    """Return the expected improvement (for a minimization) over
+    `best_value` of points having the predicted `mean` and `std`.
+
+    Parameters
+    ----------
+    mean, std : array_like
+        The predicted mean and standard deviation.
+    best_value : float
+        The best (lowest) value observed so far.
+    xi : float
+        The minimum improvement (larger values favor exploration).
+    """
+
+    mean = np.asarray(mean, dtype=np.float64)
+    std = np.asarray(std, dtype=np.float64)
+
+    improvement = best_value - mean - xi
+    z = improvement / std
+
+    return improvement * stats.norm.cdf(z) + std * stats.norm.pdf(z)
+
+
+# OPTIMIZER ###################################################################
+
+def _latin_hypercube(num_points, d, rng):
+    """Return `num_points` points of the unit hypercube (one point in each
+    of the `num_points` slices of each dimension)."""
+
+    return np.array([(rng.permutation(num_points) + rng.uniform(size=num_points)) / num_points for dim in range(d)]).T
+
+
+def _propose(model, best_value, d, num_candidates, rng):
+    """Return the point of the unit hypercube maximizing the expected
+    improvement of `model`."""
+
+    def negative_ei(u):
+        mean, std = model.predict(u)
+        return -expected_improvement(mean, std, best_value)[0]
+
+    # Random candidates, half of them around the best points of the model
+    candidates = rng.uniform(size=(num_candidates, d))
+    best_points = model.x[np.argsort(model.y)[:5]]
+    local_candidates = best_points[rng.randint(len(best_points), size=num_candidates // 2)]
+    candidates[:num_candidates // 2] = np.clip(local_candidates + rng.normal(scale=0.05, size=local_candidates.shape), 0., 1.)
+
+    mean, std = model.predict(candidates)
+    ei = expected_improvement(mean, std, best_value)
+
+    # Polish the best candidates
+    best_u, best_ei = candidates[np.argmax(ei)], -np.max(ei)
+    for start_u in candidates[np.argsort(-ei)[:3]]:
+        res = optimize.minimize(negative_ei, start_u, method="L-BFGS-B", bounds=[(0., 1.)] * d)
+        if res.fun < best_ei:
+            best_u, best_ei = res.x, res.fun
+
+    return best_u
+
+
+def minimize(objective_function,
+             bounds,
+             num_iter=20,
+             batch_size=4,
+             num_init=None,
+             num_candidates=1000,
+             callback=None,
+             executor=None,
+             seed=None,
+             checkpoint=None,
+             resume=False):
+    """Minimize `objective_function` with a Gaussian process surrogate model
+    (see the module documentation).
+
+    Parameters
+    ----------
+    objective_function : callable
+        The function to minimize. It takes a list of floats (a point) and
+        returns a float. Non finite values (rejected or failed points) are
+        replaced by the worst finite value in the model.
+    bounds : sequence of tuple
+        The ``(min, max)`` bounds of each dimension.
+    num_iter : int
+        The number of batches proposed by the model.
+    batch_size : int
+        The number of points of each batch.
+    num_init : int
+        The number of points of the initial design (a latin hypercube
+        sample). The default is ``max(2 * d + 1, batch_size)``.
+    num_candidates : int
+        The number of random points used to maximize the expected
+        improvement.
+    callback : callable
+        A function called after the evaluation of the initial design and of
+        each batch with two arguments: the batch (a list of ``[x_1, ...,
+        x_d, f(x)]`` lists) and a dictionary containing the iteration number
+        ("it", -1 for the initial design), the number of evaluations
+        ("num_evals"), their wall time ("wall_time_sec"), their throughput
+        ("evals_per_sec") and the best value so far ("best_fun").
+    executor : concurrent.futures.Executor
+        If given, the points of a batch are evaluated concurrently with
+        ``executor.map`` (use an
+        :class:`datapipe.optimization.process_pool.ObjectiveFunctionPool`
+        holding `objective_function` to send only points to worker
+        processes). Otherwise they are evaluated one after another.
+    seed : int
+        The seed of the random number generator. If `None`, the global Numpy
+        random number generator is used.
+    checkpoint : Checkpoint
+        If given, the evaluated points, the model hyper parameters, the
+        random number generator state and the objective function state are
+        saved after the initial design and every ``checkpoint.interval``
+        batches.
+    resume : bool
+        If `True`, the run saved in `checkpoint` (if any) is continued (as
+        the model hyper parameters are restored too, the resumed run gives the
+        result of an uninterrupted run).
+
+    Returns
+    -------
+    dict
+        The best point and some metadata.
+    """
+
+    if seed is None:
+        rng = np.random
+    else:
+        rng = np.random.RandomState(seed)
+
+    launch_time = time.perf_counter()
+
+    bounds = np.array(bounds, dtype=np.float64)
+    d = len(bounds)
+    lower, width = bounds[:, 0], bounds[:, 1] - bounds[:, 0]
+
+    if num_init is None:
+        num_init = max(2 * d + 1, batch_size)
+
+    model = GaussianProcess(seed=rng)
+
+    x_list = []
+    fx_list = []
+
+    def evaluate(u_array, it):
+        x_batch = (lower + u_array * width).tolist()
+
+        start_time = time.perf_counter()
+        fx_batch = [float(fx) for fx in process_pool.evaluate(objective_function, x_batch, executor)]
+        wall_time_sec = time.perf_counter() - start_time
+
+        x_list.extend(x_batch)
+        fx_list.extend(fx_batch)
+
+        finite_fx_list = [fx for fx in fx_list if math.isfinite(fx)]
+
+        it_info = {"it": it,
+                   "num_evals": len(fx_batch),
+                   "wall_time_sec": wall_time_sec,
+                   "evals_per_sec": len(fx_batch) / wall_time_sec if wall_time_sec > 0 else float('inf'),
+                   "best_fun": min(finite_fx_list) if len(finite_fx_list) > 0 else float('nan')}
+
+        if callback is not None:
+            callback([x + [fx] for x, fx in zip(x_batch, fx_batch)], it_info)
+
+    def save_checkpoint(nit):
+        checkpoint.save("surrogate", {"nit": nit,
+                                      "x_list": x_list,
+                                      "fun_list": fx_list,
+                                      "model_params": None if model.params is None else model.params.tolist(),
+                                      "rng_state": get_rng_state(rng),
+                                      "function_state": get_function_state(objective_function)})
+
+    state = checkpoint.load("surrogate") if (resume and checkpoint is not None) else None
+
+    if state is None:
+        evaluate(_latin_hypercube(num_init, d, rng), -1)
+
+        if checkpoint is not None:
+            save_checkpoint(0)
+
+        first_it = 0
+    else:
+        if len(state["x_list"][0]) != d:
+            raise ValueError("The checkpoint doesn't match the optimizer bounds")
+
+        x_list.extend(state["x_list"])
+        fx_list.extend(state["fun_list"])
+        set_rng_state(rng, state["rng_state"])
+        set_function_state(objective_function, state["function_state"])
+
+        # The first fit starts from the hyper parameters of the last fit
+        if state["model_params"] is not None:
+            model.params = np.array(state["model_params"])
+
+        first_it = state["nit"]
+
+    for it in range(first_it, num_iter):
+
+        # Fit the model ################################
+
+        u_array = (np.array(x_list) - lower) / width
+        fx_array = np.array(fx_list, dtype=np.float64)
+        is_finite = np.isfinite(fx_array)
+
+        if not np.any(is_finite):
+            raise ValueError("The objective function has no finite value on the initial design")
+
+        fx_array[~is_finite] = fx_array[is_finite].max()       # Rejected or failed points
+        best_value = fx_array.min()
+
+        model.fit(u_array, fx_array)
+
+        # Propose a batch ##############################
+
+        batch = []
+        for point_index in range(batch_size):
+            u = _propose(model, best_value, d, num_candidates, rng)
+            batch.append(u)
+
+            # Kriging believer: the model takes its prediction for granted
+            # (hyper parameters are kept)
+            if point_index < batch_size - 1:
+                u_array = np.vstack((u_array, u))
+                fx_array = np.append(fx_array, model.predict(u)[0][0])
+                model.fit(u_array, fx_array, optimize_params=False)
+
+        # Evaluate the batch ###########################
+
+        evaluate(np.array(batch), it)
+
+        if (checkpoint is not None) and (checkpoint.due(it) or it == num_iter - 1):
+            save_checkpoint(it + 1)
+
+    finite_fx_array = np.where(np.isfinite(fx_list), fx_list, np.inf)
+    best_index = int(np.argmin(finite_fx_array))
+
+    res = {}
+    res['x'] = x_list[best_index]
+    res['fun'] = fx_list[best_index]
+    res['x_list'] = x_list
+    res['fun_list'] = fx_list
+    res['nit'] = num_iter
+    res['nfev'] = len(fx_list)
+    res['bounds'] = bounds.tolist()
+    res['num_init'] = num_init
+    res['batch_size'] = batch_size
+    res['seed'] = seed
+    res['wall_time_sec'] = time.perf_counter() - launch_time
+    res['evals_per_sec'] = res['nfev'] / res['wall_time_sec'] if res['wall_time_sec'] > 0 else float('inf')
+
+    return res
+
+
+if __name__ == "__main__":
+    main()
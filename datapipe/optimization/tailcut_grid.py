@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+Whole grid evaluation of the tailcut objective function.
+
+A brute force search of the tailcut thresholds cleans each image once per
+grid point. The tailcut mask of ctapipe's ``tailcuts_clean`` (without
+isolated pixels) is::
+
+    (img >= low & max_neighbor >= high) | (img >= high & max_neighbor >= low)
+
+where ``max_neighbor`` is the brightest neighbor of each pixel. It only
+depends on the thresholds through these comparisons thus, once
+``max_neighbor`` is known, the masks of all ``(high, low)`` pairs of a grid
+are computed in one vectorized operation. A `TailcutGridEvaluator` does this
+for each image of a `PreloadedDataset`, cleans and parametrizes the distinct
+masks only (most grid points give the same mask as another one) and scores
+the whole grid in about the time of a single dataset pass.
+
+Scores are exactly the ones of
+:class:`datapipe.optimization.objectivefunc.tailcut_delta_psi.ObjectiveFunction`.
+"""
+
+__all__ = ['max_neighbor_values',
+           'tailcut_grid_masks',
+           'TailcutGridEvaluator',
+           'brute']
+
+import time
+
+import numpy as np
+
+from datapipe.benchmark.aggregation import ScoreAggregator
+from datapipe.benchmark.assess import norm_angle_diff
+from datapipe.image.hillas_parameters import get_hillas_parameters_batch
+from datapipe.image.kill_isolated_pixels import kill_isolated_pixels_batch
+from datapipe.io import geometry_converter
+from datapipe.optimization.objectivefunc.preloaded_dataset import WORST_DELTA_PSI_DEG
+
+
+def max_neighbor_values(images_1d, neighbor_table):
+    """Return the value of the brightest neighbor of each pixel.
+
+    Parameters
+    ----------
+    images_1d : array_like
+        The 1D images (shape (..., num_pixels)).
+    neighbor_table : tuple of Numpy arrays
+        The ``(indptr, indices)`` neighbor table of the camera (see
+        `datapipe.io.geometry_converter.get_neighbor_table`).
+
+    Returns
+    -------
+    Numpy array
+        The greatest value of the neighbors of each pixel (NaN neighbors are
+        ignored; ``-inf`` if a pixel has no neighbor).
+    """
+
+    images_1d = np.asarray(images_1d, dtype=np.float64)
+    indptr, indices = (np.asarray(array, dtype=np.intp) for array in neighbor_table)
+
+    num_neighbors = np.diff(indptr)
+    result = np.full(images_1d.shape[:-1] + (len(num_neighbors),), -np.inf)
+
+    if len(indices) > 0:
+        has_neighbors = num_neighbors > 0
+        result[..., has_neighbors] = np.fmax.reduceat(images_1d[..., indices],
+                                                      indptr[:-1][has_neighbors],
+                                                      axis=-1)
+
+    return result
+
+
+def tailcut_grid_masks(image_1d, max_neighbor, high_thresholds, low_thresholds):
+    """Return the tailcut masks of an image for all threshold pairs.
+
+    Parameters
+    ----------
+    image_1d : array_like
+        The 1D image (shape (num_pixels,)).
+    max_neighbor : array_like
+        The brightest neighbor value of each pixel (see
+        `max_neighbor_values`).
+    high_thresholds : array_like
+        The "picture" thresholds (shape (num_high,)).
+    low_thresholds : array_like
+        The "boundary" thresholds (shape (num_low,)).
+
+    Returns
+    -------
+    Numpy array of bool
+        The masks of ``tailcuts_clean(geom, image_1d, high, low)`` for each
+        pair (shape (num_high, num_low, num_pixels)).
+    """
+
+    image_1d = np.asarray(image_1d)
+    max_neighbor = np.asarray(max_neighbor)
+    high_thresholds = np.asarray(high_thresholds, dtype=np.float64)[:, np.newaxis]
+    low_thresholds = np.asarray(low_thresholds, dtype=np.float64)[:, np.newaxis]
+
+    above_high = image_1d >= high_thresholds                # (num_high, num_pixels)
+    above_low = image_1d >= low_thresholds                  # (num_low, num_pixels)
+    neighbor_above_high = max_neighbor >= high_thresholds
+    neighbor_above_low = max_neighbor >= low_thresholds
+
+    return ((above_low[np.newaxis, :, :] & neighbor_above_high[:, np.newaxis, :]) |
+            (above_high[:, np.newaxis, :] & neighbor_above_low[np.newaxis, :, :]))
+
+
+class TailcutGridEvaluator(object):
+    """Assess a whole grid of tailcut thresholds at once (see the module
+    documentation).
+
+    Parameters
+    ----------
+    objective_function : ObjectiveFunction
+        A :class:`datapipe.optimization.objectivefunc.tailcut_delta_psi.ObjectiveFunction`
+        (its dataset, aggregation method, cleaning parameters and cache are
+        used).
+    verbose : bool
+        Print the evaluation time if `True`.
+
+    Attributes
+    ----------
+    input_images_1d : Numpy array
+        The 1D input images (shape (N, num_pixels)).
+    max_neighbor : Numpy array
+        The brightest neighbor value of each pixel of each image.
+    """
+
+    def __init__(self, objective_function, verbose=True):
+        self.objective_function = objective_function
+        self.dataset = objective_function.dataset
+        self.verbose = verbose
+
+        cam_id = self.dataset.cam_id
+
+        self.input_images_1d = geometry_converter.images_2d_to_1d(self.dataset.input_images, cam_id)
+        self.max_neighbor = max_neighbor_values(self.input_images_1d,
+                                                geometry_converter.get_neighbor_table(cam_id))
+
+    def _cleaning_params_grid(self, high_thresholds, low_thresholds):
+        """Return the valid grid points mask and the kill_isolated_pixels option."""
+
+        valid = np.zeros((len(high_thresholds), len(low_thresholds)), dtype=bool)
+        kill_isolated_pixels = False
+
+        for high_index, high_threshold in enumerate(high_thresholds):
+            for low_index, low_threshold in enumerate(low_thresholds):
+                algo_params = self.objective_function.cleaning_function_params([high_threshold, low_threshold])
+                if algo_params is not None:
+                    valid[high_index, low_index] = True
+                    kill_isolated_pixels = algo_params.get("kill_isolated_pixels", False)
+
+        return valid, kill_isolated_pixels
+
+    def delta_psi(self, high_thresholds, low_thresholds):
+        """Return the normalized delta psi of each image for each grid point.
+
+        Parameters
+        ----------
+        high_thresholds, low_thresholds : array_like
+            The thresholds of the grid (shapes (num_high,) and (num_low,)).
+
+        Returns
+        -------
+        Numpy array
+            The delta psi (in degrees) of each image (shape (num_high,
+            num_low, N)). Rejected grid points (see the objective function
+            `cleaning_function_params` method) are set to NaN.
+        """
+
+        high_thresholds = np.asarray(high_thresholds, dtype=np.float64)
+        low_thresholds = np.asarray(low_thresholds, dtype=np.float64)
+
+        cam_id = self.dataset.cam_id
+        valid, kill_isolated_pixels = self._cleaning_params_grid(high_thresholds, low_thresholds)
+
+        delta_psi_deg = np.full(valid.shape + (len(self.dataset),), np.nan)
+
+        if not np.any(valid):
+            return delta_psi_deg
+
+        for image_index, (image_1d, max_neighbor) in enumerate(zip(self.input_images_1d, self.max_neighbor)):
+            masks = tailcut_grid_masks(image_1d, max_neighbor, high_thresholds, low_thresholds)[valid]
+
+            # Clean and parametrize each distinct mask once
+            unique_masks, inverse = np.unique(masks, axis=0, return_inverse=True)
+
+            cleaned_images_1d = np.where(unique_masks, image_1d, 0.)
+
+            if kill_isolated_pixels:
+                # Islands are defined on 2D images (like in `Tailcut`)
+                cleaned_images_2d = geometry_converter.images_1d_to_2d(cleaned_images_1d, cam_id)
+                cleaned_images_2d = kill_isolated_pixels_batch(cleaned_images_2d)
+                cleaned_images_1d = geometry_converter.images_2d_to_1d(cleaned_images_2d, cam_id)
+
+            cleaned_hillas = get_hillas_parameters_batch(self.dataset.pixels_position_1d, cleaned_images_1d)
+
+            delta_psi_rad = np.asarray(cleaned_hillas["psi"], dtype=np.float64) - self.dataset.reference_hillas_psi[image_index]
+            unique_delta_psi_deg = norm_angle_diff(np.degrees(delta_psi_rad))
+            unique_delta_psi_deg[np.isnan(unique_delta_psi_deg)] = WORST_DELTA_PSI_DEG
+
+            delta_psi_deg[valid, image_index] = unique_delta_psi_deg[np.reshape(inverse, -1)]
+
+        return delta_psi_deg
+
+    def __call__(self, high_thresholds, low_thresholds):
+        """Return the aggregated score of each grid point.
+
+        Scores are added to the cache of the objective function (if any).
+
+        Parameters
+        ----------
+        high_thresholds, low_thresholds : array_like
+            The thresholds of the grid (shapes (num_high,) and (num_low,)).
+
+        Returns
+        -------
+        Numpy array
+            The score of each ``(high, low)`` pair (shape (num_high,
+            num_low)); NaN for rejected grid points.
+        """
+
+        start_time = time.perf_counter()
+
+        delta_psi_deg = self.delta_psi(high_thresholds, low_thresholds)
+
+        objective_function = self.objective_function
+        scores = np.full(delta_psi_deg.shape[:2], np.nan)
+
+        for high_index, high_threshold in enumerate(high_thresholds):
+            for low_index, low_threshold in enumerate(low_thresholds):
+                image_scores = delta_psi_deg[high_index, low_index]
+
+                if len(image_scores) == 0 or np.isnan(image_scores[0]):
+                    continue
+
+                aggregator = ScoreAggregator()
+                aggregator.update_array("delta_psi", image_scores)
+                scores[high_index, low_index] = aggregator.aggregate("delta_psi", objective_function.aggregation_method)
+
+                if objective_function.cache is not None:
+                    objective_function.cache.put(objective_function.fingerprint,
+                                                 [float(high_threshold), float(low_threshold)],
+                                                 float(scores[high_index, low_index]))
+
+        if self.verbose:
+            print("{} grid points assessed on {} images in {:.1f}s".format(scores.size,
+                                                                         len(self.dataset),
+                                                                         time.perf_counter() - start_time))
+
+        return scores
+
+
+def brute(objective_function, ranges, verbose=True):
+    """Minimize the tailcut objective function over a grid.
+
+    This is a drop-in replacement for ``scipy.optimize.brute(func, ranges,
+    full_output=True, finish=None)`` using a `TailcutGridEvaluator`.
+
+    Parameters
+    ----------
+    objective_function : ObjectiveFunction
+        A :class:`datapipe.optimization.objectivefunc.tailcut_delta_psi.ObjectiveFunction`.
+    ranges : tuple of slice
+        The ``(high, low)`` grid ranges (as in ``scipy.optimize.brute``).
+    verbose : bool
+        Print the evaluation time if `True`.
+
+    Returns
+    -------
+    tuple
+        ``(x0, fval, grid, Jout)``: the best point, its score, the grid
+        points (shape (2, num_high, num_low)) and the score of each grid point
+        (NaN for rejected points, which are never selected).
+    """
+
+    if len(ranges) != 2:
+        raise ValueError("Two ranges (high and low thresholds) are expected, got {}".format(len(ranges)))
+
+    grid = np.mgrid[tuple(ranges)]
+    high_thresholds = grid[0, :, 0]
+    low_thresholds = grid[1, 0, :]
+
+    evaluator = TailcutGridEvaluator(objective_function, verbose=verbose)
+    scores = evaluator(high_thresholds, low_thresholds)
+
+    if np.all(np.isnan(scores)):
+        raise ValueError("All grid points are rejected")
+
+    best_index = np.unravel_index(np.nanargmin(scores), scores.shape)
+
+    return grid[(slice(None),) + best_index], scores[best_index], grid, scores
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+This module contains unit tests for the "benchmark.aggregation" module.
+"""
+
+from datapipe.benchmark import aggregation
+
+import json
+import numpy as np
+
+import unittest
+
+class TestAggregation(unittest.TestCase):
+    """
+    Contains unit tests for the "benchmark.aggregation" module.
+    """
+
+    # Test the "RunningStatistics" class ######################################
+
+    def test_running_statistics(self):
+        """Check running statistics match Numpy ones (whatever the updates order)."""
+
+        rng = np.random.RandomState(0)
+        values = rng.normal(10., 3., size=1000)
+
+        statistics = aggregation.RunningStatistics()
+        for value in values[:300]:
+            statistics.update(value)
+        statistics.update(np.nan)
+
+        other_statistics = aggregation.RunningStatistics()
+        other_statistics.update_array(values[300:])
+
+        statistics.merge(other_statistics)
+
+        self.assertEqual(statistics.count, 1000)
+        self.assertEqual(statistics.num_nan, 1)
+        self.assertAlmostEqual(statistics.mean, values.mean(), places=12)
+        self.assertAlmostEqual(statistics.variance, values.var(), places=10)
+        self.assertEqual(statistics.min, values.min())
+        self.assertEqual(statistics.max, values.max())
+
+    # Test the "Histogram" class ##############################################
+
+    def test_histogram(self):
+        """Check histogram counts match Numpy ones."""
+
+        values = np.array([-1., 0., 0.5, 1., 1.5, 2., 2., 3., np.nan])
+        bin_edges = [0., 1., 2.]
+
+        histogram = aggregation.Histogram(bin_edges)
+        histogram.update_array(values[:4])
+
+        other_histogram = aggregation.Histogram(bin_edges)
+        for value in values[4:]:
+            other_histogram.update(value)
+
+        histogram.merge(other_histogram)
+
+        np.testing.assert_array_equal(histogram.counts, np.histogram(values[np.isfinite(values)], bins=bin_edges)[0])
+        self.assertEqual(histogram.underflow, 1)
+        self.assertEqual(histogram.overflow, 1)
+        self.assertEqual(histogram.num_nan, 1)
+
+        with self.assertRaises(ValueError):
+            histogram.merge(aggregation.Histogram([0., 1.]))
+
+    # Test the "QuantileSketch" class #########################################
+
+    def test_quantile_sketch_exact(self):
+        """Check quantiles are exact before compression."""
+
+        values = np.array([3., 1., 4., 1., 5., 9., 2., 6., 5.])
+
+        sketch = aggregation.QuantileSketch()
+        for value in values:
+            sketch.update(value)
+
+        self.assertEqual(sketch.median, np.median(values))
+        self.assertEqual(sketch.quantile(0.), values.min())
+        self.assertEqual(sketch.quantile(1.), values.max())
+
+    def test_quantile_sketch_merge(self):
+        """Check merged sketches give accurate quantiles."""
+
+        rng = np.random.RandomState(0)
+        values = rng.lognormal(size=20000)
+
+        sketch_list = []
+        for shard in np.array_split(values, 4):
+            sketch = aggregation.QuantileSketch()
+            sketch.update_array(shard)
+            sketch_list.append(aggregation.QuantileSketch.from_dict(json.loads(json.dumps(sketch.to_dict()))))
+
+        merged_sketch = sketch_list[0]
+        for sketch in sketch_list[1:]:
+            merged_sketch.merge(sketch)
+
+        self.assertEqual(merged_sketch.count, len(values))
+        self.assertLess(len(merged_sketch.to_dict()["means"]), 5 * merged_sketch.compression)
+
+        probabilities = [0.01, 0.25, 0.5, 0.75, 0.99]
+        np.testing.assert_allclose(merged_sketch.quantile(probabilities), np.quantile(values, probabilities), rtol=0.02)
+
+    # Test the "ScoreAggregator" class ########################################
+
+    def test_score_aggregator(self):
+        """Check aggregation of image dictionaries and merging of aggregators."""
+
+        image_dict_list = [{"score": (0.5, 1.), "score_name": ("e_shape", "e_energy"), "full_clean_execution_time_sec": 0.1},
+                           {"score": (0.3, 2.), "score_name": ("e_shape", "e_energy"), "full_clean_execution_time_sec": 0.3},
+                           {"error": {"message": "..."}},
+                           {"score": (0.1, 3.), "score_name": ("e_shape", "e_energy"), "full_clean_execution_time_sec": 0.2}]
+
+        histogram_bins = {"e_shape": [0., 0.25, 0.5]}
+
+        aggregator1 = aggregation.ScoreAggregator(histogram_bins=histogram_bins)
+        aggregator2 = aggregation.ScoreAggregator(histogram_bins=histogram_bins)
+
+        for image_dict in image_dict_list[:2]:
+            aggregator1.update_image_dict(image_dict)
+        for image_dict in image_dict_list[2:]:
+            aggregator2.update_image_dict(image_dict)
+
+        aggregator = aggregation.merge_aggregators([aggregator1, aggregator2])
+        aggregator = aggregation.ScoreAggregator.from_dict(json.loads(json.dumps(aggregator.to_dict())))
+
+        summary_dict = aggregator.summary()
+
+        self.assertEqual(summary_dict["num_images"], 4)
+        self.assertEqual(summary_dict["num_errors"], 1)
+        self.assertEqual(summary_dict["e_energy"]["count"], 3)
+        self.assertAlmostEqual(summary_dict["e_shape"]["mean"], 0.3)
+        self.assertEqual(aggregator.aggregate("e_energy", "median"), 2.)
+        self.assertEqual(aggregator.aggregate("full_clean_execution_time_sec", "max"), 0.3)
+        np.testing.assert_array_equal(aggregator.histograms["e_shape"].counts, [1, 2])
+
+        with self.assertRaises(ValueError):
+            aggregator.aggregate("e_energy", "mode")
+
+    # Test the "aggregate_array" function #####################################
+
+    def test_aggregate_array(self):
+        """Check exact aggregates on a dataset too large for an exact sketch median."""
+
+        values = np.random.RandomState(0).lognormal(size=5000)
+        values_with_nan = np.concatenate((values, [np.nan, np.nan]))
+
+        self.assertEqual(aggregation.aggregate_array(values_with_nan, "median"), float(np.median(values)))
+        self.assertEqual(aggregation.aggregate_array(values_with_nan, "mean"), float(np.mean(values)))
+        self.assertEqual(aggregation.aggregate_array(values_with_nan, "std"), float(np.std(values)))
+        self.assertEqual(aggregation.aggregate_array(values_with_nan, "min"), float(np.min(values)))
+        self.assertEqual(aggregation.aggregate_array(values_with_nan[::-1], "median"),
+                         aggregation.aggregate_array(values_with_nan, "median"))     # Order independent
+
+        self.assertTrue(np.isnan(aggregation.aggregate_array([np.nan], "median")))
+        self.assertTrue(np.isnan(aggregation.aggregate_array([], "mean")))
+
+        with self.assertRaises(ValueError):
+            aggregation.aggregate_array(values, "mode")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -29,6 +29,7 @@ from datapipe.benchmark import assess
 import numpy as np
 
 import unittest
+import warnings
 
 class TestAssess(unittest.TestCase):
     """
@@ -1237,6 +1238,99 @@ class TestAssess(unittest.TestCase):
         # Test ########################
 
         np.testing.assert_almost_equal(mark, expected_mark, decimal=10)
+
+
+    # Test the "AssessmentContext" class ######################################
+
+    def test_assessment_context(self):
+        """Check metrics give the same score with and without a shared context."""
+
+        input_image = None
+
+        output_image = np.array([[0, 2, np.nan, 1],
+                                 [1, 3, 3,      0],
+                                 [1, 2, 2,      1]])
+
+        reference_image = np.array([[1, 2, np.nan, 1],
+                                    [1, 4, 3,      1],
+                                    [0, 2, 2,      1]])
+
+        output_image_copy = np.copy(output_image)
+
+        context = assess.AssessmentContext(input_image, output_image, reference_image)
+
+        for metric_function in (assess.metric_mse,
+                                assess.metric_nrmse,
+                                assess.metric1,
+                                assess.metric2,
+                                assess.metric3,
+                                assess.metric4,
+                                assess.metric_kill_isolated_pixels):
+            mark = metric_function(input_image, output_image, reference_image)
+            mark_with_context = metric_function(input_image, output_image, reference_image, context=context)
+
+            np.testing.assert_equal(mark_with_context, mark)
+
+        # Intermediate values are computed once
+        self.assertIs(context.normalized_output_image, context.normalized_output_image)
+
+        np.testing.assert_array_equal(output_image, output_image_copy)
+
+
+    # Test batch metrics ######################################################
+
+    def test_assess_image_cleaning_batch(self):
+        """Check batch metrics match single image metrics."""
+
+        rng = np.random.RandomState(0)
+
+        output_images = rng.poisson(2, size=(6, 5, 5)).astype(np.float64)
+        reference_images = rng.poisson(2, size=(6, 5, 5)).astype(np.float64)
+        output_images[:, 0, 0] = np.nan
+        reference_images[:, 0, 0] = np.nan
+        reference_images[2] = 0.           # Empty reference image: NaN scores expected
+
+        single_metric_dict = {"mse":      assess.metric_mse,
+                              "nrmse":    assess.metric_nrmse,
+                              "unrmse":   assess.metric1,
+                              "e_shape":  assess.metric2,
+                              "e_energy": assess.metric3,
+                              "sspd":     assess.metric4,
+                              "ssim":     assess.metric_ssim}
+
+        with np.errstate(all='ignore'):
+            score_array, metric_name_tuple = assess.assess_image_cleaning_batch(None, output_images, reference_images, "all")
+
+        self.assertEqual(score_array.shape, (6, len(metric_name_tuple)))
+
+        for image_index in range(6):
+            for metric_index, metric_name in enumerate(metric_name_tuple):
+                try:
+                    with np.errstate(all='ignore'):
+                        expected_mark = single_metric_dict[metric_name](None, output_images[image_index], reference_images[image_index])
+                except assess.AssessError:
+                    expected_mark = np.nan
+
+                np.testing.assert_allclose(score_array[image_index, metric_index], expected_mark, rtol=1e-12)
+
+    def test_assess_image_cleaning_batch_failed_images(self):
+        """Check failed cleanings (NaN images) get NaN scores without warnings."""
+
+        rng = np.random.RandomState(0)
+
+        output_images = rng.poisson(2, size=(3, 8, 8)).astype(np.float64)
+        reference_images = rng.poisson(2, size=(3, 8, 8)).astype(np.float64)
+        output_images[1] = np.nan
+
+        metric_name_list = ["mse", "nrmse", "unrmse", "e_shape", "e_energy", "sspd"]
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", category=RuntimeWarning)
+            score_array, metric_name_tuple = assess.assess_image_cleaning_batch(None, output_images, reference_images, metric_name_list)
+
+        # The energy metrics of an empty output image are defined
+        self.assertTrue(np.all(np.isnan(score_array[1, :4])))
+        self.assertTrue(np.all(np.isfinite(score_array[[0, 2]])))
     
 
 if __name__ == '__main__':
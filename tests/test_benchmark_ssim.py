@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+This module contains unit tests for the "benchmark.ssim" module.
+"""
+
+from datapipe.benchmark import ssim
+
+import numpy as np
+
+import unittest
+
+class TestSSIM(unittest.TestCase):
+    """
+    Contains unit tests for the "benchmark.ssim" module.
+    """
+
+    # Test the "structural_similarity" function ###############################
+
+    def test_structural_similarity_identical_images(self):
+        """Check the SSIM of an image with itself is 1."""
+
+        image = np.array([[0, 1, 2, 1, 0],
+                          [1, 3, 4, 3, 1],
+                          [2, 4, 9, 4, 2],
+                          [1, 3, 4, 3, 1],
+                          [0, 1, 2, 1, 0]], dtype=np.float64)
+
+        self.assertAlmostEqual(ssim.structural_similarity(image, image), 1.)
+
+    def test_structural_similarity_skimage(self):
+        """Check the SSIM matches the one computed by scikit-image."""
+
+        try:
+            from skimage.metrics import structural_similarity as skimage_ssim
+        except ImportError:
+            self.skipTest("scikit-image >= 0.16 is not available")
+
+        rng = np.random.RandomState(0)
+
+        for shape in ((5, 5), (8, 13), (40, 40)):
+            image1 = rng.poisson(3, size=shape).astype(np.float64)
+            image2 = image1 + rng.normal(0, 1, size=shape)
+
+            expected_ssim = skimage_ssim(image1, image2, data_range=2., gaussian_weights=True, sigma=0.5, use_sample_covariance=True)
+
+            self.assertAlmostEqual(ssim.structural_similarity(image1, image2), expected_ssim, places=12)
+
+    def test_structural_similarity_nan(self):
+        """Check NaN pixels are set to 0."""
+
+        rng = np.random.RandomState(0)
+
+        image1 = rng.poisson(3, size=(6, 7)).astype(np.float64)
+        image2 = rng.poisson(3, size=(6, 7)).astype(np.float64)
+        image1[0, 0] = image2[0, 0] = np.nan
+
+        self.assertEqual(ssim.structural_similarity(image1, image2),
+                         ssim.structural_similarity(np.nan_to_num(image1), np.nan_to_num(image2)))
+
+    # Test the "structural_similarity_batch" function #########################
+
+    def test_structural_similarity_batch(self):
+        """Check batch scores match single image scores."""
+
+        rng = np.random.RandomState(0)
+
+        images1 = rng.poisson(3, size=(19, 6, 7)).astype(np.float64)
+        images2 = rng.poisson(3, size=(19, 6, 7)).astype(np.float64)
+
+        ssim_array = ssim.structural_similarity_batch(images1, images2)
+
+        self.assertEqual(ssim_array.shape, (19,))
+
+        for image_index in range(19):
+            self.assertEqual(ssim_array[image_index],
+                             ssim.structural_similarity(images1[image_index], images2[image_index]))
+
+    def test_structural_similarity_bad_shapes(self):
+        """Check images with different shapes are rejected."""
+
+        with self.assertRaises(ValueError):
+            ssim.structural_similarity(np.zeros((5, 5)), np.zeros((5, 6)))
+
+
+if __name__ == '__main__':
+    unittest.main()
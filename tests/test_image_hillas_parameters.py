@@ -25,6 +25,11 @@ This module contains unit tests for the "image.hillas_parameters" module.
 """
 
 from datapipe.image.hillas_parameters import get_hillas_parameters
+from datapipe.image.hillas_parameters import get_hillas_parameters_batch
+from datapipe.image.hillas_parameters import HILLAS_FIELDS
+from datapipe.io.geometry_converter import get_geom1d
+
+import astropy.units as u
 
 import copy
 import numpy as np
@@ -256,6 +261,60 @@ class TestHillasParameters(unittest.TestCase):
             np.testing.assert_almost_equal(value, value_nan, decimal=10)
 
 
+    # Test the "get_hillas_parameters_batch" function #########################
+
+    def test_get_hillas_parameters_batch_vs_implementation2(self):
+        """Check the batch engine gives the same values than ctapipe's
+        implementation 2."""
+
+        geom = get_geom1d("LSTCam")
+        num_pixels = len(geom.pix_x)
+
+        rng = np.random.RandomState(0)
+
+        # Gaussian "showers" on top of some noise
+        imgs = rng.uniform(0., 1., (5, num_pixels))
+        for img, (cx, cy) in zip(imgs, rng.uniform(-0.5, 0.5, (5, 2))):
+            img += 100. * np.exp(-((geom.pix_x.value - cx)**2 / 0.05 + (geom.pix_y.value - cy)**2 / 0.01))
+
+        params = get_hillas_parameters_batch(geom, imgs)
+
+        self.assertEqual(params.shape, (5,))
+
+        for img, batch_params in zip(imgs, params):
+            expected_params = get_hillas_parameters(geom, img, implementation=2)
+
+            for field in HILLAS_FIELDS:
+                expected_value = getattr(expected_params, field)
+                if field in ('phi', 'psi'):
+                    expected_value = expected_value.to(u.rad)
+                expected_value = getattr(expected_value, "value", expected_value)
+
+                np.testing.assert_allclose(batch_params[field], expected_value, rtol=1e-9, atol=1e-12, err_msg=field)
+
+
+    def test_get_hillas_parameters_batch_nan_and_empty(self):
+        """Check NaN pixels are ignored and empty images give NaN parameters."""
+
+        geom = get_geom1d("LSTCam")
+        num_pixels = len(geom.pix_x)
+
+        rng = np.random.RandomState(1)
+
+        img = rng.uniform(0., 10., num_pixels)
+        img_nan = img.copy()
+        img_nan[:10] = np.nan
+        img[:10] = 0.
+
+        params = get_hillas_parameters_batch(geom, np.array([img, img_nan, np.zeros(num_pixels)]))
+
+        for field in HILLAS_FIELDS:
+            self.assertEqual(params[0][field], params[1][field])
+
+        self.assertEqual(params[2]['size'], 0.)
+        self.assertTrue(np.isnan(params[2]['length']))
+
+
 if __name__ == '__main__':
     unittest.main()
 
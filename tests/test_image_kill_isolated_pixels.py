@@ -24,7 +24,9 @@
 This module contains unit tests for the "image.kill_isolated_pixels" module.
 """
 
+from datapipe.image.kill_isolated_pixels import IslandAnalysis
 from datapipe.image.kill_isolated_pixels import kill_isolated_pixels
+from datapipe.image.kill_isolated_pixels import kill_isolated_pixels_batch
 from datapipe.image.kill_isolated_pixels import kill_isolated_pixels_stats
 
 import numpy as np
@@ -280,7 +282,53 @@ class TestKillIsolatedPixels(unittest.TestCase):
         self.assertEqual(delta_pe, expected_delta_pe)
         self.assertEqual(delta_abs_pe, expected_delta_abs_pe)
         self.assertEqual(delta_num_pixels, expected_delta_num_pixels)
-    
+
+
+    # Test the "IslandAnalysis" class #########################################
+
+    def test_island_analysis_example1(self):
+        """Check the IslandAnalysis attributes match the functions outputs."""
+
+        input_img = np.array([[np.nan, 0, 1, 9, 0, np.nan],
+                              [     0, 0, 0, 1, 0,      0],
+                              [     1,-3, 0, 0,-5,      0],
+                              [np.nan, 0, 0, 1, 0, np.nan]])
+
+        input_img_copy = np.copy(input_img)
+
+        islands = IslandAnalysis(input_img)
+
+        self.assertEqual(islands.num_islands, 3)
+        self.assertEqual((islands.delta_pe, islands.delta_abs_pe, islands.delta_num_pixels), (-6, 10, 4))
+        self.assertEqual(islands.stats, kill_isolated_pixels_stats(input_img))
+        np.testing.assert_array_equal(islands.killed_image, kill_isolated_pixels(input_img))
+        np.testing.assert_array_equal(input_img, input_img_copy)
+
+
+    # Test the "kill_isolated_pixels_batch" function ##########################
+
+    def test_kill_isolated_pixels_batch(self):
+        """Check kill_isolated_pixels_batch gives the same result than kill_isolated_pixels on each image."""
+
+        rng = np.random.RandomState(0)
+
+        input_imgs = rng.normal(scale=3., size=(20, 6, 8))
+        input_imgs[:, 0, 0] = np.nan
+        input_imgs[1] = 0                   # no island
+        input_imgs[2] = 1                   # a single island
+        input_imgs[3, 1:3, 1:3] = 1         # two islands with the same sum
+        input_imgs[3, 4:6, 4:6] = 1
+
+        input_imgs_copy = np.copy(input_imgs)
+
+        for threshold in (0.2, None):
+            output_imgs = kill_isolated_pixels_batch(input_imgs.reshape(4, 5, 6, 8), threshold=threshold)
+            expected_output_imgs = np.array([kill_isolated_pixels(input_img, threshold=threshold) for input_img in input_imgs])
+
+            np.testing.assert_array_equal(output_imgs, expected_output_imgs.reshape(4, 5, 6, 8))
+
+        np.testing.assert_array_equal(input_imgs, input_imgs_copy)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+This module contains unit tests for the "image.pixel_graph" module.
+"""
+
+from datapipe.image.pixel_graph import PixelGraph
+from datapipe.image.pixel_graph import signal_to_border
+from datapipe.image.pixel_graph import signal_to_border_distance
+from datapipe.image.pixel_graph import pemax_on_border
+
+from datapipe.image import signal_to_border_distance as signal_to_border_distance_2d
+from datapipe.image import kill_isolated_pixels
+
+import numpy as np
+
+import unittest
+
+def grid_pixel_graph(shape, connectivity=8):
+    """Return the pixel graph of a rectangular 2D grid (pixels are numbered in
+    row-major order)."""
+
+    if connectivity == 8:
+        offsets = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+    else:
+        offsets = [(-1, 0), (0, -1), (0, 1), (1, 0)]
+
+    indptr = [0]
+    indices = []
+
+    for row in range(shape[0]):
+        for col in range(shape[1]):
+            for row_offset, col_offset in offsets:
+                if (0 <= row + row_offset < shape[0]) and (0 <= col + col_offset < shape[1]):
+                    indices.append((row + row_offset) * shape[1] + col + col_offset)
+            indptr.append(len(indices))
+
+    return PixelGraph(indptr, indices, cam_id="grid")
+
+
+class TestPixelGraph(unittest.TestCase):
+    """
+    Contains unit tests for the "image.pixel_graph" module.
+    """
+
+    def test_edge_distance(self):
+        """Check the hop distance to the edge of a 5x6 grid."""
+
+        pixel_graph = grid_pixel_graph((5, 6))
+
+        expected_edge_distance = np.array([[0, 0, 0, 0, 0, 0],
+                                           [0, 1, 1, 1, 1, 0],
+                                           [0, 1, 2, 2, 1, 0],
+                                           [0, 1, 1, 1, 1, 0],
+                                           [0, 0, 0, 0, 0, 0]])
+
+        np.testing.assert_array_equal(pixel_graph.edge_distance, expected_edge_distance.ravel())
+
+    def test_signal_to_border_matches_2d(self):
+        """Check the 1D functions match the 2D ones on a rectangular grid."""
+
+        shape = (7, 8)
+        pixel_graph = grid_pixel_graph(shape)
+        rng = np.random.RandomState(0)
+
+        for trial in range(20):
+            img_2d = rng.poisson(0.3, size=shape).astype(np.float64)
+            img_1d = img_2d.ravel()
+
+            self.assertEqual(signal_to_border(img_1d, pixel_graph),
+                             signal_to_border_distance_2d.signal_to_border(img_2d))
+            self.assertEqual(signal_to_border_distance(img_1d, pixel_graph),
+                             signal_to_border_distance_2d.signal_to_border_distance(img_2d))
+            self.assertEqual(pemax_on_border(img_1d, pixel_graph),
+                             signal_to_border_distance_2d.pemax_on_border(img_2d))
+
+    def test_islands_match_2d(self):
+        """Check the island analysis on a 4-connected grid graph matches the 2D one."""
+
+        shape = (7, 8)
+        pixel_graph = grid_pixel_graph(shape, connectivity=4)
+        rng = np.random.RandomState(0)
+
+        for trial in range(20):
+            img_2d = rng.poisson(0.5, size=shape).astype(np.float64)
+            img_1d = img_2d.ravel()
+
+            np.testing.assert_array_equal(kill_isolated_pixels.kill_isolated_pixels(img_1d, pixel_graph=pixel_graph),
+                                          kill_isolated_pixels.kill_isolated_pixels(img_2d).ravel())
+            self.assertEqual(kill_isolated_pixels.kill_isolated_pixels_stats(img_1d, pixel_graph=pixel_graph),
+                             kill_isolated_pixels.kill_isolated_pixels_stats(img_2d))
+            self.assertEqual(kill_isolated_pixels.number_of_islands(img_1d, pixel_graph=pixel_graph),
+                             kill_isolated_pixels.number_of_islands(img_2d))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -440,6 +440,16 @@ class TestSignalToBorderDistance(unittest.TestCase):
         expected_output = 1
 
         self.assertEqual(output, expected_output)
+
+    def test_signal_to_border_distance_no_valid_pixel(self):
+        """Check the signal_to_border_distance function raises an error when there is no valid pixel."""
+
+        input_img = np.full(shape=(4, 4), fill_value=np.nan)
+
+        self.assertEqual(signal_to_border(input_img), [])
+
+        with self.assertRaises(ValueError):
+            signal_to_border_distance(input_img)
     
 
     # Test the "pemax_on_border" function ###########################
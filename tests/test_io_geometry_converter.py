@@ -295,6 +295,133 @@ class TestGeometryConverter(unittest.TestCase):
         # Check whether the input image has changed
 
         np.testing.assert_array_equal(img_2d, img_2d_v2)
+
+
+    #################################################################################################
+    # INDEX MAPS ####################################################################################
+    #################################################################################################
+
+    # Test the "image_1d_to_2d" and "image_2d_to_1d" functions against ctapipe converters ###########
+
+    CAM_ID_LIST = ("ASTRICam", "CHEC", "DigiCam", "FlashCam", "LSTCam", "NectarCam")
+
+    def test_index_map_compiled(self):
+        """Check that index maps are compiled for all supported cameras."""
+
+        for cam_id in self.CAM_ID_LIST:
+            index_map = geometry_converter.get_index_map(cam_id)
+
+            self.assertIsNotNone(index_map, cam_id)
+            self.assertEqual(index_map.num_pixels, len(geometry_converter.get_geom1d(cam_id).pix_x))
+            self.assertEqual(len(index_map.gather_index), index_map.num_pixels)
+
+
+    def test_index_map_1d_to_2d(self):
+        """Check that index maps give the same 2D images than ctapipe converters."""
+
+        rng = np.random.RandomState(1)
+
+        for cam_id in self.CAM_ID_LIST:
+            num_pixels = len(geometry_converter.get_geom1d(cam_id).pix_x)
+
+            img_1d = rng.normal(0., 10., num_pixels)
+
+            img_2d = geometry_converter.image_1d_to_2d(img_1d, cam_id)
+            expected_img_2d = geometry_converter._image_1d_to_2d_ctapipe(img_1d, cam_id)
+
+            np.testing.assert_array_equal(img_2d, expected_img_2d)
+
+
+    def test_index_map_2d_to_1d(self):
+        """Check that index maps give the same 1D images than ctapipe converters."""
+
+        rng = np.random.RandomState(2)
+
+        for cam_id in self.CAM_ID_LIST:
+            shape_2d = geometry_converter.get_index_map(cam_id).shape_2d
+
+            img_2d = rng.normal(0., 10., shape_2d)
+
+            img_1d = geometry_converter.image_2d_to_1d(img_2d, cam_id)
+            expected_img_1d = geometry_converter._image_2d_to_1d_ctapipe(img_2d, cam_id)
+
+            np.testing.assert_array_equal(img_1d, expected_img_1d)
+
+
+    def test_index_map_1d_2d_1d(self):
+        """Check that a 1D image is unchanged after a 1D -> 2D -> 1D conversion."""
+
+        rng = np.random.RandomState(3)
+
+        for cam_id in self.CAM_ID_LIST:
+            num_pixels = len(geometry_converter.get_geom1d(cam_id).pix_x)
+
+            img_1d = rng.normal(0., 10., num_pixels)
+            img_1d_copy = img_1d.copy()
+
+            img_1d_v2 = geometry_converter.image_2d_to_1d(geometry_converter.image_1d_to_2d(img_1d, cam_id), cam_id)
+
+            np.testing.assert_array_equal(img_1d_v2, img_1d)
+            np.testing.assert_array_equal(img_1d, img_1d_copy)
+
+
+    # Test the on-disk cache ########################################################################
+
+    def test_cached_geom1d(self):
+        """Check that geometries rebuilt from the disk cache are identical to ctapipe's ones."""
+
+        from datapipe.io import cache
+
+        for cam_id in self.CAM_ID_LIST:
+            geometry_converter.get_geom1d(cam_id)   # make sure the cache file exists
+
+            geom = camera.CameraGeometry.from_name(cam_id)
+            geom2 = geometry_converter._cache_arrays_to_geom(cam_id, cache.load_camera_cache(cam_id))
+
+            self.assertIsNotNone(geom2, cam_id)
+            self.assertEqual(geom2.cam_id, geom.cam_id)
+            np.testing.assert_array_equal(geom2.pix_id,         geom.pix_id)
+            np.testing.assert_array_equal(geom2.pix_x.value,    geom.pix_x.value)
+            np.testing.assert_array_equal(geom2.pix_y.value,    geom.pix_y.value)
+            np.testing.assert_array_equal(geom2.pix_area.value, geom.pix_area.value)
+            self.assertEqual([list(n) for n in geom2.neighbors], [list(n) for n in geom.neighbors])
+            self.assertEqual(geom2.pix_type,  geom.pix_type)
+
+
+    # Test the "images_1d_to_2d" and "images_2d_to_1d" functions ####################################
+
+    def test_images_1d_to_2d_stack(self):
+        """Check that stacks are converted like each of their images."""
+
+        rng = np.random.RandomState(4)
+
+        for cam_id in self.CAM_ID_LIST:
+            num_pixels = len(geometry_converter.get_geom1d(cam_id).pix_x)
+
+            imgs_1d = rng.normal(0., 10., (3, 2, num_pixels))
+
+            imgs_2d = geometry_converter.images_1d_to_2d(imgs_1d, cam_id)
+
+            for i in range(3):
+                for j in range(2):
+                    np.testing.assert_array_equal(imgs_2d[i, j], geometry_converter.image_1d_to_2d(imgs_1d[i, j], cam_id))
+
+
+    def test_images_2d_to_1d_stack(self):
+        """Check that stacks are converted like each of their images."""
+
+        rng = np.random.RandomState(5)
+
+        for cam_id in self.CAM_ID_LIST:
+            shape_2d = geometry_converter.get_index_map(cam_id).shape_2d
+
+            imgs_2d = rng.normal(0., 10., (3, 2) + shape_2d)
+
+            imgs_1d = geometry_converter.images_2d_to_1d(imgs_2d, cam_id)
+
+            for i in range(3):
+                for j in range(2):
+                    np.testing.assert_array_equal(imgs_1d[i, j], geometry_converter.image_2d_to_1d(imgs_2d[i, j], cam_id))
     
 
 if __name__ == '__main__':
@@ -157,6 +157,49 @@ class TestImages(unittest.TestCase):
         # The temporary directory and all its contents are removed now
 
 
+    # Test the "find_files" function ##########################################
+
+    def _make_tree(self, temp_dir_path):
+        for file_name in ("b.fits", "a.fits", "c.simtel.gz", "d.txt"):
+            open(os.path.join(temp_dir_path, file_name), "w").close()
+        os.mkdir(os.path.join(temp_dir_path, "sub"))
+        for file_name in ("run1_TEL001_EV00001.fits", "run1_TEL002_EV00001.fits"):
+            open(os.path.join(temp_dir_path, "sub", file_name), "w").close()
+
+    def test_find_files_sort_and_recursion(self):
+        """Check the `images.find_files` function order and recursion."""
+
+        with tempfile.TemporaryDirectory() as temp_dir_path:
+            self._make_tree(temp_dir_path)
+
+            file_path_list = list(images.find_files(temp_dir_path, sort=True))
+            expected_list = [os.path.join(temp_dir_path, file_name) for file_name in ("a.fits", "b.fits", "c.simtel.gz")]
+            self.assertEqual(file_path_list, expected_list)
+
+            file_path_list = list(images.find_files(temp_dir_path, sort=True, recursive=True))
+            expected_list += [os.path.join(temp_dir_path, "sub", file_name) for file_name in ("run1_TEL001_EV00001.fits", "run1_TEL002_EV00001.fits")]
+            self.assertEqual(file_path_list, expected_list)
+
+
+    def test_find_files_filters(self):
+        """Check the `images.find_files` function filters and `max_num_files`."""
+
+        with tempfile.TemporaryDirectory() as temp_dir_path:
+            self._make_tree(temp_dir_path)
+
+            file_path_list = list(images.find_files([temp_dir_path], recursive=True, glob="*_TEL001_*"))
+            self.assertEqual(file_path_list, [os.path.join(temp_dir_path, "sub", "run1_TEL001_EV00001.fits")])
+
+            file_path_list = list(images.find_files([temp_dir_path], recursive=True, regex=r"TEL00[12]", sort=True))
+            self.assertEqual(len(file_path_list), 2)
+
+            file_path_list = list(images.find_files([temp_dir_path], recursive=True, max_num_files=2))
+            self.assertEqual(len(file_path_list), 2)
+
+            file_path_list = list(images.find_files([temp_dir_path], extensions=(".txt",)))
+            self.assertEqual(file_path_list, [os.path.join(temp_dir_path, "d.txt")])
+
+
 if __name__ == '__main__':
     unittest.main()
 
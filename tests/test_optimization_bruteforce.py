@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+This module contains unit tests for the "optimization.bruteforce" module.
+"""
+
+from datapipe.optimization import bruteforce
+from datapipe.optimization.checkpoint import Checkpoint
+
+import os
+import tempfile
+
+import numpy as np
+
+import unittest
+
+
+def _rejecting_function(x):
+    """A tailcut-like objective function: points with x[1] > x[0] are rejected (NaN)."""
+    if x[1] > x[0]:
+        return float('nan')
+    return float((x[0] - 3.)**2 + (x[1] - 2.)**2)
+
+
+class TestBruteforce(unittest.TestCase):
+    """
+    Contains unit tests for the "optimization.bruteforce" module.
+    """
+
+    # Test the "brute" function ###############################################
+
+    def test_brute_rejected_points(self):
+        """Check that rejected (NaN) grid points are ignored."""
+
+        ranges = (slice(0, 5, 1), slice(0, 5, 1))
+
+        x0, fval, grid, scores = bruteforce.brute(_rejecting_function, ranges)
+
+        np.testing.assert_array_equal(x0, [3, 2])
+        self.assertEqual(fval, 0.)
+        self.assertEqual(grid.shape, (2, 5, 5))
+        self.assertEqual(np.count_nonzero(np.isnan(scores)), 10)
+
+    def test_brute_all_rejected(self):
+        """Check that an error is raised when all grid points are rejected."""
+
+        with self.assertRaises(ValueError):
+            bruteforce.brute(lambda x: float('nan'), (slice(0, 3, 1), slice(0, 3, 1)))
+
+    def test_resume(self):
+        """Check that a resumed run gives the result of an uninterrupted run."""
+
+        ranges = (slice(0, 5, 1), slice(0, 5, 1))
+        res = bruteforce.brute(_rejecting_function, ranges)
+
+        num_calls = [0]
+        max_num_calls = [12]
+
+        def interrupted_function(x):
+            num_calls[0] += 1
+            if num_calls[0] > max_num_calls[0]:
+                raise RuntimeError("Interrupted")
+            return _rejecting_function(x)
+
+        with tempfile.TemporaryDirectory() as tmp_dir_path:
+            checkpoint = Checkpoint(os.path.join(tmp_dir_path, "checkpoint.json"), interval=4)
+
+            with self.assertRaises(RuntimeError):
+                bruteforce.brute(interrupted_function, ranges, checkpoint=checkpoint)
+
+            num_calls[0] = 0
+            max_num_calls[0] = 25
+            resumed_res = bruteforce.brute(interrupted_function, ranges, checkpoint=checkpoint, resume=True)
+
+        self.assertEqual(num_calls[0], 25 - 12)
+        np.testing.assert_array_equal(resumed_res[0], res[0])
+        np.testing.assert_array_equal(resumed_res[3], res[3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+This module contains unit tests for the "optimization.checkpoint" module.
+"""
+
+from datapipe.optimization import checkpoint
+
+import json
+import os
+import tempfile
+
+import numpy as np
+
+import unittest
+
+
+class TestCheckpoint(unittest.TestCase):
+    """
+    Contains unit tests for the "optimization.checkpoint" module.
+    """
+
+    # Test the random number generator state ##################################
+
+    def test_rng_state(self):
+        """Check that a JSON round trip of the RNG state gives the same random numbers."""
+
+        rng = np.random.RandomState(42)
+        rng.normal()                    # Leave a cached gaussian in the state
+
+        state = json.loads(json.dumps(checkpoint.get_rng_state(rng)))
+        expected_numbers = rng.normal(size=5).tolist()
+
+        new_rng = np.random.RandomState()
+        checkpoint.set_rng_state(new_rng, state)
+
+        self.assertEqual(new_rng.normal(size=5).tolist(), expected_numbers)
+
+    # Test the Checkpoint class ###############################################
+
+    def test_save_load(self):
+        """Check that a saved state is loaded back and that the optimizer name is checked."""
+
+        with tempfile.TemporaryDirectory() as tmp_dir_path:
+            cp = checkpoint.Checkpoint(os.path.join(tmp_dir_path, "checkpoint.json"))
+
+            self.assertIsNone(cp.load("saes"))
+
+            cp.save("saes", {"gen": 3, "parents": np.arange(6.).reshape(2, 3)})
+
+            self.assertEqual(cp.load("saes"), {"gen": 3, "parents": [[0., 1., 2.], [3., 4., 5.]]})
+            self.assertEqual(os.listdir(tmp_dir_path), ["checkpoint.json"])   # No temporary file left
+
+            with self.assertRaises(ValueError):
+                cp.load("bruteforce")
+
+    def test_due(self):
+        """Check the checkpoint interval."""
+
+        cp = checkpoint.Checkpoint("checkpoint.json", interval=3)
+
+        self.assertEqual([it for it in range(10) if cp.due(it)], [2, 5, 8])
+
+    # Test JSON Lines files ###################################################
+
+    def test_json_lines(self):
+        """Check that appended documents are read back and that a truncated last line is ignored."""
+
+        with tempfile.TemporaryDirectory() as tmp_dir_path:
+            file_path = os.path.join(tmp_dir_path, "iterations.jsonl")
+
+            self.assertEqual(checkpoint.read_json_lines(file_path), [])
+
+            checkpoint.append_json_line(file_path, {"gen": 0, "x": np.array([1., 2.])})
+            checkpoint.append_json_line(file_path, {"gen": 1, "x": [3., 4.]})
+
+            with open(file_path, "a") as fd:
+                fd.write('{"gen": 2, "x": [')     # Interrupted write
+
+            self.assertEqual(checkpoint.read_json_lines(file_path),
+                             [{"gen": 0, "x": [1., 2.]}, {"gen": 1, "x": [3., 4.]}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+This module contains unit tests for the "optimization.evaluation_cache" module.
+"""
+
+from datapipe.optimization import evaluation_cache
+
+import os
+import tempfile
+
+import unittest
+
+class TestEvaluationCache(unittest.TestCase):
+    """
+    Contains unit tests for the "optimization.evaluation_cache" module.
+    """
+
+    # Test the "canonical_params" function ####################################
+
+    def test_canonical_params(self):
+        """Check rounded-equal parameter vectors have the same canonical form."""
+
+        self.assertEqual(evaluation_cache.canonical_params([1., 0.1 + 0.2, -0.]),
+                         evaluation_cache.canonical_params([1, 0.3, 0.]))
+
+        self.assertNotEqual(evaluation_cache.canonical_params([1., 0.3]),
+                            evaluation_cache.canonical_params([1., 0.31]))
+
+    # Test the "dataset_fingerprint" function #################################
+
+    def test_dataset_fingerprint(self):
+        """Check the fingerprint changes when the dataset or an option changes."""
+
+        with tempfile.TemporaryDirectory() as directory_path:
+            file_path = os.path.join(directory_path, "image1.fits")
+            with open(file_path, "w") as fd:
+                fd.write("1")
+
+            fingerprint1 = evaluation_cache.dataset_fingerprint([directory_path], max_num_img=None)
+
+            self.assertEqual(fingerprint1, evaluation_cache.dataset_fingerprint([directory_path], max_num_img=None))
+            self.assertNotEqual(fingerprint1, evaluation_cache.dataset_fingerprint([directory_path], max_num_img=10))
+
+            with open(os.path.join(directory_path, "image2.fits"), "w") as fd:
+                fd.write("2")
+
+            self.assertNotEqual(fingerprint1, evaluation_cache.dataset_fingerprint([directory_path], max_num_img=None))
+
+    # Test the "EvaluationCache" class ########################################
+
+    def test_evaluation_cache(self):
+        """Check evaluations are persisted and only finite values are cached."""
+
+        with tempfile.TemporaryDirectory() as directory_path:
+            file_path = os.path.join(directory_path, "evaluations.sqlite")
+
+            cache = evaluation_cache.EvaluationCache(file_path)
+
+            self.assertIsNone(cache.get("dataset1", [1., 2.]))
+
+            cache.put("dataset1", [1., 2.], 3.5)
+            cache.put("dataset1", [1., 3.], float('inf'))
+            cache.put("dataset1", [1., 4.], float('nan'))
+
+            # A new instance reads the database
+            cache = evaluation_cache.EvaluationCache(file_path)
+
+            self.assertEqual(cache.get("dataset1", [1.0000000001, 2.]), 3.5)
+            self.assertIsNone(cache.get("dataset2", [1., 2.]))
+            self.assertIsNone(cache.get("dataset1", [1., 3.]))
+            self.assertIsNone(cache.get("dataset1", [1., 4.]))
+            self.assertEqual(len(cache), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+This module contains unit tests for the "optimization.multi_objective" module.
+"""
+
+from datapipe.optimization import multi_objective
+
+import numpy as np
+
+import unittest
+
+
+class _ObjectiveFunction:
+    """The quality improves (down to 1) and the cleaning time increases with
+    the number of scales x[0] ; x[1] only makes things worse."""
+
+    aggregation_method = "mean"
+
+    def __init__(self, num_images):
+        self.num_images = num_images
+        self.num_calls = 0
+
+    def cleaning_function_params(self, x):
+        return None if x[0] < 1 else {}
+
+    def score_images(self, x, image_indices=None):
+        self.num_calls += 1
+        delta_psi_deg = np.full(self.num_images, 1. + 4. / x[0] + x[1])
+        execution_time_sec = np.full(self.num_images, 1e-3 * x[0] * (1. + x[1]))
+        return delta_psi_deg, execution_time_sec
+
+
+class TestMultiObjective(unittest.TestCase):
+    """
+    Contains unit tests for the "optimization.multi_objective" module.
+    """
+
+    # Test the "pareto_front_mask" function ###################################
+
+    def test_pareto_front_mask(self):
+        """Check dominated and non finite points are excluded from the front."""
+
+        costs = [[1., 5.],
+                 [2., 2.],
+                 [3., 3.],              # Dominated by [2, 2]
+                 [5., 1.],
+                 [2., 2.],              # Duplicate of a point of the front
+                 [0., np.inf],
+                 [np.nan, 0.]]
+
+        np.testing.assert_array_equal(multi_objective.pareto_front_mask(costs),
+                                      [True, True, False, True, True, False, False])
+
+    # Test the "MultiObjectiveEvaluator" class ################################
+
+    def test_multi_objective_evaluator(self):
+        """Check records, the Pareto front and the fastest candidate within a tolerance."""
+
+        objective_function = _ObjectiveFunction(10)
+        evaluator = multi_objective.MultiObjectiveEvaluator(objective_function)
+
+        self.assertTrue(np.isnan(evaluator([0., 0.])))     # Rejected solution
+
+        grid = [[num_scales, x1] for num_scales in (1., 2., 4., 8.) for x1 in (0., 1.)]
+        score_list = [evaluator(x) for x in grid]
+
+        self.assertEqual(score_list, [1. + 4. / x[0] + x[1] for x in grid])
+        self.assertEqual(len(evaluator.records), len(grid))
+
+        front = evaluator.pareto_front()
+        self.assertEqual([record["x"] for record in front], [[1., 0.], [2., 0.], [4., 0.], [8., 0.]])
+        self.assertEqual([record["time_sec"] for record in front], sorted(record["time_sec"] for record in front))
+
+        # Best score: 1.5 (8 scales) ; 4 scales (score 2) is twice faster
+        self.assertEqual(evaluator.fastest_within(0.5)["x"], [4., 0.])
+        self.assertEqual(evaluator.fastest_within(0.)["x"], [8., 0.])
+
+    def test_time_weight(self):
+        """Check the cleaning time is added to the returned score."""
+
+        evaluator = multi_objective.MultiObjectiveEvaluator(_ObjectiveFunction(10), time_weight=1000.)
+
+        self.assertAlmostEqual(evaluator([2., 0.]), 1. + 2. + 2.)
+        self.assertEqual(evaluator.records[0]["score"], 3.)
+
+
+if __name__ == '__main__':
+    unittest.main()
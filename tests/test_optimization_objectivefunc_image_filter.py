@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+This module contains unit tests for the "optimization.objectivefunc.image_filter" module.
+"""
+
+from datapipe.optimization.objectivefunc import image_filter
+
+import os
+import tempfile
+
+import unittest
+
+def _record(tel_id=1, mc_energy=1., npe=100., signal_to_border_distance=2):
+    return {"file_path": "image.fits",
+            "event_id": 1,
+            "tel_id": tel_id,
+            "mc_energy": mc_energy,
+            "npe": npe,
+            "signal_to_border_distance": signal_to_border_distance}
+
+class TestImageFilter(unittest.TestCase):
+    """
+    Contains unit tests for the "optimization.objectivefunc.image_filter" module.
+    """
+
+    # Test the "ImageFilter" class ############################################
+
+    def test_image_filter_accept(self):
+        """Check each criterion of ImageFilter (closed ranges, open bounds, missing values)."""
+
+        self.assertTrue(image_filter.ImageFilter().selects_all())
+        self.assertTrue(image_filter.ImageFilter().accept(_record(mc_energy=None, signal_to_border_distance=None)))
+
+        energy_filter = image_filter.ImageFilter(mc_energy_range=(0.5, None))
+        self.assertFalse(energy_filter.selects_all())
+        self.assertTrue(energy_filter.accept(_record(mc_energy=0.5)))
+        self.assertFalse(energy_filter.accept(_record(mc_energy=0.4)))
+        self.assertFalse(energy_filter.accept(_record(mc_energy=None)))
+
+        npe_filter = image_filter.ImageFilter(npe_range=(50, 200))
+        self.assertTrue(npe_filter.accept(_record(npe=200.)))
+        self.assertFalse(npe_filter.accept(_record(npe=201.)))
+        self.assertFalse(npe_filter.accept(_record(npe=49.)))
+
+        border_filter = image_filter.ImageFilter(min_signal_to_border_distance=1)
+        self.assertTrue(border_filter.accept(_record(signal_to_border_distance=1)))
+        self.assertFalse(border_filter.accept(_record(signal_to_border_distance=0)))
+        self.assertFalse(border_filter.accept(_record(signal_to_border_distance=None)))
+
+        tel_filter = image_filter.ImageFilter(tel_id_list=[3, 1])
+        self.assertTrue(tel_filter.accept(_record(tel_id=1)))
+        self.assertFalse(tel_filter.accept(_record(tel_id=2)))
+
+        with self.assertRaises(ValueError):
+            image_filter.ImageFilter(npe_range=(50,))
+
+    # Test the "DatasetIndex" class ###########################################
+
+    def test_dataset_index(self):
+        """Check the index is saved in the cache directory and is invalidated when the dataset changes."""
+
+        records = [_record(tel_id=1, npe=10.), _record(tel_id=2, npe=1000.)]
+
+        initial_cache_dir = os.environ.get("DATAPIPE_CACHE_DIR")
+
+        with tempfile.TemporaryDirectory() as directory_path:
+            os.environ["DATAPIPE_CACHE_DIR"] = os.path.join(directory_path, "cache")
+
+            try:
+                input_dir_path = os.path.join(directory_path, "input")
+                os.makedirs(input_dir_path)
+
+                with open(os.path.join(input_dir_path, "image1.fits"), "w") as fd:
+                    fd.write("1")
+
+                self.assertIsNone(image_filter.DatasetIndex.load([input_dir_path], "ASTRICam"))
+
+                image_filter.DatasetIndex(records).save([input_dir_path], "ASTRICam")
+
+                index = image_filter.DatasetIndex.load([input_dir_path], "ASTRICam")
+                self.assertEqual(index.records, records)
+                self.assertEqual(index.select(image_filter.ImageFilter(npe_range=(None, 100))), records[:1])
+                self.assertIsNone(image_filter.DatasetIndex.load([input_dir_path], "LSTCam"))
+
+                with open(os.path.join(input_dir_path, "image2.fits"), "w") as fd:
+                    fd.write("2")
+
+                self.assertIsNone(image_filter.DatasetIndex.load([input_dir_path], "ASTRICam"))
+            finally:
+                if initial_cache_dir is None:
+                    del os.environ["DATAPIPE_CACHE_DIR"]
+                else:
+                    os.environ["DATAPIPE_CACHE_DIR"] = initial_cache_dir
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+This module contains unit tests for the "optimization.process_pool" module.
+"""
+
+from datapipe.optimization import process_pool
+
+import concurrent.futures
+
+import numpy as np
+
+import unittest
+
+
+# The number of times an `_Objective` has been pickled (in this process)
+_num_pickles = 0
+
+class _Objective(object):
+    """A picklable objective function counting its own pickles."""
+
+    def __getstate__(self):
+        global _num_pickles
+        _num_pickles += 1
+        return self.__dict__
+
+    def __call__(self, x):
+        return float(np.sum(np.square(np.array(x) - 1.)))
+
+
+class TestProcessPool(unittest.TestCase):
+    """
+    Contains unit tests for the "optimization.process_pool" module.
+    """
+
+    def setUp(self):
+        global _num_pickles
+        _num_pickles = 0
+
+        self.x_list = np.random.RandomState(0).uniform(size=(20, 3)).tolist()
+
+    def test_evaluate(self):
+        """Check that a pool evaluates points without pickling the objective function for each of them."""
+
+        objective_function = _Objective()
+        expected_fx_list = process_pool.evaluate(objective_function, self.x_list)
+
+        with process_pool.ObjectiveFunctionPool(objective_function, max_workers=2) as executor:
+            fx_list = process_pool.evaluate(objective_function, self.x_list, executor)
+            future_fx_list = [process_pool.submit(objective_function, x, executor).result() for x in self.x_list]
+
+        self.assertEqual(fx_list, expected_fx_list)
+        self.assertEqual(future_fx_list, expected_fx_list)
+        self.assertLessEqual(_num_pickles, 2)       # At most once per worker
+
+    def test_other_executors(self):
+        """Check that other executors and functions the pool doesn't hold are still supported."""
+
+        objective_function = _Objective()
+        expected_fx_list = [objective_function(x) for x in self.x_list]
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            self.assertEqual(process_pool.evaluate(objective_function, self.x_list, executor), expected_fx_list)
+
+        with process_pool.ObjectiveFunctionPool(_Objective(), max_workers=2) as executor:
+            self.assertEqual(process_pool.evaluate(objective_function, self.x_list, executor), expected_fx_list)
+
+        self.assertEqual(process_pool.submit(objective_function, self.x_list[0]).result(), expected_fx_list[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+This module contains unit tests for the "optimization.racing" module.
+"""
+
+from datapipe.optimization import racing
+
+import json
+
+import numpy as np
+
+import unittest
+
+
+class _Dataset:
+    def __init__(self, num_images):
+        self.reference_sum_pe = np.random.RandomState(0).lognormal(size=num_images)
+
+    def __len__(self):
+        return len(self.reference_sum_pe)
+
+
+class _ObjectiveFunction:
+    """A noisy quadratic objective function (minimum 5 at (6, 3))."""
+
+    aggregation_method = "mean"
+
+    def __init__(self, num_images):
+        self.dataset = _Dataset(num_images)
+        self.image_noise = np.random.RandomState(1).normal(scale=2., size=num_images)
+        self.num_image_evaluations = 0
+
+    def cleaning_function_params(self, x):
+        return None if x[1] > x[0] else {}
+
+    def score_images(self, x, image_indices):
+        image_indices = np.asarray(image_indices)
+        self.num_image_evaluations += len(image_indices)
+        score = (x[0] - 6.) ** 2 + (x[1] - 3.) ** 2 + 5.
+        return score + self.image_noise[image_indices], np.zeros(len(image_indices))
+
+
+class TestRacing(unittest.TestCase):
+    """
+    Contains unit tests for the "optimization.racing" module.
+    """
+
+    # Test the "stratified_order" function ####################################
+
+    def test_stratified_order(self):
+        """Check every prefix of the order samples all strata."""
+
+        values = np.arange(100)
+        order = racing.stratified_order(values, num_strata=5)
+
+        np.testing.assert_array_equal(np.sort(order), values)
+
+        for prefix_size in (5, 10, 50):
+            strata_count = np.bincount(values[order[:prefix_size]] // 20, minlength=5)
+            np.testing.assert_array_equal(strata_count, prefix_size // 5)
+
+    # Test the "RacingEvaluator" class ########################################
+
+    def test_racing_evaluator(self):
+        """Check racing finds the grid minimum at a fraction of the cost."""
+
+        num_images = 1000
+        objective_function = _ObjectiveFunction(num_images)
+        evaluator = racing.RacingEvaluator(objective_function, verbose=False)
+
+        self.assertEqual(evaluator.rung_sizes[-1], num_images)
+        self.assertTrue(np.isnan(evaluator([1., 2.])))     # Rejected solution
+
+        grid = [(x0, x1) for x0 in np.arange(0., 10.5, 0.5) for x1 in np.arange(0., 10.5, 0.5) if x1 <= x0]
+        score_list = [evaluator(x) for x in grid]
+
+        self.assertEqual(grid[int(np.argmin(score_list))], (6., 3.))
+        self.assertAlmostEqual(min(score_list), 5. + objective_function.image_noise.mean())
+        self.assertEqual(objective_function.num_image_evaluations, evaluator.num_image_evaluations)
+        self.assertLess(evaluator.cost_ratio, 0.3)
+
+    def test_racing_evaluator_state(self):
+        """Check a restored racing state gives the same decisions."""
+
+        grid = [(x0, x1) for x0 in np.arange(0., 10.5, 0.5) for x1 in np.arange(0., 10.5, 0.5) if x1 <= x0]
+
+        evaluator = racing.RacingEvaluator(_ObjectiveFunction(1000), verbose=False)
+        for x in grid[:100]:
+            evaluator(x)
+
+        new_evaluator = racing.RacingEvaluator(_ObjectiveFunction(1000), verbose=False)
+        new_evaluator.set_state(json.loads(json.dumps(evaluator.get_state())))
+
+        self.assertEqual([new_evaluator(x) for x in grid[100:]], [evaluator(x) for x in grid[100:]])
+        self.assertEqual(new_evaluator.num_calls, evaluator.num_calls)
+        self.assertEqual(new_evaluator.num_image_evaluations, evaluator.num_image_evaluations)
+
+
+if __name__ == '__main__':
+    unittest.main()
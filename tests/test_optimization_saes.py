@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+This module contains unit tests for the "optimization.saes" module.
+"""
+
+from datapipe.optimization import saes
+from datapipe.optimization.checkpoint import Checkpoint
+
+import concurrent.futures
+import os
+import tempfile
+
+import numpy as np
+
+import unittest
+
+
+def _sphere(x):
+    return float(np.sum(np.square(np.array(x) - 1.)))
+
+
+class TestSAES(unittest.TestCase):
+    """
+    Contains unit tests for the "optimization.saes" module.
+    """
+
+    # Test the "minimize" function ############################################
+
+    def test_minimize_executor(self):
+        """Check that concurrent evaluations give the result of a serial run."""
+
+        init_min_val, init_max_val = np.zeros(3), np.full(3, 5.)
+        gen_info_list = []
+
+        res = saes.minimize(_sphere, init_min_val, init_max_val, num_gen=10, seed=1)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            executor_res = saes.minimize(_sphere, init_min_val, init_max_val, num_gen=10, seed=1,
+                                         executor=executor,
+                                         callback=lambda pop, gen_info: gen_info_list.append(gen_info))
+
+        self.assertEqual(executor_res['x'], res['x'])
+        self.assertEqual(executor_res['fun'], res['fun'])
+        self.assertEqual(executor_res['nfev'], res['nfev'])
+
+        self.assertEqual([gen_info["gen"] for gen_info in gen_info_list], list(range(-1, 10)))
+        self.assertEqual([gen_info["num_evals"] for gen_info in gen_info_list], [3] + [6] * 10)
+
+        for gen_info in gen_info_list:
+            self.assertEqual(sorted(gen_info.keys()), ["evals_per_sec", "gen", "num_evals", "wall_time_sec"])
+            self.assertGreaterEqual(gen_info["wall_time_sec"], 0.)
+            self.assertGreater(gen_info["evals_per_sec"], 0.)
+
+    # Test the "minimize_steady_state" function ###############################
+
+    def test_minimize_steady_state(self):
+        """Check the steady-state ES result (format, budget, determinism and convergence)."""
+
+        init_min_val, init_max_val = np.zeros(3), np.full(3, 5.)
+        gen_list = []
+
+        res = saes.minimize_steady_state(_sphere, init_min_val, init_max_val, num_gen=20, mu=3, lmb=6, seed=1,
+                                         callback=lambda pop, gen_info: gen_list.append((len(pop), gen_info["gen"])))
+
+        self.assertEqual(sorted(res.keys()),
+                         sorted(saes.minimize(_sphere, init_min_val, init_max_val, num_gen=1, seed=1).keys()))
+        self.assertEqual(res['nfev'], 20 * 6 + 3)
+        self.assertEqual(res['nit'], 20)
+        self.assertEqual(gen_list, [(3, -1)] + [(9, gen) for gen in range(20)])
+        self.assertEqual(res['fun'], sorted(res['fun']))
+        self.assertLess(res['fun'][0], 0.1)
+
+        res2 = saes.minimize_steady_state(_sphere, init_min_val, init_max_val, num_gen=20, mu=3, lmb=6, seed=1)
+        self.assertEqual(res['x'], res2['x'])
+
+    def test_minimize_steady_state_executor(self):
+        """Check the steady-state ES with concurrent evaluations."""
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            res = saes.minimize_steady_state(_sphere, np.zeros(3), np.full(3, 5.), num_gen=20, seed=1,
+                                             num_workers=4, executor=executor)
+
+        self.assertEqual(res['nfev'], 20 * 6 + 3)
+        self.assertLess(res['fun'][0], 1.)
+
+    # Test checkpoints ########################################################
+
+    def test_resume(self):
+        """Check that a resumed run gives the result of an uninterrupted run."""
+
+        init_min_val, init_max_val = np.zeros(3), np.full(3, 5.)
+
+        for minimize_function in (saes.minimize, saes.minimize_steady_state):
+            with tempfile.TemporaryDirectory() as tmp_dir_path:
+                checkpoint = Checkpoint(os.path.join(tmp_dir_path, "checkpoint.json"), interval=2)
+
+                res = minimize_function(_sphere, init_min_val, init_max_val, num_gen=10, seed=1)
+
+                # Stop after 5 generations then continue up to 10 generations
+                minimize_function(_sphere, init_min_val, init_max_val, num_gen=5, seed=1, checkpoint=checkpoint)
+                gen_list = []
+                resumed_res = minimize_function(_sphere, init_min_val, init_max_val, num_gen=10, seed=1,
+                                                checkpoint=checkpoint, resume=True,
+                                                callback=lambda pop, gen_info: gen_list.append(gen_info["gen"]))
+
+            self.assertEqual(gen_list, list(range(5, 10)))
+            self.assertEqual(resumed_res['x'], res['x'])
+            self.assertEqual(resumed_res['fun'], res['fun'])
+            self.assertEqual(resumed_res['nfev'], res['nfev'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+This module contains unit tests for the "optimization.surrogate" module.
+"""
+
+from datapipe.optimization import surrogate
+from datapipe.optimization.checkpoint import Checkpoint
+
+import os
+import tempfile
+
+import numpy as np
+
+import unittest
+
+
+def _quadratic(x):
+    return float(np.sum(np.square(np.array(x) - np.array([2., 3.5]))) + 1.5)
+
+
+class TestSurrogate(unittest.TestCase):
+    """
+    Contains unit tests for the "optimization.surrogate" module.
+    """
+
+    # Test the "GaussianProcess" class ########################################
+
+    def test_gaussian_process(self):
+        """Check the model interpolates smooth functions and is uncertain far from data."""
+
+        rng = np.random.RandomState(0)
+        x = rng.uniform(size=(30, 2))
+        y = np.sin(3. * x[:, 0]) + np.square(x[:, 1])
+
+        model = surrogate.GaussianProcess(seed=0).fit(x, y)
+
+        mean, std = model.predict(x)
+        np.testing.assert_allclose(mean, y, atol=1e-2)
+
+        x_test = rng.uniform(size=(10, 2))
+        mean, std = model.predict(x_test)
+        np.testing.assert_allclose(mean, np.sin(3. * x_test[:, 0]) + np.square(x_test[:, 1]), atol=5e-2)
+
+        far_mean, far_std = model.predict([[5., 5.]])
+        self.assertGreater(far_std[0], 10. * std.max())
+
+    # Test the "expected_improvement" function ################################
+
+    def test_expected_improvement(self):
+        """Check the expected improvement increases with the predicted improvement and uncertainty."""
+
+        ei = surrogate.expected_improvement([1., 0., 0., 0.], [1., 1., 2., 1e-9], best_value=0.)
+
+        self.assertLess(ei[0], ei[1])
+        self.assertLess(ei[1], ei[2])
+        self.assertAlmostEqual(ei[3], 0.)
+
+    # Test the "minimize" function ############################################
+
+    def test_minimize(self):
+        """Check the optimum is found with few evaluations, batch by batch."""
+
+        batch_list = []
+
+        res = surrogate.minimize(_quadratic, ((0., 6.), (0., 6.)), num_iter=5, batch_size=3, seed=1,
+                                 callback=lambda batch, it_info: batch_list.append((len(batch), it_info["it"])))
+
+        self.assertEqual(batch_list, [(5, -1)] + [(3, it) for it in range(5)])
+        self.assertEqual(res['nfev'], 5 + 5 * 3)
+        self.assertEqual(res['fun'], min(res['fun_list']))
+        self.assertLess(res['fun'], 1.5 + 0.05)
+
+        res2 = surrogate.minimize(_quadratic, ((0., 6.), (0., 6.)), num_iter=5, batch_size=3, seed=1)
+        self.assertEqual(res['x_list'], res2['x_list'])
+
+    def test_minimize_global_rng(self):
+        """Check the global Numpy random number generator is used without seed."""
+
+        np.random.seed(0)
+        res = surrogate.minimize(_quadratic, ((0., 6.), (0., 6.)), num_iter=2, batch_size=2)
+
+        np.random.seed(0)
+        res2 = surrogate.minimize(_quadratic, ((0., 6.), (0., 6.)), num_iter=2, batch_size=2)
+
+        self.assertEqual(res['nfev'], 5 + 2 * 2)
+        self.assertEqual(res['x_list'], res2['x_list'])
+
+    def test_minimize_rejected_points(self):
+        """Check rejected points (NaN) are never selected."""
+
+        def objective_function(x):
+            return float('nan') if x[1] > x[0] else _quadratic(x)
+
+        res = surrogate.minimize(objective_function, ((0., 6.), (0., 6.)), num_iter=4, batch_size=2, seed=0)
+
+        self.assertLessEqual(res['x'][1], res['x'][0])
+        self.assertFalse(np.isnan(res['fun']))
+
+    # Test checkpoints ########################################################
+
+    def test_resume(self):
+        """Check that a resumed run gives the result of an uninterrupted run."""
+
+        bounds = ((0., 6.), (0., 6.))
+
+        res = surrogate.minimize(_quadratic, bounds, num_iter=6, batch_size=2, seed=1)
+
+        with tempfile.TemporaryDirectory() as tmp_dir_path:
+            checkpoint = Checkpoint(os.path.join(tmp_dir_path, "checkpoint.json"), interval=1)
+
+            # Stop after 3 iterations then continue up to 6 iterations
+            surrogate.minimize(_quadratic, bounds, num_iter=3, batch_size=2, seed=1, checkpoint=checkpoint)
+            it_list = []
+            resumed_res = surrogate.minimize(_quadratic, bounds, num_iter=6, batch_size=2, seed=1,
+                                             checkpoint=checkpoint, resume=True,
+                                             callback=lambda batch, it_info: it_list.append(it_info["it"]))
+
+        self.assertEqual(it_list, list(range(3, 6)))
+        self.assertEqual(resumed_res['x_list'], res['x_list'])
+        self.assertEqual(resumed_res['fun_list'], res['fun_list'])
+        self.assertEqual(resumed_res['nfev'], res['nfev'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+This module contains unit tests for the "optimization.tailcut_grid" module.
+"""
+
+from datapipe.optimization import tailcut_grid
+
+import numpy as np
+
+import unittest
+
+
+def _tailcuts_clean(neighbors, image, picture_thresh, boundary_thresh):
+    """The ctapipe tailcut cleaning (without isolated pixels)."""
+
+    pixels_in_picture = image >= picture_thresh
+    pixels_above_boundary = image >= boundary_thresh
+
+    pixels_with_picture_neighbors = np.array([np.any(pixels_in_picture[pixel_neighbors]) for pixel_neighbors in neighbors])
+    pixels_with_boundary_neighbors = np.array([np.any(pixels_above_boundary[pixel_neighbors]) for pixel_neighbors in neighbors])
+
+    return (pixels_above_boundary & pixels_with_picture_neighbors) | (pixels_in_picture & pixels_with_boundary_neighbors)
+
+
+class TestTailcutGrid(unittest.TestCase):
+    """
+    Contains unit tests for the "optimization.tailcut_grid" module.
+    """
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+
+        num_pixels = 50
+        self.neighbors = [sorted(set(rng.choice(num_pixels, rng.randint(0, 5)).tolist()) - {pixel}) for pixel in range(num_pixels)]
+
+        indptr = np.cumsum([0] + [len(pixel_neighbors) for pixel_neighbors in self.neighbors])
+        indices = np.array([index for pixel_neighbors in self.neighbors for index in pixel_neighbors], dtype=np.intp)
+        self.neighbor_table = (indptr, indices)
+
+        self.images_1d = rng.normal(loc=2., scale=4., size=(3, num_pixels))
+
+    def test_max_neighbor_values(self):
+        """Check max_neighbor_values against a loop over pixels (including pixels without neighbors)."""
+
+        max_neighbor = tailcut_grid.max_neighbor_values(self.images_1d, self.neighbor_table)
+
+        self.assertEqual(max_neighbor.shape, self.images_1d.shape)
+
+        for pixel, pixel_neighbors in enumerate(self.neighbors):
+            if len(pixel_neighbors) > 0:
+                expected_max = self.images_1d[:, pixel_neighbors].max(axis=1)
+            else:
+                expected_max = np.full(len(self.images_1d), -np.inf)
+
+            np.testing.assert_array_equal(max_neighbor[:, pixel], expected_max)
+
+    def test_tailcut_grid_masks(self):
+        """Check tailcut_grid_masks against the tailcut cleaning of each threshold pair."""
+
+        high_thresholds = np.arange(-2., 10., 0.5)
+        low_thresholds = np.arange(-2., 6., 1.)
+
+        max_neighbor = tailcut_grid.max_neighbor_values(self.images_1d, self.neighbor_table)
+
+        for image_1d, image_max_neighbor in zip(self.images_1d, max_neighbor):
+            masks = tailcut_grid.tailcut_grid_masks(image_1d, image_max_neighbor, high_thresholds, low_thresholds)
+
+            self.assertEqual(masks.shape, (len(high_thresholds), len(low_thresholds), len(image_1d)))
+
+            for high_index, high_threshold in enumerate(high_thresholds):
+                for low_index, low_threshold in enumerate(low_thresholds):
+                    expected_mask = _tailcuts_clean(self.neighbors, image_1d, high_threshold, low_threshold)
+                    np.testing.assert_array_equal(masks[high_index, low_index], expected_mask)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -121,6 +121,42 @@ class TestCommonFunctions(unittest.TestCase):
 
         self.assertEqual(max_value, 30.)
 
+
+    # Test the "perpendicular_hit_distribution" function ############
+
+    def test_perpendicular_hit_distribution_ex1(self):
+
+        # Make images #################
+
+        xx, yy = np.meshgrid(np.linspace(-0.1, 0.1, 10), np.linspace(-0.1, 0.1, 10))
+
+        images = np.random.RandomState(0).normal(size=(3, 10, 10))
+        images[:, 0, :] = np.nan
+
+        hillas = np.array([(0.01, -0.02, 0.7)],
+                          dtype=[('cen_x', 'f8'), ('cen_y', 'f8'), ('psi', 'f8')])[0]
+
+        pixel_stat_array_list = common.perpendicular_hit_distribution_batch(images,
+                                                                            (xx, yy),
+                                                                            force_hillas_parameters=hillas)
+
+        # Check result ################
+
+        a, b, c = common.angle_and_point_to_line_equation(0.7, (0.01, -0.02))
+
+        for image, pixel_stat_array in zip(images, pixel_stat_array_list):
+            expected_list = []
+            for value, x, y in zip(image.ravel(), xx.ravel(), yy.ravel()):
+                if value > 0:
+                    expected_list.append([x, y, value,
+                                          common.signed_distance_point_to_line(a, b, c, (x, y)),
+                                          *common.orthogonal_projection_point_to_line(a, b, c, (x, y))])
+
+            np.testing.assert_allclose(pixel_stat_array, np.array(expected_list))
+
+        np.testing.assert_array_equal(common.perpendicular_hit_distribution(images[0], (xx, yy), force_hillas_parameters=hillas),
+                                      pixel_stat_array_list[0])
+
 if __name__ == '__main__':
     unittest.main()
 
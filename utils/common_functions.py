@@ -31,9 +31,10 @@ from datapipe.denoising import wavelets_mrfilter as wavelets_mod
 from datapipe.benchmark import assess as assess_mod
 
 from datapipe.io import geometry_converter
-import datapipe.io.geom as geom_mod
+from datapipe.io import images
 
 from datapipe.image.hillas_parameters import get_hillas_parameters
+from datapipe.image.hillas_parameters import get_hillas_parameters_batch
 
 
 COLOR_MAP = cm.gnuplot2
@@ -50,11 +51,7 @@ def get_fits_files_list(directory_path):
     # Parse the input directory
     print("Parsing", directory_path)
 
-    fits_file_name_list = [os.path.join(directory_path, file_name)
-                           for file_name
-                           in os.listdir(directory_path)
-                           if os.path.isfile(os.path.join(directory_path, file_name))
-                           and file_name.endswith((".fits", ".fit"))]
+    fits_file_name_list = list(images.find_files([directory_path], extensions=(".fits", ".fit")))
 
     return fits_file_name_list
 
@@ -718,57 +715,106 @@ def orthogonal_projection_point_to_line(a, b, c, p):
     return p2
 
 
-def perpendicular_hit_distribution(image_array,
-                                   pixels_position,
-                                   force_hillas_parameters=None):
+def _hillas_axis(hillas):
+    """Return the centroid and the angle (in radian) of the shower axis.
 
-    image_array = copy.deepcopy(image_array)
-    pixels_position = copy.deepcopy(pixels_position)
+    `hillas` is either a ctapipe Hillas parameters container (with astropy
+    quantities) or a record of `datapipe.image.hillas_parameters.get_hillas_parameters_batch`.
+    """
 
-    # Flatten image and remove NaN values
-    image_array_1d = image_array[np.isfinite(image_array)]
-    xx = pixels_position[0][np.isfinite(pixels_position[0])]
-    yy = pixels_position[1][np.isfinite(pixels_position[1])]
+    if hasattr(hillas, "psi") and hasattr(hillas.psi, "to"):
+        centroid = (hillas.cen_x.value, hillas.cen_y.value)
+        angle = hillas.psi.to(u.rad).value
+    else:
+        centroid = (float(hillas["cen_x"]), float(hillas["cen_y"]))
+        angle = float(hillas["psi"])
+
+    return centroid, angle
+
+
+def perpendicular_hit_distribution_batch(image_arrays,
+                                         pixels_position,
+                                         force_hillas_parameters=None):
+    """Compute the perpendicular hit distribution of a stack of images.
+
+    Parameters
+    ----------
+    image_arrays : array_like
+        The images (shape (N, ...) where "..." is the shape of the pixels
+        position arrays, e.g. (N, H, W) for 2D images). NaN pixels are
+        ignored.
+    pixels_position : array_like
+        The ``(pix_x, pix_y)`` position of pixels (each array has the shape of
+        one image).
+    force_hillas_parameters : Hillas parameters, optional
+        The Hillas parameters defining the shower axis of all images. If
+        ``None``, the shower axis of each image is computed from its own
+        Hillas parameters.
+
+    Returns
+    -------
+    list of Numpy array
+        One array per image. Each row describes a pixel having a positive
+        value: ``[x, y, value, signed distance to the shower axis,
+        projected x, projected y]``.
+    """
+
+    pix_x = np.asarray(pixels_position[0], dtype=np.float64).ravel()
+    pix_y = np.asarray(pixels_position[1], dtype=np.float64).ravel()
+
+    image_arrays = np.asarray(image_arrays, dtype=np.float64)
+    image_arrays = image_arrays.reshape((image_arrays.shape[0], -1))
 
-    ###
+    # Ignore NaN pixels and pixels without position
+    image_arrays = np.where(np.isfinite(image_arrays) & np.isfinite(pix_x) & np.isfinite(pix_y),
+                            image_arrays,
+                            0.)
+    pix_x = np.nan_to_num(pix_x, nan=0.)
+    pix_y = np.nan_to_num(pix_y, nan=0.)
 
     if force_hillas_parameters is None:
-        hillas = get_hillas_parameters(image_array, 2, pixels_position)
+        hillas_array = get_hillas_parameters_batch((pix_x, pix_y), image_arrays, raise_on_empty=True)
     else:
-        hillas = force_hillas_parameters
+        hillas_array = [force_hillas_parameters] * image_arrays.shape[0]
 
-    centroid = (hillas.cen_x.value, hillas.cen_y.value)
-    length = hillas.length.value
-    width = hillas.width.value
-    angle = hillas.psi.to(u.rad).value
+    pixel_stat_array_list = []
 
-    #print("centroid:", centroid)
-    #print("length:",   length)
-    #print("width:",    width)
-    #print("angle:",    angle)
+    for image_array, hillas in zip(image_arrays, hillas_array):
+        centroid, angle = _hillas_axis(hillas)
 
-    a, b, c = angle_and_point_to_line_equation(angle, centroid)
+        # The shower axis: a.x + b.y + c = 0
+        a, b, c = angle_and_point_to_line_equation(angle, centroid)
+        norm2 = a**2 + b**2
 
-    #print("a:", a)
-    #print("b:", b)
-    #print("c:", c)
+        mask = image_array > 0
+        xx, yy, values = pix_x[mask], pix_y[mask], image_array[mask]
 
-    ###
+        signed_distance = (a * xx + b * yy + c) / math.sqrt(norm2)
+        projected_x = (b * (b * xx - a * yy) - a * c) / norm2
+        projected_y = (a * (-b * xx + a * yy) - b * c) / norm2
 
-    pixel_stat_list = []
+        pixel_stat_array_list.append(np.stack([xx, yy, values, signed_distance, projected_x, projected_y], axis=1))
 
-    for pixel_value, pixel_pos_x, pixel_pos_y in zip(image_array_1d, xx, yy):
-        if pixel_value > 0:
-            signed_distance = signed_distance_point_to_line(a, b, c, (pixel_pos_x, pixel_pos_y))
-            projected_point = orthogonal_projection_point_to_line(a, b, c, (pixel_pos_x, pixel_pos_y))
+    return pixel_stat_array_list
 
-            #print(pixel_pos_x, pixel_pos_y, pixel_value, signed_distance, *projected_point)
 
-            pixel_stat_list.append([pixel_pos_x, pixel_pos_y, pixel_value, signed_distance, *projected_point])
+def perpendicular_hit_distribution(image_array,
+                                   pixels_position,
+                                   force_hillas_parameters=None):
+    """Compute the perpendicular hit distribution of an image.
 
-    pixel_stat_array = np.array(pixel_stat_list)
+    See `perpendicular_hit_distribution_batch`.
 
-    return pixel_stat_array
+    Returns
+    -------
+    Numpy array
+        Each row describes a pixel having a positive value: ``[x, y, value,
+        signed distance to the shower axis, projected x, projected y]``.
+    """
+
+    return perpendicular_hit_distribution_batch(np.asarray(image_array)[np.newaxis],
+                                                pixels_position,
+                                                force_hillas_parameters=force_hillas_parameters)[0]
 
 
 def plot_perpendicular_hit_distribution(axis,
@@ -789,10 +835,11 @@ def plot_perpendicular_hit_distribution(axis,
     if label_list is None:
         label_list = [None] * len(image_array_list)
 
-    for image_array, label in zip(image_array_list, label_list):
-        pixel_stat_array = perpendicular_hit_distribution(image_array,
-                                                          pixels_position,
-                                                          force_hillas_parameters=common_hillas_parameters)
+    pixel_stat_array_batch = perpendicular_hit_distribution_batch(image_array_list,
+                                                                  pixels_position,
+                                                                  force_hillas_parameters=common_hillas_parameters)
+
+    for pixel_stat_array, label in zip(pixel_stat_array_batch, label_list):
 
         if bins is None:
             hist = axis.hist(pixel_stat_array[:,3],
@@ -893,6 +940,8 @@ def plot_gui(fig,
 
     tailcut = tailcut_mod.Tailcut()
 
+    import datapipe.io.geom as geom_mod     # Only needed (and available) for legacy geometry files
+
     geom_dir_path = os.path.dirname(geom_mod.__file__)
     if fits_metadata_dict['cam_id'] == "ASTRI":
         geom_path = os.path.join(geom_dir_path, "astri.geom.json")
@@ -62,11 +62,9 @@ def get_fits_files_list(directory_path):
     # Parse the input directory
     print("Parsing", directory_path)
 
-    fits_file_name_list = [file_name
-                       for file_name
-                       in os.listdir(directory_path)
-                       if os.path.isfile(os.path.join(directory_path, file_name))
-                       and file_name.endswith((".fits", ".fit"))]
+    fits_file_name_list = [os.path.basename(file_path)
+                           for file_path
+                           in images.find_files([directory_path], extensions=(".fits", ".fit"))]
 
     return fits_file_name_list
 
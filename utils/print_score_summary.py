@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Print the score statistics of one or several score files (JSON files).
+
+Score aggregators saved by each file (e.g. one file per worker or per shard)
+are merged thus image lists don't have to be processed.
+"""
+
+import common_functions as common
+
+import argparse
+import json
+
+from datapipe.benchmark.aggregation import ScoreAggregator
+from datapipe.benchmark.aggregation import merge_aggregators
+
+
+if __name__ == '__main__':
+
+    # PARSE OPTIONS ###########################################################
+
+    parser = argparse.ArgumentParser(description="Print the score statistics of score files (JSON files).")
+
+    parser.add_argument("--json", action="store_true", default=False,
+                        help="Print the summary in JSON format")
+
+    parser.add_argument("fileargs", nargs="+", metavar="FILE",
+                        help="The JSON file(s) to process")
+
+    args = parser.parse_args()
+    json_file_path_list = args.fileargs
+
+    # MERGE AGGREGATORS #######################################################
+
+    aggregator_list = []
+
+    for json_file_path in json_file_path_list:
+        json_data = common.parse_json_file(json_file_path)
+
+        if "score_aggregator" in json_data:
+            aggregator = ScoreAggregator.from_dict(json_data["score_aggregator"])
+        else:
+            # Older files: aggregate the image list
+            aggregator = ScoreAggregator()
+            for image_dict in json_data["io"]:
+                aggregator.update_image_dict(image_dict)
+
+        aggregator_list.append(aggregator)
+
+    summary_dict = merge_aggregators(aggregator_list).summary()
+
+    # PRINT THE SUMMARY #######################################################
+
+    if args.json:
+        print(json.dumps(summary_dict, sort_keys=True, indent=4))
+    else:
+        print("{} images".format(summary_dict.pop("num_images")))
+        print("{} failed".format(summary_dict.pop("num_errors")))
+
+        for name, statistics_dict in sorted(summary_dict.items()):
+            print()
+            print(name)
+            for key in ("count", "num_nan", "mean", "std", "min", "first_quartile", "median", "third_quartile", "max"):
+                print("  {:15} {}".format(key + ":", statistics_dict[key]))
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 Jérémie DECOCK (http://www.jdhp.org)
+
+# This script is provided under the terms and conditions of the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+Generate benchmark images (FITS files or ".npz" containers) from simtel files.
+
+This script replaces the former camera specific "simtel_to_fits_*.py"
+scripts: images are decoded, calibrated and converted to 2D by
+`datapipe.io.images.simtel_images_generator` for all the cameras given with
+the `--camera` option.
+
+Simtel files are processed in parallel (one file per worker process; pyhessio
+cannot read several files at the same time in one process). Outputs that
+already exist and are more recent than their simtel file are not regenerated
+(unless `--force` is used). The "npz" format writes all the images of a
+camera in one file, which is much faster to write (and to read) than one FITS
+file per image.
+
+Examples
+--------
+Write one FITS file per LSTCam and NectarCam image with 4 worker processes::
+
+    ./utils/simtel_to_fits.py -c LSTCam,NectarCam -j 4 -o out/ *.simtel.gz
+
+Write one ".npz" container per simtel file and per camera::
+
+    ./utils/simtel_to_fits.py -c ASTRICam -f npz -o out/ *.simtel.gz
+"""
+
+__all__ = ['convert_simtel_file',
+           'output_prefix']
+
+import argparse
+import json
+import multiprocessing
+import numpy as np
+import os
+
+from datapipe.io import images
+
+CAMERA_LIST = ("ASTRICam", "CHEC", "DigiCam", "FlashCam", "LSTCam", "NectarCam")
+
+# Integrator window (width, shift) used for each camera (the same table is
+# used in `datapipe.denoising.abstract_cleaning_algorithm`)
+INTEGRATOR_WINDOW = {
+        "ASTRICam":  (1, 1),
+        "CHEC":      (10, 5),
+        "DigiCam":   (5, 2),
+        "FlashCam":  (6, 3),
+        "NectarCam": (5, 2),
+        "LSTCam":    (5, 2)
+    }
+
+OUTPUT_FORMATS = ("fits", "npz")
+
+
+def output_prefix(simtel_file_path, output_directory=None):
+    """Return the path prefix of the files generated from `simtel_file_path`."""
+    if output_directory is not None:
+        simtel_basename = os.path.basename(simtel_file_path)
+        return os.path.join(output_directory, simtel_basename)
+    else:
+        return simtel_file_path
+
+
+def _stamp_file_path(prefix, cam_id, output_format):
+    """Return the file used to check whether outputs are up to date.
+
+    It is the container itself for the "npz" format and a JSON manifest
+    listing the written FITS files for the "fits" format. This file is always
+    written last thus an interrupted conversion is never considered as up to
+    date.
+    """
+    if output_format == "npz":
+        return "{}_{}.npz".format(prefix, cam_id)
+    else:
+        return "{}_{}.manifest.json".format(prefix, cam_id)
+
+
+def _is_up_to_date(simtel_file_path, prefix, cam_id, output_format):
+    stamp_file_path = _stamp_file_path(prefix, cam_id, output_format)
+
+    if not os.path.isfile(stamp_file_path):
+        return False
+
+    if os.path.getmtime(stamp_file_path) < os.path.getmtime(simtel_file_path):
+        return False
+
+    if output_format == "fits":
+        with open(stamp_file_path, "r") as fd:
+            fits_file_path_list = json.load(fd)
+        return all(os.path.isfile(file_path) for file_path in fits_file_path_list)
+
+    return True
+
+
+def _fits_metadata(meta):
+    """Rename the metadata yielded by `simtel_images_generator` with FITS keywords."""
+    return {fits_key: meta[meta_key] for meta_key, fits_key in images.BENCHMARK_FITS_KEYWORDS.items()}
+
+
+def _write_fits_file(image, prefix):
+    """Write `image` in its own FITS file and return the path of this file."""
+    output_file_path = "{}_TEL{:03d}_EV{:05d}.fits".format(prefix,
+                                                           image.meta['tel_id'],
+                                                           image.meta['event_id'])
+
+    images.save_benchmark_images(img = image.input_image,
+                                 pe_img = image.reference_image,
+                                 adc_sums_img = image.adc_sum_image,
+                                 pedestal_img = image.pedestal_image,
+                                 gains_img = image.gains_image,
+                                 pixel_pos = image.pixels_position,
+                                 pixel_mask = image.pixels_mask,
+                                 metadata = _fits_metadata(image.meta),
+                                 output_file_path = output_file_path)
+
+    return output_file_path
+
+
+def convert_simtel_file(simtel_file_path,
+                        cam_id_list,
+                        tel_id_filter_list=None,
+                        event_id_filter_list=None,
+                        output_directory=None,
+                        output_format="fits",
+                        force=False):
+    """Extract the images of `cam_id_list` cameras from one simtel file.
+
+    Parameters
+    ----------
+    simtel_file_path : str
+        The path of the simtel file to process.
+    cam_id_list : sequence of str
+        The cameras to extract (see `CAMERA_LIST`).
+    tel_id_filter_list : sequence of int
+        If defined, only extract images from these telescopes.
+    event_id_filter_list : sequence of int
+        If defined, only extract images from these events.
+    output_directory : str
+        The directory where outputs are written. Outputs are written next to
+        the simtel file if ``None``.
+    output_format : str
+        "fits" to write one FITS file per image; "npz" to write one container
+        per camera (see `datapipe.io.images.save_benchmark_container`).
+    force : bool
+        Regenerate outputs even if they are up to date.
+
+    Returns
+    -------
+    int
+        The number of images written.
+    """
+
+    prefix = output_prefix(simtel_file_path, output_directory)
+
+    if force:
+        pending_cam_id_list = list(cam_id_list)
+    else:
+        pending_cam_id_list = [cam_id for cam_id in cam_id_list
+                               if not _is_up_to_date(simtel_file_path, prefix, cam_id, output_format)]
+
+    if len(pending_cam_id_list) == 0:
+        print("Skipping", simtel_file_path, "(up to date)")
+        return 0
+
+    print("Processing", simtel_file_path)
+
+    # Cameras sharing the same integrator settings are extracted in one pass
+    integrator_groups = {}
+    for cam_id in pending_cam_id_list:
+        integrator_groups.setdefault(INTEGRATOR_WINDOW[cam_id], []).append(cam_id)
+
+    num_images = 0
+
+    for (window_width, window_shift), cam_group in sorted(integrator_groups.items()):
+
+        container_dict = {cam_id: [] for cam_id in cam_group}
+        fits_file_path_dict = {cam_id: [] for cam_id in cam_group}
+
+        for image in images.simtel_images_generator(simtel_file_path,
+                                                    tel_filter_list=tel_id_filter_list,
+                                                    ev_filter_list=event_id_filter_list,
+                                                    cam_filter_list=cam_group,
+                                                    ctapipe_format=False,
+                                                    integrator='LocalPeakIntegrator',
+                                                    integrator_window_width=window_width,
+                                                    integrator_window_shift=window_shift,
+                                                    integration_correction=False,
+                                                    mix_channels=True):
+
+            # 1 for pixels with actual data, 0 for virtual (blank) pixels
+            pixel_mask = (np.nan_to_num(image.pixels_mask) == 1).astype(int)
+            image = image._replace(pixels_mask=pixel_mask)
+
+            num_images += 1
+
+            if output_format == "npz":
+                container_dict[image.meta['cam_id']].append(image)
+            else:
+                fits_file_path_dict[image.meta['cam_id']].append(_write_fits_file(image, prefix))
+
+        # Stamp files are written last (even for cameras without any image in
+        # this simtel file) so that this file is skipped at the next run
+
+        if output_format == "npz":
+            for cam_id, image_list in container_dict.items():
+                images.save_benchmark_container(image_list, _stamp_file_path(prefix, cam_id, output_format))
+        else:
+            for cam_id, fits_file_path_list in fits_file_path_dict.items():
+                stamp_file_path = _stamp_file_path(prefix, cam_id, output_format)
+                with open(stamp_file_path + ".tmp", "w") as fd:
+                    json.dump(fits_file_path_list, fd, indent=4)
+                os.replace(stamp_file_path + ".tmp", stamp_file_path)
+
+    return num_images
+
+
+def _convert_simtel_file_star(kwargs):
+    return convert_simtel_file(**kwargs)
+
+
+def main():
+
+    # PARSE OPTIONS ###########################################################
+
+    desc = "Generate FITS files (or containers) compliant for cleaning benchmark (from simtel files)."
+    parser = argparse.ArgumentParser(description=desc)
+
+    parser.add_argument("--camera", "-c",
+                        metavar="STRING LIST",
+                        help="The cameras to extract (camera names separated by a comma) in: {}. Default: all.".format(", ".join(CAMERA_LIST)))
+
+    parser.add_argument("--telescope", "-t",
+                        metavar="INTEGER LIST",
+                        help="The telescopes to query (telescopes number separated by a comma)")
+
+    parser.add_argument("--event", "-e",
+                        metavar="INTEGER LIST",
+                        help="The events to extract (events ID separated by a comma)")
+
+    parser.add_argument("--output", "-o",
+                        metavar="DIRECTORY",
+                        help="The output directory")
+
+    parser.add_argument("--format", "-f",
+                        choices=OUTPUT_FORMATS,
+                        default="fits",
+                        help="The output format: one FITS file per image or one '.npz' container per simtel file and per camera. Default: fits.")
+
+    parser.add_argument("--jobs", "-j",
+                        type=int,
+                        default=1,
+                        metavar="INTEGER",
+                        help="The number of simtel files processed in parallel. Default: 1.")
+
+    parser.add_argument("--force",
+                        action="store_true",
+                        help="Regenerate outputs even if they are up to date")
+
+    parser.add_argument("fileargs", nargs="+", metavar="FILE",
+                        help="The simtel files to process")
+
+    args = parser.parse_args()
+
+    if args.camera is None:
+        cam_id_list = list(CAMERA_LIST)
+    else:
+        cam_id_list = [cam_id_str.strip() for cam_id_str in args.camera.split(",")]
+        for cam_id in cam_id_list:
+            if cam_id not in CAMERA_LIST:
+                raise ValueError("Unknown camera {} (should be in {}).".format(cam_id, ", ".join(CAMERA_LIST)))
+
+    if args.telescope is None:
+        tel_id_filter_list = None
+    else:
+        tel_id_filter_list = [int(tel_id_str) for tel_id_str in args.telescope.split(",")]
+
+    if args.event is None:
+        event_id_filter_list = None
+    else:
+        event_id_filter_list = [int(event_id_str) for event_id_str in args.event.split(",")]
+
+    print("Cameras:", cam_id_list)
+    print("Telescopes:", tel_id_filter_list)
+    print("Events:", event_id_filter_list)
+
+    output_directory = args.output
+    simtel_file_path_list = args.fileargs
+
+    if output_directory is not None:
+        if not (os.path.exists(output_directory) and os.path.isdir(output_directory)):
+            raise Exception("{} does not exist or is not a directory.".format(output_directory))
+
+    # ITERATE OVER SIMTEL FILES ###############################################
+
+    task_list = [dict(simtel_file_path=simtel_file_path,
+                      cam_id_list=cam_id_list,
+                      tel_id_filter_list=tel_id_filter_list,
+                      event_id_filter_list=event_id_filter_list,
+                      output_directory=output_directory,
+                      output_format=args.format,
+                      force=args.force)
+                 for simtel_file_path in simtel_file_path_list]
+
+    if args.jobs > 1:
+        with multiprocessing.Pool(processes=args.jobs) as pool:
+            num_images = sum(pool.imap_unordered(_convert_simtel_file_star, task_list))
+    else:
+        num_images = sum(_convert_simtel_file_star(task) for task in task_list)
+
+    print(num_images, "images written")
+
+
+if __name__ == "__main__":
+    main()